@@ -0,0 +1,110 @@
+import argparse
+import functools
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import requests
+from categorizer import Categorizer
+from channel_search import SearchIndex
+from channel_store import ChannelStore
+from m3u_parser import iter_m3u_response
+from playlist_cache import PlaylistCache, PlaylistSnapshot, snapshot_state
+from synthetic import write_playlist
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(directory):
+    # SimpleHTTPRequestHandler sends Last-Modified and answers If-Modified-Since with 304
+    server = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(QuietHandler, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def cold_load(url, categorizer):
+    # Everything the loader and model do for a fresh download
+    with requests.get(url, stream=True) as response:
+        channels = list(iter_m3u_response(response))
+        last_modified = response.headers.get('Last-Modified')
+    categories = categorizer.classify_many(channels)
+    store = ChannelStore(categorizer.categories)
+    search = SearchIndex()
+    store.extend(channels, categories)
+    for channel in channels:
+        search.add(channel.title)
+    snapshot = PlaylistSnapshot(store, search)
+    return snapshot, last_modified
+
+
+def warm_load(url, cache, categorizer):
+    cached = cache.lookup(url, categorizer.fingerprint)
+    response = requests.get(url, headers=cache.conditional_headers(cached['validators'][url]))
+    assert response.status_code == 304, response.status_code
+    return cache.load(url)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Cold download vs. 304-revalidated cache load; exits 1 when the warm load takes "
+                    "--max-warm-s or more, or the cached playlist is not the one copied")
+    parser.add_argument('--entries', type=int, default=500000)
+    parser.add_argument('--max-warm-s', type=float, default=1.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        write_playlist(os.path.join(tmp, 'playlist.m3u'), args.entries)
+        server = serve(tmp)
+        url = f'http://127.0.0.1:{server.server_address[1]}/playlist.m3u'
+        cache = PlaylistCache(os.path.join(tmp, 'cache'))
+        categorizer = Categorizer()
+
+        start = time.perf_counter()
+        snapshot, last_modified = cold_load(url, categorizer)
+        cold = time.perf_counter() - start
+
+        # The copy is taken on the GUI thread; pickling and writing it is not
+        start = time.perf_counter()
+        state = snapshot_state(snapshot)
+        freeze = time.perf_counter() - start
+        # The model keeps adding while the copy is written; none of it may
+        # reach the cached playlist
+        entries = len(snapshot.store)
+        snapshot.store.extend([snapshot.store.get(0)] * 1000, [snapshot.store.category(0)] * 1000)
+        for _ in range(1000):
+            snapshot.search.add(snapshot.store.title[0])
+        start = time.perf_counter()
+        cache.store(url, state, {url: [None, last_modified]}, categorizer.fingerprint)
+        store = time.perf_counter() - start
+
+        start = time.perf_counter()
+        restored = warm_load(url, cache, categorizer)
+        warm = time.perf_counter() - start
+        server.shutdown()
+        isolated = len(restored.store) == len(restored.search) == entries == restored.store.live_count() and \
+            all(len(column) == entries for column in (restored.store.title, restored.store.url, restored.store.durations))
+
+        print(json.dumps({
+            'entries': len(restored.store),
+            'copy_isolated': isolated,
+            'cold_load_s': round(cold, 2),
+            'snapshot_copy_s': round(freeze, 3),
+            'cache_store_s': round(store, 2),
+            'warm_load_s': round(warm, 2),
+            'snapshot_mb': round(sum(os.path.getsize(cache.path(name)) for name in os.listdir(cache.directory)
+                                     if name.endswith('.snapshot')) / 1e6, 1),
+        }))
+    return 0 if isolated and warm < args.max_warm_s else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
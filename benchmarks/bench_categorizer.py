@@ -0,0 +1,102 @@
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from categorizer import Categorizer
+from m3u_parser import Channel
+from synthetic import GROUPS, WORDS
+from tests.test_categorizer import LABELLED
+
+
+def legacy_categorize(title):
+    # The keyword loop PlaylistViewer used before Categorizer
+    title = title.lower()
+    if any(word in title for word in ['news', 'cnn', 'bbc', 'aljazeera']):
+        return 'News'
+    elif any(word in title for word in ['movie', 'film', 'cinema']):
+        return 'Movies'
+    elif any(word in title for word in ['series', 'show', 'drama']):
+        return 'Series'
+    elif any(word in title for word in ['sport', 'football', 'soccer', 'tennis']):
+        return 'Sports'
+    elif any(word in title for word in ['kids', 'child', 'cartoon']):
+        return 'Kids'
+    elif any(word in title for word in ['music', 'mtv', 'song']):
+        return 'Music'
+    return 'Live TV'
+
+
+def accuracy(classify):
+    hits = sum(classify(title, group) == expected for title, group, expected in LABELLED)
+    return round(hits / len(LABELLED), 3)
+
+
+def best_of(repeat, function, *args):
+    # Fastest of ``repeat`` runs, so a busy machine does not decide the ratio
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Categorizer throughput and accuracy; exits 1 when it is less accurate than the "
+                    "old keyword loop or less than --min-speedup times faster, with or without group-titles")
+    parser.add_argument('--entries', type=int, default=1000000)
+    parser.add_argument('--batch', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--min-speedup', type=float, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    # Provider exports carry a group-title on every entry
+    channels = [Channel(f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}", '',
+                        group_title=f"{rng.choice(['AR', 'UK', 'US'])} | {rng.choice(GROUPS)}")
+                for i in range(args.entries)]
+    # Same titles with no group-title hints, so only the title scan helps
+    bare = [Channel(channel.title, '') for channel in channels]
+    # The fixtures outlive every run; keep the collector from walking them
+    gc.freeze()
+
+    def run_legacy():
+        for channel in channels:
+            legacy_categorize(channel.title)
+
+    def run_batches(channels):
+        # A new Categorizer per run, so every run starts with empty caches
+        categorizer = Categorizer()
+        for i in range(0, len(channels), args.batch):
+            categorizer.classify_many(channels[i:i + args.batch])
+
+    legacy = best_of(args.repeat, run_legacy)
+    batched = best_of(args.repeat, run_batches, channels)
+    titles_only = best_of(args.repeat, run_batches, bare)
+    legacy_accuracy = accuracy(lambda title, group: legacy_categorize(title))
+    new_accuracy = accuracy(Categorizer().classify)
+
+    print(json.dumps({
+        'entries': args.entries,
+        'legacy_s': round(legacy, 2),
+        'classify_many_s': round(batched, 2),
+        'classify_many_titles_only_s': round(titles_only, 2),
+        'speedup': round(legacy / batched, 1),
+        'speedup_titles_only': round(legacy / titles_only, 1),
+        'legacy_accuracy': legacy_accuracy,
+        'accuracy': new_accuracy,
+    }))
+    ok = new_accuracy >= legacy_accuracy and min(legacy / batched, legacy / titles_only) >= args.min_speedup
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
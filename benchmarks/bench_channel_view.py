@@ -0,0 +1,92 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtWidgets import QApplication, QTreeView, QTreeWidget, QTreeWidgetItem
+from channel_model import CATEGORIES, ChannelTreeModel
+from m3u_parser import Channel
+
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+
+def make_batch(entries):
+    return [(CATEGORIES[i % len(CATEGORIES)],
+             Channel(f"Channel {i}", f"http://streams.example/{i}.ts"))
+            for i in range(entries)]
+
+
+def build_widgets(batch):
+    # What PlaylistViewer did before: one QTreeWidgetItem per channel
+    tree = QTreeWidget()
+    tree.setHeaderLabels(["Channels"])
+    categories = {name: QTreeWidgetItem(tree, [name]) for name in CATEGORIES}
+    for category, channel in batch:
+        QTreeWidgetItem(categories[category], [channel.title])
+    tree.expandToDepth(0)
+    return tree
+
+
+def build_model(batch):
+    model = ChannelTreeModel()
+    tree = QTreeView()
+    tree.setUniformRowHeights(True)
+    tree.setModel(model)
+    model.add_channels(batch)
+    tree.expandToDepth(0)
+    tree.model_ref = model
+    return tree
+
+
+def run_once(entries, mode):
+    app = QApplication(sys.argv)
+    batch = make_batch(entries)
+    base_rss = rss_mb()
+
+    start = time.perf_counter()
+    tree = build_widgets(batch) if mode == 'widget' else build_model(batch)
+    tree.resize(800, 600)
+    tree.show()
+    app.processEvents()
+    tree.viewport().repaint()
+    first_paint = time.perf_counter() - start
+
+    return {
+        'mode': mode,
+        'entries': entries,
+        'time_to_first_paint_s': round(first_paint, 3),
+        'view_rss_mb': round(rss_mb() - base_rss, 1),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Channel list memory and time-to-first-paint")
+    parser.add_argument('--sizes', default='50000,200000')
+    parser.add_argument('--modes', default='model,widget')
+    parser.add_argument('--entries', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--mode', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.entries:
+        print(json.dumps(run_once(args.entries, args.mode)))
+        return
+
+    for size in map(int, args.sizes.split(',')):
+        for mode in args.modes.split(','):
+            out = subprocess.check_output([sys.executable, __file__, '--entries', str(size), '--mode', mode],
+                                          stderr=subprocess.DEVNULL)
+            print(out.decode().strip())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtWidgets import QApplication, QComboBox
+from channel_model import ChannelTreeModel
+from m3u_parser import Channel
+from synthetic import WORDS
+
+CATEGORIES = ["Live TV", "Movies"]
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, round((time.perf_counter() - start) * 1000, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Toolbar content combo: category switch and type-to-find")
+    parser.add_argument('--entries', type=int, default=100000, help="Channels per category")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    rng = random.Random(0)
+    model = ChannelTreeModel(CATEGORIES)
+    model.add_channels([(CATEGORIES[i % 2], Channel(f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}",
+                                                    f"http://streams.example/{i}.ts"))
+                        for i in range(args.entries * 2)])
+
+    # Before: clear and addItem per channel, on every switch
+    legacy = QComboBox()
+
+    def rebuild(category):
+        legacy.clear()
+        for channel in model.category_channels(category):
+            legacy.addItem(channel.title)
+
+    # Now: the shared model with the category as root index
+    combo = QComboBox()
+    combo.setEditable(True)
+    combo.setModel(model)
+    combo.view().setUniformItemSizes(True)
+
+    def switch(category):
+        combo.setRootModelIndex(model.index(model.category_rows[category], 0))
+        combo.setCurrentIndex(-1)
+
+    for category in CATEGORIES:
+        _, rebuild_ms = timed(rebuild, category)
+        _, switch_ms = timed(switch, category)
+        print(json.dumps({'category': category, 'channels': len(model.rows[model.category_rows[category]]),
+                          'rebuild_ms': rebuild_ms, 'switch_ms': switch_ms}))
+
+    category = CATEGORIES[0]
+    _, first_ms = timed(model.complete, category, 'a')
+    timings = {}
+    for prefix in ('s', 'sp', 'spo', 'sport', 'news 1', 'xyz'):
+        results, timings[prefix] = timed(model.complete, category, prefix)
+    print(json.dumps({'prefix_index_build_ms': first_ms, 'completion_ms': timings}))
+
+
+if __name__ == '__main__':
+    main()
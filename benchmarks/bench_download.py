@@ -0,0 +1,135 @@
+import argparse
+import gzip
+import json
+import lzma
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import playlist_download
+from m3u_parser import iter_m3u_file
+from playlist_reader import PlaylistReader
+from synthetic import write_playlist
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    # Serves server.files ({path: (body, content encoding)}) with an ETag
+    # and Range support, and cuts each of the first server.drops replies
+    # off after server.drop_after bytes
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        body, encoding = server.files[self.path]
+        server.requests.append(self.headers.get('Range'))
+        start = 0
+        ranged = self.headers.get('Range') if server.ranges else None
+        if ranged and self.headers.get('If-Range', server.etag) == server.etag:
+            start = int(ranged.split('=')[1].rstrip('-'))
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{len(body) - 1}/{len(body)}')
+        else:
+            self.send_response(200)
+        self.send_header('ETag', server.etag)
+        self.send_header('Content-Length', str(len(body) - start))
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.end_headers()
+        body = body[start:]
+        if server.drops:
+            server.drops -= 1
+            self.wfile.write(body[:server.drop_after])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(files, drops, drop_after, ranges=True):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FlakyHandler)
+    server.files = files
+    server.drops = drops
+    server.drop_after = drop_after
+    server.ranges = ranges
+    server.etag = '"v1"'
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def load(url, directory):
+    reader = PlaylistReader([url], dedupe=False)
+    reader.download_dir = directory
+    start = time.perf_counter()
+    channels = [(channel.title, channel.url) for channel in reader.read()]
+    return channels, reader, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Playlist downloads from a server that drops connections mid-transfer; "
+                    "exits 1 when a download does not match the file")
+    parser.add_argument('--entries', type=int, default=100000)
+    parser.add_argument('--drops', type=int, default=3)
+    args = parser.parse_args()
+
+    # Resumes are retried without the growing pause
+    playlist_download.RESUME_BACKOFF = 0.01
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'playlist.m3u')
+        write_playlist(path, args.entries, mixed=True)
+        expected = [(channel.title, channel.url) for channel in iter_m3u_file(path)]
+        with open(path, 'rb') as f:
+            data = f.read()
+        files = {
+            '/plain.m3u': (data, ''),
+            '/encoded.m3u': (gzip.compress(data), 'gzip'),
+            '/playlist.m3u.gz': (gzip.compress(data), ''),
+            '/playlist.m3u.xz': (lzma.compress(data), ''),
+        }
+
+        cases = [(name, files, {}) for name in files]
+        # No Range support: the same body again, with what was read skipped
+        cases.append(('/plain.m3u', files, {'ranges': False}))
+        for name, files, options in cases:
+            body = files[name][0]
+            server = serve(files, args.drops, len(body) // (args.drops + 2), **options)
+            url = f'http://127.0.0.1:{server.server_address[1]}{name}'
+            channels, reader, seconds = load(url, os.path.join(tmp, 'downloads'))
+            server.shutdown()
+            ok = channels == expected and not reader.failed_sources
+            failures += not ok
+            print(json.dumps({'source': name, 'ranges': options.get('ranges', True), 'bytes': len(body),
+                              'requests': len(server.requests), 'resumed': sum(map(bool, server.requests)),
+                              'seconds': round(seconds, 2), 'identical': ok,
+                              'failed': reader.failed_sources}))
+
+        # A load that gives up leaves a .part file; the next load resumes it
+        body = files['/plain.m3u'][0]
+        server = serve(files, 1, len(body) // 2)
+        url = f'http://127.0.0.1:{server.server_address[1]}/plain.m3u'
+        playlist_download.MAX_RESUMES = 0
+        first, reader, _ = load(url, os.path.join(tmp, 'downloads'))
+        gave_up = bool(reader.failed_sources)
+        playlist_download.MAX_RESUMES = 5
+        channels, reader, seconds = load(url, os.path.join(tmp, 'downloads'))
+        server.shutdown()
+        ok = gave_up and channels == expected and server.requests[-1] == f'bytes={len(body) // 2}-'
+        failures += not ok
+        print(json.dumps({'source': 'next load', 'first_load_failed': gave_up, 'first_load_channels': len(first),
+                          'resumed_from': server.requests[-1], 'identical': ok,
+                          'left_over': os.listdir(os.path.join(tmp, 'downloads'))}))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,116 @@
+import argparse
+import gzip
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from epg import EpgCache, EpgIndex, iter_xmltv, open_xmltv
+from synthetic import WORDS
+
+
+def write_guide(path, channels, hours, seed_time):
+    # A gzipped XMLTV guide with half-hour programmes from 12 hours ago
+    # for ``hours`` hours on every channel, in the usual channel order
+    start = seed_time - seed_time % 1800 - 12 * 3600
+    stamp = lambda t: time.strftime('%Y%m%d%H%M%S +0000', time.gmtime(t))
+    with gzip.open(path, 'wt', encoding='utf-8', compresslevel=6) as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n<tv generator-info-name="bench">\n')
+        for c in range(channels):
+            f.write(f'  <channel id="ch{c}.example"><display-name>Channel {c}</display-name></channel>\n')
+        for c in range(channels):
+            for slot in range(hours * 2):
+                t = start + slot * 1800
+                title = escape(f"{WORDS[(c + slot) % len(WORDS)]} {slot % 24}")
+                f.write(f'  <programme start="{stamp(t)}" stop="{stamp(t + 1800)}" channel="ch{c}.example">'
+                        f'<title lang="en">{title}</title><desc lang="en">Episode {slot} of a long '
+                        f'running show on channel {c}.</desc></programme>\n')
+        f.write('</tv>\n')
+
+
+def peak_mb():
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def run_stream(path, channels):
+    start = time.perf_counter()
+    index = EpgIndex()
+    with open_xmltv(path) as source:
+        for programme in iter_xmltv(source):
+            index.add(*programme)
+    index.finish()
+    parse_s = time.perf_counter() - start
+
+    ids = [f"ch{c}.Example" for c in range(channels)]
+    now = time.time()
+    start = time.perf_counter()
+    for tvg_id in ids:
+        index.now_title(tvg_id, now)
+    now_title_us = (time.perf_counter() - start) / len(ids) * 1e6
+    start = time.perf_counter()
+    for tvg_id in ids:
+        index.now_next(tvg_id, now)
+    now_next_us = (time.perf_counter() - start) / len(ids) * 1e6
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = EpgCache(tmp)
+        start = time.perf_counter()
+        cache.store(path, index, [None, None])
+        store_s = time.perf_counter() - start
+        start = time.perf_counter()
+        reloaded = cache.load(path)[0]
+        reload_s = time.perf_counter() - start
+    assert reloaded.now_title(ids[0], now) == index.now_title(ids[0], now)
+
+    return {
+        'mode': 'iterparse', 'programmes': len(index), 'parse_s': round(parse_s, 2),
+        'now_title_us': round(now_title_us, 2), 'now_next_us': round(now_next_us, 2),
+        'cache_store_s': round(store_s, 3), 'cache_reload_s': round(reload_s, 3), 'peak_rss_mb': peak_mb(),
+    }
+
+
+def run_dom(path, channels):
+    # The naive approach: the whole document as an ElementTree
+    start = time.perf_counter()
+    with open_xmltv(path) as source:
+        tree = ElementTree.parse(source)
+    programmes = len(tree.getroot().findall('programme'))
+    return {'mode': 'dom', 'programmes': programmes,
+            'parse_s': round(time.perf_counter() - start, 2), 'peak_rss_mb': peak_mb()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="XMLTV guide parsing, now/next lookups and index reloads")
+    parser.add_argument('--channels', type=int, default=2000)
+    parser.add_argument('--hours', type=int, default=7 * 24)
+    parser.add_argument('--modes', default='iterparse,dom')
+    parser.add_argument('--path', help=argparse.SUPPRESS)
+    parser.add_argument('--mode', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run = run_stream if args.mode == 'iterparse' else run_dom
+        print(json.dumps(run(args.path, args.channels)))
+        return
+
+    # Each mode in its own process, so peak RSS is its own
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'guide.xml.gz')
+        write_guide(path, args.channels, args.hours, time.time())
+        print(json.dumps({'channels': args.channels, 'hours': args.hours,
+                          'gzip_mb': round(os.path.getsize(path) / (1024 * 1024), 1)}))
+        for mode in args.modes.split(','):
+            out = subprocess.check_output([sys.executable, __file__, '--channels', str(args.channels),
+                                           '--path', path, '--mode', mode])
+            print(out.decode().strip())
+
+
+if __name__ == '__main__':
+    main()
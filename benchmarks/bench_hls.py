@@ -0,0 +1,77 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from hls_resolver import HlsResolver, VariantPolicy
+
+MASTER = """#EXTM3U
+#EXT-X-STREAM-INF:BANDWIDTH=800000,RESOLUTION=640x360
+360/index.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=2800000,RESOLUTION=1280x720
+720/index.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=5000000,RESOLUTION=1920x1080
+1080/index.m3u8
+#EXT-X-STREAM-INF:BANDWIDTH=14000000,RESOLUTION=3840x2160
+2160/index.m3u8
+"""
+
+
+class MasterHandler(BaseHTTPRequestHandler):
+    # Every /<channel>/master.m3u8 answers after ``delay`` seconds, like a remote server
+    protocol_version = 'HTTP/1.1'
+    delay = 0.05
+
+    def do_GET(self):
+        time.sleep(self.delay)
+        body = MASTER.encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/vnd.apple.mpegurl')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HLS master playlist resolution: cold vs. cached")
+    parser.add_argument('--channels', type=int, default=50)
+    parser.add_argument('--delay', type=float, default=0.05)
+    args = parser.parse_args()
+
+    MasterHandler.delay = args.delay
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MasterHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    urls = [f'{base}/{i}/master.m3u8' for i in range(args.channels)]
+
+    for policy in (VariantPolicy(), VariantPolicy(max_height=720), VariantPolicy(max_bandwidth=1000000),
+                   VariantPolicy(max_height=240)):
+        resolver = HlsResolver(policy)
+        print(json.dumps({'max_height': policy.max_height, 'max_bandwidth': policy.max_bandwidth,
+                          'variant': resolver.resolve(urls[0])[len(base):]}))
+
+    resolver = HlsResolver()
+    for label in ('cold', 'cached'):
+        timings = []
+        for url in urls:
+            start = time.perf_counter()
+            resolver.resolve(url)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        print(json.dumps({'pass': label, 'channels': len(urls),
+                          'median_ms': round(timings[len(timings) // 2] * 1000, 3),
+                          'worst_ms': round(timings[-1] * 1000, 3)}))
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
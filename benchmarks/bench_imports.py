@@ -0,0 +1,61 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from synthetic import write_playlist
+
+# Run in a fresh interpreter per sample, so nothing is imported already
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed, *(name in sys.modules for name in ('PyQt5', 'vlc', 'requests')))
+"""
+
+
+def import_time(module, runs):
+    samples = []
+    for _ in range(runs):
+        out = subprocess.check_output([sys.executable, '-c', PROBE.format(module=module)], cwd=ROOT,
+                                      env=dict(os.environ, QT_QPA_PLATFORM='offscreen'))
+        elapsed, *loaded = out.decode().split()
+        samples.append(float(elapsed))
+    samples.sort()
+    return {'module': module, 'import_ms': round(samples[len(samples) // 2] * 1000, 1),
+            'pyqt5': loaded[0] == 'True', 'vlc': loaded[1] == 'True', 'requests': loaded[2] == 'True'}
+
+
+def cli_throughput(entries):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'playlist.m3u')
+        write_playlist(path, entries)
+        result = {}
+        for fmt in ('m3u', 'jsonl', 'csv'):
+            start = time.perf_counter()
+            subprocess.check_call([sys.executable, os.path.join(ROOT, 'playlist_cli.py'), path, '-q',
+                                   '-f', fmt, '-o', os.path.join(tmp, 'out.' + fmt)])
+            result[f'{fmt}_channels_per_s'] = round(entries / (time.perf_counter() - start))
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time of the playlist core vs the GUI, and CLI throughput")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--entries', type=int, default=200000)
+    args = parser.parse_args()
+
+    for module in ('playlist_cli', 'playlist_viewer', 'main'):
+        print(json.dumps(import_time(module, args.runs)))
+    print(json.dumps(dict(entries=args.entries, **cli_throughput(args.entries))))
+
+
+if __name__ == '__main__':
+    main()
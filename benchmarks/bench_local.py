@@ -0,0 +1,111 @@
+import argparse
+import codecs
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from synthetic import write_playlist
+
+# Bytes per entry of a mixed synthetic playlist, to size the file
+ENTRY_BYTES = 205
+
+# Encodings a copy of the playlist is written in: (name, codec, byte order mark)
+ENCODINGS = {
+    'utf-8': ('utf-8', b''),
+    'utf-8-bom': ('utf-8', codecs.BOM_UTF8),
+    'utf-16': ('utf-16-le', codecs.BOM_UTF16_LE),
+    'cp1256': ('cp1256', b''),
+}
+
+
+def peak_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_once(mode, path):
+    # Runs in a child so each mode's peak memory is its own. Channels are
+    # counted, not kept, so the peak is what reading takes.
+    from m3u_parser import iter_m3u, iter_m3u_chunks, iter_m3u_file
+    from playlist_reader import PlaylistReader
+    base = peak_mb()
+    start = time.perf_counter()
+    if mode == 'mapped':
+        count = sum(1 for _ in iter_m3u_file(path))
+    elif mode == 'reader':
+        count = sum(1 for _ in PlaylistReader([path], dedupe=False, workers=1).read())
+    elif mode == 'chunked':
+        # The streaming text path downloads go through
+        with open(path, 'rb') as f:
+            count = sum(1 for _ in iter_m3u_chunks(iter(lambda: f.read(64 * 1024), b'')))
+    else:
+        # The whole file as one string, for comparison
+        with open(path, encoding='utf-8-sig', errors='replace') as f:
+            count = sum(1 for _ in iter_m3u(f.read().split('\n')))
+    seconds = time.perf_counter() - start
+    size = os.path.getsize(path)
+    return {'mode': mode, 'entries': count, 'seconds': round(seconds, 2),
+            'mb_per_s': round(size / (1024 * 1024) / seconds, 1),
+            'peak_mb': round(peak_mb(), 1), 'growth_mb': round(peak_mb() - base, 1)}
+
+
+def transcode(source, path, encoding):
+    codec, bom = ENCODINGS[encoding]
+    with open(source, encoding='utf-8') as src, open(path, 'wb') as out:
+        out.write(bom)
+        for line in src:
+            out.write(line.encode(codec, 'replace'))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Peak memory and throughput of reading a large local playlist; exits 1 when the "
+                    "memory-mapped reader grows by more than --budget-mb or miscounts entries")
+    parser.add_argument('--size-mb', type=int, default=1024)
+    parser.add_argument('--modes', default='mapped,reader,chunked,whole')
+    parser.add_argument('--encodings', default='utf-8,utf-8-bom,utf-16,cp1256')
+    parser.add_argument('--budget-mb', type=float, default=64)
+    parser.add_argument('--run', nargs=2, metavar=('MODE', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_once(*args.run)))
+        return 0
+
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'playlist.m3u')
+        write_playlist(path, args.size_mb * 1024 * 1024 // ENTRY_BYTES, mixed=True)
+
+        def run(mode, path, **extra):
+            out = subprocess.check_output([sys.executable, __file__, '--run', mode, path])
+            result = dict(json.loads(out), file_mb=round(os.path.getsize(path) / (1024 * 1024), 1), **extra)
+            print(json.dumps(result))
+            return result
+
+        expected = None
+        for mode in args.modes.split(','):
+            result = run(mode, path, encoding='utf-8')
+            expected = expected or result['entries']
+            if result['entries'] != expected or (mode == 'mapped' and result['growth_mb'] > args.budget_mb):
+                failures += 1
+
+        for encoding in args.encodings.split(','):
+            if encoding == 'utf-8':
+                continue
+            copy = os.path.join(tmp, f'playlist-{encoding}.m3u')
+            transcode(path, copy, encoding)
+            result = run('mapped', copy, encoding=encoding)
+            os.remove(copy)
+            if result['entries'] != expected or result['growth_mb'] > args.budget_mb:
+                failures += 1
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
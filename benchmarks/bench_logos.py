@@ -0,0 +1,169 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import QPoint, Qt
+from PyQt5.QtGui import QColor, QImage
+from PyQt5.QtWidgets import QApplication, QTreeView
+from channel_model import ChannelTreeModel
+from logo_cache import LogoCache
+from logo_loader import LOGO_SIZE, LogoLoader, encode_png
+from m3u_parser import Channel
+
+# Distinct images served; logo URLs beyond that share them, as channels of
+# one network do, so the disk cache stores each image once
+IMAGES = 64
+
+
+class LogoHandler(BaseHTTPRequestHandler):
+    # Serves /<n>.png after server.latency seconds, recording each path
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+        time.sleep(server.latency)
+        body = server.images[int(self.path[1:-4]) % len(server.images)]
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/png')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(latency):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), LogoHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.requests = []
+    server.lock = threading.Lock()
+    server.images = []
+    for i in range(IMAGES):
+        # Full-size logos, as providers serve them
+        image = QImage(400, 240, QImage.Format_ARGB32)
+        image.fill(QColor.fromHsv(i * 360 // IMAGES, 200, 220))
+        server.images.append(encode_png(image))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def visible_rows(tree, model, parent):
+    top = tree.indexAt(QPoint(1, 1))
+    bottom = tree.indexAt(QPoint(1, tree.viewport().height() - 2))
+    last = bottom.row() if bottom.isValid() else model.rowCount(parent) - 1
+    return range(top.row(), last + 1) if top.isValid() else range(0)
+
+
+def scroll(app, tree, model, loader, args):
+    # Jumps --rows-per-frame rows at a time from top to bottom, a frame
+    # every 16 ms, then settles on the last page. Returns GUI-thread time
+    # per frame, the logo URLs that were on screen, and the peak memory
+    # the pixmaps took. All rows are fetched first: the tree laying out
+    # each fetched batch costs the same with logos or without.
+    parent = model.index(0, 0)
+    while model.canFetchMore(parent):
+        model.fetchMore(parent)
+    app.processEvents()
+    shown = set()
+    frames = []
+    peak = 0
+    for row in range(0, args.entries, args.rows_per_frame):
+        start = time.perf_counter()
+        tree.scrollTo(model.index(row, 0, parent), QTreeView.PositionAtTop)
+        app.processEvents()
+        frames.append(time.perf_counter() - start)
+        for visible in visible_rows(tree, model, parent):
+            shown.add(model.store.tvg_logo[model.channel_id(model.index(visible, 0, parent))])
+        peak = max(peak, loader.pixmaps.bytes)
+        time.sleep(max(0.0, 0.016 - frames[-1]))
+
+    # The last page, once its logos are in, has all of them
+    deadline = time.time() + 30
+    while loader.pending and time.time() < deadline:
+        app.processEvents()
+        time.sleep(0.01)
+    app.processEvents()
+    last_page = [model.index(row, 0, parent) for row in visible_rows(tree, model, parent)]
+    complete = model.logos is None or all(model.data(index, Qt.DecorationRole) is not None
+                                          for index in last_page)
+    frames.sort()
+    return {'frames': len(frames), 'frame_p50_ms': round(frames[len(frames) // 2] * 1000, 1),
+            'frame_p95_ms': round(frames[int(len(frames) * 0.95)] * 1000, 1),
+            'frame_max_ms': round(frames[-1] * 1000, 1), 'logos_shown': len(shown),
+            'peak_memory_kb': round(peak / 1024), 'last_page_complete': complete}, shown
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Scrolling a channel list without logos, then with them twice over one disk cache; "
+                    "exits 1 when logos off screen are fetched, pixmaps exceed the memory budget, logos "
+                    "fetched once are fetched again, or frames get more than --max-frame-ms slower")
+    parser.add_argument('--entries', type=int, default=100000)
+    parser.add_argument('--rows-per-frame', type=int, default=250)
+    parser.add_argument('--budget-kb', type=int, default=1024, help="Memory for logo pixmaps")
+    parser.add_argument('--latency-ms', type=int, default=50, help="Logo server delay per request")
+    parser.add_argument('--max-frame-ms', type=float, default=16,
+                        help="Largest rise in 95th percentile frame time over scrolling without logos")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    server = serve(args.latency_ms / 1000)
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    channels = [Channel(f"Channel {i}", f"http://streams.example/{i}.ts", tvg_logo=f"{base}/{i}.png")
+                for i in range(args.entries)]
+
+    failures = 0
+    cached = set()
+    with tempfile.TemporaryDirectory() as tmp:
+        # The last run is the next launch: a new loader over the same
+        # disk cache, scrolling the same way
+        baseline = None
+        for run in ('no logos', 'network', 'disk cache'):
+            fetched = len(server.requests)
+            model = ChannelTreeModel()
+            model.add_channels([(model.categories[0], channel) for channel in channels])
+            loader = LogoLoader(LogoCache(tmp), args.budget_kb * 1024)
+            model.logos = loader if run != 'no logos' else None
+            tree = QTreeView()
+            tree.setUniformRowHeights(True)
+            tree.setIconSize(LOGO_SIZE)
+            tree.setModel(model)
+            tree.resize(800, 600)
+            tree.show()
+            tree.expand(model.index(0, 0))
+            app.processEvents()
+
+            start = time.perf_counter()
+            result, shown = scroll(app, tree, model, loader, args)
+            requested = {f'{base}{path}' for path in server.requests[fetched:]}
+            only_visible = requested <= shown
+            baseline = baseline if baseline is not None else result['frame_p95_ms']
+            ok = (only_visible and result['peak_memory_kb'] <= args.budget_kb and result['last_page_complete']
+                  and result['frame_p95_ms'] <= baseline + args.max_frame_ms and not loader.failed)
+            refetched = requested & cached
+            ok = ok and not refetched
+            cached |= requested
+            failures += not ok
+            print(json.dumps(dict({'run': run, 'entries': args.entries, 'seconds': round(time.perf_counter() - start, 2),
+                                   'fetched': len(requested), 'refetched': len(refetched),
+                                   'only_visible_fetched': only_visible,
+                                   'failed': len(loader.failed), 'budget_kb': args.budget_kb},
+                                  **result, ok=ok)))
+            tree.close()
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,74 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from metrics import Metrics, metrics
+from playlist_reader import PlaylistReader
+from synthetic import write_playlist
+
+
+def per_call_ns(function, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        function()
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def read_playlist(path):
+    start = time.perf_counter()
+    count = sum(1 for _ in PlaylistReader([path]).read())
+    return count, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Cost of metrics when off and on, and a check that the instrumented paths record; "
+                    "exits 1 when an expected metric is missing")
+    parser.add_argument('--calls', type=int, default=1000000)
+    parser.add_argument('--entries', type=int, default=200000)
+    args = parser.parse_args()
+
+    registry = Metrics()
+
+    def span():
+        with registry.span('bench'):
+            pass
+
+    def count():
+        registry.count('bench')
+
+    result = {'noop_ns': round(per_call_ns(lambda: None, args.calls), 1)}
+    for enabled in (False, True):
+        registry.enabled = enabled
+        state = 'on' if enabled else 'off'
+        result[f'span_{state}_ns'] = round(per_call_ns(span, args.calls), 1)
+        result[f'count_{state}_ns'] = round(per_call_ns(count, args.calls), 1)
+    print(json.dumps(result))
+
+    missing = []
+    if registry.snapshot()['bench']['count'] != args.calls * 2:
+        missing.append('bench')
+
+    # A real read, with the process-wide registry off and then on
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'playlist.m3u')
+        write_playlist(path, args.entries, mixed=True)
+        read_playlist(path)
+        _, off = read_playlist(path)
+        metrics.enabled = True
+        count, on = read_playlist(path)
+    snapshot = metrics.snapshot()
+    missing += [name for name in ('playlist.download', 'playlist.parse', 'playlist.bytes', 'playlist.bytes_per_s')
+                if name not in snapshot]
+    print(json.dumps({'entries': count, 'read_off_s': round(off, 3), 'read_on_s': round(on, 3),
+                      'recorded': sorted(snapshot), 'missing': missing}))
+    return 1 if missing else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
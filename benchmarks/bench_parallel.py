@@ -0,0 +1,55 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import m3u_parallel
+from m3u_parallel import iter_m3u_file_parallel
+from m3u_parser import iter_m3u_file
+from synthetic import write_playlist
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(
+        description="Parallel vs. serial parse of a large local playlist, by worker count; "
+                    "exits 1 if any result differs from the serial parser's")
+    parser.add_argument('--entries', type=int, default=1000000)
+    parser.add_argument('--workers', default=','.join(str(n) for n in (2, 4, 8, 16) if n <= max(cores, 2)),
+                        help="Worker counts to try, comma separated")
+    args = parser.parse_args()
+
+    # Always the parallel path, whatever the file size
+    m3u_parallel.PARALLEL_MIN_BYTES = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'playlist.m3u')
+        write_playlist(path, args.entries, mixed=True)
+        header = {}
+        serial, serial_s = timed(lambda: list(iter_m3u_file(path, header=header)))
+        print(json.dumps({'cores': cores, 'entries': len(serial),
+                          'file_mb': round(os.path.getsize(path) / (1024 * 1024), 1),
+                          'serial_s': round(serial_s, 2)}))
+
+        mismatches = 0
+        for workers in map(int, args.workers.split(',')):
+            parallel_header = {}
+            channels, seconds = timed(lambda: list(iter_m3u_file_parallel(path, parallel_header, workers)))
+            identical = channels == serial and parallel_header == header
+            mismatches += not identical
+            print(json.dumps({'workers': workers, 'seconds': round(seconds, 2),
+                              'speedup': round(serial_s / seconds, 2), 'identical': identical}))
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
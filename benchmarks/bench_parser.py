@@ -0,0 +1,66 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from m3u_parser import iter_m3u_file, parse_m3u
+from synthetic import write_playlist
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def run_once(path, mode):
+    start = time.perf_counter()
+    if mode == 'stream':
+        count = sum(1 for _ in iter_m3u_file(path))
+    else:
+        # What PlaylistViewer did before: whole text, then splitlines
+        with open(path, encoding='utf-8') as f:
+            count = len(parse_m3u(f.read()))
+    elapsed = time.perf_counter() - start
+    return {
+        'mode': mode,
+        'entries': count,
+        'seconds': round(elapsed, 3),
+        'entries_per_sec': round(count / elapsed),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="M3U parser throughput and peak RSS")
+    parser.add_argument('--sizes', default='100000,1000000')
+    parser.add_argument('--modes', default='stream,legacy')
+    parser.add_argument('--file', help=argparse.SUPPRESS)
+    parser.add_argument('--mode', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.file:
+        # Child process: one measurement, so peak RSS is not shared between runs
+        print(json.dumps(run_once(args.file, args.mode)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in map(int, args.sizes.split(',')):
+            path = os.path.join(tmp, f'{size}.m3u')
+            write_playlist(path, size)
+            mb = os.path.getsize(path) / (1024 * 1024)
+            for mode in args.modes.split(','):
+                out = subprocess.check_output([sys.executable, __file__, '--file', path, '--mode', mode])
+                result = json.loads(out)
+                result['file_mb'] = round(mb, 1)
+                print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
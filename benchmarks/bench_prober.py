@@ -0,0 +1,122 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from stream_prober import DEAD, OK, SLOW, HealthTable, StreamProber
+
+MASTER = "#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=800000\nlow/index.m3u8\n"
+MEDIA = "#EXTM3U\n#EXT-X-TARGETDURATION:6\n#EXTINF:6.0,\nseg1.ts\n#EXTINF:6.0,\nseg2.ts\n"
+BROKEN = "#EXTM3U\n#EXT-X-TARGETDURATION:6\n"
+
+
+class EndpointHandler(BaseHTTPRequestHandler):
+    # /<kind>/<n>: good, slow and dead streams plus good and broken HLS
+    # manifests; a trickle stream starts at once but sends the rest late
+    protocol_version = 'HTTP/1.1'
+    slow_delay = 1.0
+
+    def do_GET(self):
+        kind = self.path.split('/')[1]
+        if kind == 'dead':
+            return self.reply(404, b'', 'text/plain')
+        if kind == 'slow':
+            time.sleep(self.slow_delay)
+        if kind == 'trickle':
+            return self.trickle(b'\x47' * 188 * 16, 'video/mp2t')
+        if kind == 'master.m3u8':
+            return self.reply(200, MASTER.encode(), 'application/vnd.apple.mpegurl')
+        if kind == 'media.m3u8':
+            return self.reply(200, MEDIA.encode(), 'application/vnd.apple.mpegurl')
+        if kind == 'broken.m3u8':
+            return self.reply(200, BROKEN.encode(), 'application/vnd.apple.mpegurl')
+        self.reply(200, b'\x47' * 188 * 16, 'video/mp2t')
+
+    def reply(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def trickle(self, body, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body[:188])
+        self.wfile.flush()
+        time.sleep(self.slow_delay)
+        self.wfile.write(body[188:])
+
+    def log_message(self, format, *args):
+        pass
+
+
+def endpoint_urls(base, count):
+    kinds = ['good', 'good', 'good', 'slow', 'trickle', 'dead', 'master.m3u8', 'media.m3u8', 'broken.m3u8']
+    expected = {'good': OK, 'slow': SLOW, 'trickle': OK, 'dead': DEAD, 'master.m3u8': OK,
+                'media.m3u8': OK, 'broken.m3u8': DEAD}
+    urls = {}
+    for i in range(count):
+        kind = kinds[i % len(kinds)]
+        urls[f'{base}/{kind}/{i}'] = expected[kind]
+    return urls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream prober throughput, classification and rate limiting")
+    parser.add_argument('--streams', type=int, default=800)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 16, 64, 128])
+    parser.add_argument('--host-rate', type=float, default=50.0)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), EndpointHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    # Slow streams take 1 s here; classify them against a 0.5 s threshold
+    urls = endpoint_urls(base, args.streams)
+
+    for concurrency in args.concurrency:
+        prober = StreamProber(concurrency, per_host=concurrency, host_rate=0, slow_ttfb=0.5)
+        start = time.perf_counter()
+        results = prober.probe(urls)
+        elapsed = time.perf_counter() - start
+        # Under heavy load this server itself gets slow, so good streams may really be slow
+        wrong = sum(result.status != urls[result.url] for result in results)
+        print(json.dumps({'concurrency': concurrency, 'streams': len(results),
+                          'statuses': Counter(result.status for result in results),
+                          'misclassified': wrong, 'probe_s': round(elapsed, 2),
+                          'streams_per_s': round(len(results) / elapsed, 1)}))
+
+    # One host, rate limited: starts must not outpace host_rate
+    limited = dict(list(urls.items())[:100])
+    prober = StreamProber(64, per_host=8, host_rate=args.host_rate, slow_ttfb=0.5)
+    start = time.perf_counter()
+    results = prober.probe(limited)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({'host_rate': args.host_rate, 'streams': len(results),
+                      'probe_s': round(elapsed, 2), 'min_expected_s': round((len(limited) - 1) / args.host_rate, 2)}))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        table = HealthTable(os.path.join(tmp, 'health.sqlite'))
+        start = time.perf_counter()
+        table.store(results)
+        stored = time.perf_counter() - start
+        start = time.perf_counter()
+        loaded = table.load()
+        print(json.dumps({'health_rows': len(loaded), 'store_ms': round(stored * 1000, 1),
+                          'load_ms': round((time.perf_counter() - start) * 1000, 1)}))
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
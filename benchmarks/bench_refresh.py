@@ -0,0 +1,144 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import QModelIndex, QPersistentModelIndex
+from PyQt5.QtWidgets import QApplication, QTreeView
+from categorizer import Categorizer
+from channel_model import ChannelTreeModel
+from m3u_parser import Channel
+from playlist_diff import Fingerprints
+from playlist_reader import PlaylistReader
+from synthetic import write_playlist
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def churn(channels, share, rng, round_number):
+    # The playlist again with ``share`` of it changed: a third removed, a
+    # third retitled, a third new entries at random places
+    count = max(3, int(len(channels) * share)) // 3
+    picked = rng.sample(range(len(channels)), 2 * count)
+    removed = set(picked[:count])
+    retitled = set(picked[count:])
+    result = []
+    for i, channel in enumerate(channels):
+        if i in removed:
+            continue
+        if i in retitled:
+            channel = Channel(channel.title + ' +1', channel.url, channel.duration, channel.tvg_id,
+                              channel.tvg_name, channel.tvg_logo, channel.group_title, channel.catchup,
+                              channel.source, channel.attrs, channel.options)
+        result.append(channel)
+    for i in range(count):
+        new = Channel(f"New channel {round_number}.{i}", f"http://new.example/{round_number}/{i}.ts",
+                      source=channels[0].source)
+        result.insert(rng.randrange(len(result) + 1), new)
+    return result
+
+
+def fields(channel):
+    return tuple(repr(getattr(channel, name)) for name in Channel.__slots__)
+
+
+def check(model, channels, categories):
+    # The model lists exactly ``channels`` under their categories, each
+    # category's rows stay in order, and the fingerprints match the store
+    store = model.store
+    expected = [Counter() for _ in model.categories]
+    for channel, category in zip(channels, categories):
+        expected[model.category_rows[category]][fields(channel)] += 1
+    listed = [Counter(fields(store.get(channel_id)) for channel_id in rows) for rows in model.rows]
+    ordered = all(list(map(store.order_key, rows)) == sorted(map(store.order_key, rows)) for rows in model.rows)
+    fingerprints = Fingerprints.from_store(store)
+    same_fingerprints = sorted(fingerprints.digests.values()) == sorted(model.fingerprints.digests.values()) \
+        and len(fingerprints) == len(model.fingerprints)
+    return listed == expected and ordered and same_fingerprints and store.live_count() == len(channels)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Incremental playlist refresh vs. a full reload, by churn; exits 1 when the "
+                    "refreshed list differs from the new playlist")
+    parser.add_argument('--entries', type=int, default=500000)
+    parser.add_argument('--churn', type=float, default=0.01, help="Share of entries changed per refresh")
+    parser.add_argument('--rounds', type=int, default=2)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    rng = random.Random(0)
+    categorizer = Categorizer()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'playlist.m3u')
+        write_playlist(path, args.entries, mixed=True)
+        channels = list(PlaylistReader([path]).read())
+    categories = categorizer.classify_many(channels)
+
+    model = ChannelTreeModel(categorizer.categories)
+    tree = QTreeView()
+    tree.setUniformRowHeights(True)
+    tree.setModel(model)
+    tree.resize(800, 600)
+    tree.show()
+
+    def reload():
+        model.clear()
+        model.add_channels(list(zip(categories, channels)))
+        tree.expandToDepth(0)
+        app.processEvents()
+
+    _, reload_s = timed(reload)
+    print(json.dumps({'entries': len(channels), 'full_reload_s': round(reload_s, 3)}))
+
+    failures = 0
+    selected = QPersistentModelIndex(model.index(5, 0, model.index(0, 0)))
+    fingerprints = None
+    for round_number in range(args.rounds + 1):
+        # The last round refreshes with a search active, which filters again
+        filtered = round_number == args.rounds
+        if filtered:
+            model.set_filter('sport')
+        channels = churn(channels, args.churn, rng, round_number)
+        categories = categorizer.classify_many(channels)
+        store = model.store
+        if fingerprints is None:
+            fingerprints, fingerprint_s = timed(Fingerprints.from_store, store)
+        else:
+            fingerprint_s = 0.0
+        diff, diff_s = timed(fingerprints.diff, channels, categories)
+        selected_id = model.channel_id(QModelIndex(selected))
+        _, apply_s = timed(lambda: (model.apply_diff(diff), app.processEvents()))
+        fingerprints = model.fingerprints
+        ok = check(model, channels, categories)
+        # The row opened last still shows the same channel, unless that one changed
+        kept = model.channel_id(QModelIndex(selected)) == selected_id or \
+            selected_id in diff.removed or any(channel_id == selected_id for channel_id, _, _ in diff.changed)
+        ok = ok and (filtered or kept)
+        if filtered:
+            visible = model.visible
+            model.update_visible()
+            ok = ok and visible == model.visible
+        failures += not ok
+        print(json.dumps({'round': round_number + 1, 'filtered': filtered, 'changes': len(diff),
+                          'added': len(diff.added), 'removed': len(diff.removed), 'changed': len(diff.changed),
+                          'fingerprint_s': round(fingerprint_s, 3), 'diff_s': round(diff_s, 3),
+                          'apply_s': round(apply_s, 4), 'apply_vs_reload': round(apply_s / reload_s, 4),
+                          'selection_kept': kept,
+                          'correct': ok}))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,46 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from channel_search import SearchIndex
+from synthetic import WORDS
+
+# Simulated typing: every prefix of each query is searched in turn
+QUERIES = ['bbc sport', 'الجزيرة', 'cinema 12', 'cartoon mtv', 'xyzzy', 'sprot']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Channel search index build and query time")
+    parser.add_argument('--entries', type=int, default=1000000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    titles = [f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}" for i in range(args.entries)]
+
+    index = SearchIndex()
+    start = time.perf_counter()
+    for title in titles:
+        index.add(title)
+    build = time.perf_counter() - start
+    print(json.dumps({'entries': args.entries, 'build_s': round(build, 2),
+                      'trigrams': len(index.postings)}))
+
+    for query in QUERIES:
+        timings = []
+        for end in range(1, len(query) + 1):
+            start = time.perf_counter()
+            results = index.search(query[:end])
+            timings.append((time.perf_counter() - start) * 1000)
+        print(json.dumps({'query': query, 'results': len(results),
+                          'last_ms': round(timings[-1], 2),
+                          'max_ms_3plus_chars': round(max(timings[2:]), 2),
+                          'first_char_ms': round(timings[0], 2)}, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
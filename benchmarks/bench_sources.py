@@ -0,0 +1,64 @@
+import argparse
+import functools
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from categorizer import Categorizer
+from playlist_loader import PlaylistLoader
+from synthetic import write_playlist
+
+
+class SlowHandler(SimpleHTTPRequestHandler):
+    # /<delay>/<file> waits <delay> seconds before answering
+    def do_GET(self):
+        _, delay, name = self.path.split('/', 2)
+        time.sleep(float(delay))
+        self.path = '/' + name
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-source load time vs. slowest source")
+    parser.add_argument('--sources', type=int, default=4)
+    parser.add_argument('--entries', type=int, default=20000)
+    parser.add_argument('--delay', type=float, default=1.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.sources):
+            write_playlist(os.path.join(tmp, f'{i}.m3u'), args.entries, seed=i)
+        server = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(SlowHandler, directory=tmp))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base = f'http://127.0.0.1:{server.server_address[1]}'
+        delays = [args.delay * (i + 1) / args.sources for i in range(args.sources)]
+        urls = [f'{base}/{delay}/{i}.m3u' for i, delay in enumerate(delays)]
+
+        # run() is called directly: the loader's thread pool does the fetching
+        loader = PlaylistLoader(urls, Categorizer())
+        start = time.perf_counter()
+        loader.run()
+        elapsed = time.perf_counter() - start
+        server.shutdown()
+
+    print(json.dumps({
+        'sources': args.sources,
+        'entries': loader.entries,
+        'duplicates': loader.reader.duplicates,
+        'slowest_source_delay_s': max(delays),
+        'sum_of_delays_s': round(sum(delays), 2),
+        'load_s': round(elapsed, 2),
+    }))
+
+
+if __name__ == '__main__':
+    main()
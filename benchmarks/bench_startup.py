@@ -0,0 +1,58 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Startup phases up to and including this one make up the time to first window
+FIRST_WINDOW = 'first window'
+
+
+def startup(home, path):
+    # One cold start of main.py, in a fresh interpreter with an empty home
+    # directory so no settings or caches carry over
+    subprocess.check_call([sys.executable, os.path.join(ROOT, 'main.py'),
+                           '--profile-startup', path, '--quit-after-startup'], cwd=ROOT,
+                          env=dict(os.environ, QT_QPA_PLATFORM='offscreen', HOME=home),
+                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    with open(path, encoding='utf-8') as f:
+        report = json.load(f)
+    first_window = 0.0
+    for name, ms in report['phases'].items():
+        first_window += ms
+        if name == FIRST_WINDOW:
+            break
+    return first_window, report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time from interpreter start to the first window of main.py; "
+                    "exits 1 when the median is over the budget")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=250.0, help="Milliseconds")
+    args = parser.parse_args()
+
+    samples = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'startup.json')
+        for _ in range(args.runs):
+            first_window, report = startup(tmp, path)
+            samples.append(first_window)
+    samples.sort()
+    median = samples[len(samples) // 2]
+    print(json.dumps({'runs': args.runs, 'first_window_ms': round(median, 1),
+                      'worst_ms': round(samples[-1], 1), 'budget_ms': args.budget,
+                      'phases': report['phases'],
+                      'slowest_imports': dict(sorted(report['imports'].items(), key=lambda item: -item[1])[:5])}))
+    if median > args.budget:
+        print(f"time to first window {median:.1f} ms is over the {args.budget:.0f} ms budget", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
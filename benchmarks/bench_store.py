@@ -0,0 +1,114 @@
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from array import array
+from itertools import islice
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from channel_store import ChannelStore
+from m3u_parser import iter_m3u_file
+from synthetic import GROUPS, write_playlist
+
+BATCH = 1000
+
+
+def build_objects(path):
+    # What the player kept before: a Channel object per entry, category
+    # arrays of positions, and the viewer's title -> Channel dict
+    channels = []
+    category_of = array('B')
+    rows = [array('I') for _ in GROUPS]
+    by_title = {}
+    for position, channel in enumerate(iter_m3u_file(path)):
+        row = GROUPS.index(channel.group_title)
+        channels.append(channel)
+        category_of.append(row)
+        rows[row].append(position)
+        by_title[channel.title] = channel
+    return channels, category_of, rows, by_title
+
+
+def build_store(path):
+    store = ChannelStore(GROUPS)
+    channels = iter_m3u_file(path)
+    while True:
+        batch = list(islice(channels, BATCH))
+        if not batch:
+            return store
+        store.extend(batch, [channel.group_title for channel in batch])
+
+
+def time_lookups(store, entries):
+    # First lookup builds the index; the median of the rest is a plain lookup
+    result = {}
+    probe = store.get(entries // 2)
+    for field in ChannelStore.INDEXED_FIELDS:
+        value = getattr(probe, field)
+        start = time.perf_counter()
+        store.find(field, value)
+        result[f'{field}_index_build_s'] = round(time.perf_counter() - start, 3)
+        timings = []
+        for _ in range(101):
+            start = time.perf_counter()
+            store.find(field, value)
+            timings.append(time.perf_counter() - start)
+        result[f'{field}_lookup_us'] = round(sorted(timings)[50] * 1e6, 1)
+    return result
+
+
+def run_once(path, entries, mode):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    kept = build_objects(path) if mode == 'objects' else build_store(path)
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    result = {
+        'mode': mode,
+        'entries': entries,
+        'build_s': round(elapsed, 2),
+        'mb': round(size / (1024 * 1024), 1),
+        'bytes_per_channel': round(size / entries, 1),
+    }
+    if mode == 'store':
+        result.update(time_lookups(kept, entries))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory per channel: Channel objects vs the columnar store")
+    parser.add_argument('--entries', type=int, default=1000000)
+    parser.add_argument('--modes', default='objects,store')
+    parser.add_argument('--path', help=argparse.SUPPRESS)
+    parser.add_argument('--mode', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_once(args.path, args.entries, args.mode)))
+        return
+
+    # Each mode in its own process, so neither sees the other's garbage
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'playlist.m3u')
+        write_playlist(path, args.entries)
+        results = []
+        for mode in args.modes.split(','):
+            out = subprocess.check_output([sys.executable, __file__, '--entries', str(args.entries),
+                                           '--path', path, '--mode', mode])
+            results.append(json.loads(out))
+            print(out.decode().strip())
+        if len(results) == 2:
+            print(json.dumps({'reduction': round(results[0]['bytes_per_channel'] / results[1]['bytes_per_channel'], 1)}))
+
+
+if __name__ == '__main__':
+    main()
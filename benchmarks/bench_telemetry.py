@@ -0,0 +1,103 @@
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import vlc
+from PyQt5.QtCore import QTimer
+from PyQt5.QtWidgets import QApplication, QLabel, QSlider
+from playback_telemetry import PlaybackTelemetry, format_time
+
+
+def cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def polling(player, label, slider):
+    # The old MediaPlayer.update_ui, every 100 ms
+    def update_ui():
+        slider.setValue(int(player.get_position() * 1000))
+        if player.is_playing():
+            time_current = player.get_time() // 1000
+            duration = player.get_length() // 1000
+            label.setText(f"{time_current // 60:02d}:{time_current % 60:02d} / "
+                          f"{duration // 60:02d}:{duration % 60:02d}")
+    timer = QTimer()
+    timer.setInterval(100)
+    timer.timeout.connect(update_ui)
+    timer.start()
+    return timer
+
+
+def event_driven(player, label, slider):
+    # Same refresh as MediaPlayer.refresh_playback, one per 60 Hz frame at most
+    telemetry = PlaybackTelemetry(player)
+    refresh_timer = QTimer()
+    refresh_timer.setSingleShot(True)
+    last = [0.0]
+
+    def refresh():
+        telemetry.take()
+        last[0] = time.perf_counter()
+        text = f"{format_time(telemetry.time)} / {format_time(telemetry.length)}"
+        if label.text() != text:
+            label.setText(text)
+        position = int(telemetry.position * 1000)
+        if slider.value() != position:
+            slider.setValue(position)
+        telemetry.sample_stats()
+
+    def changed():
+        wait = last[0] + 1 / 60 - time.perf_counter()
+        if wait > 0:
+            if not refresh_timer.isActive():
+                refresh_timer.start(int(wait * 1000) + 1)
+            return
+        refresh()
+
+    refresh_timer.timeout.connect(refresh)
+    telemetry.changed.connect(changed)
+    return telemetry, refresh_timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GUI-side CPU while playing: 100 ms polling vs. VLC events")
+    parser.add_argument('media', help="Local media file or stream URL, at least --seconds long")
+    parser.add_argument('--seconds', type=float, default=20.0)
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    for label_text, setup in (('polling', polling), ('events', event_driven)):
+        # Dummy outputs keep decoding cost out of the comparison as far as possible
+        instance = vlc.Instance('--aout=dummy', '--vout=dummy', '--quiet')
+        player = instance.media_player_new()
+        label, slider = QLabel(), QSlider()
+        slider.setMaximum(1000)
+        keep = setup(player, label, slider)
+        player.set_media(instance.media_new(args.media))
+        player.play()
+
+        start_cpu, start = cpu_seconds(), time.perf_counter()
+        deadline = start + args.seconds
+        while time.perf_counter() < deadline:
+            app.processEvents()
+            time.sleep(0.005)
+        elapsed = time.perf_counter() - start
+        cpu = cpu_seconds() - start_cpu
+
+        player.stop()
+        player.release()
+        instance.release()
+        del keep
+        print(json.dumps({'mode': label_text, 'seconds': round(elapsed, 1),
+                          'process_cpu_percent': round(cpu / elapsed * 100, 2)}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import json
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import vlc
+from zapper import ChannelZapper
+
+
+def zap_through(zapper, media, rounds, fresh, timeout):
+    # Zaps through ``media`` in order; ``fresh`` builds new Media every time
+    # and skips neighbour preparation, like the player did before
+    started = threading.Event()
+    timings = []
+    zapper.on_started = lambda url, seconds, event: (timings.append((seconds, event)), started.set())
+    missed = 0
+    for _ in range(rounds):
+        for i, path in enumerate(media):
+            if fresh:
+                zapper.cache.clear()
+                neighbours = ()
+            else:
+                neighbours = media[i + 1:i + 1 + ChannelZapper.NEIGHBOURS]
+            started.clear()
+            zapper.switch(path, neighbours)
+            if not started.wait(timeout):
+                missed += 1
+    return timings, missed
+
+
+def summary(label, timings, missed):
+    seconds = sorted(seconds for seconds, _ in timings)
+    result = {'mode': label, 'zaps': len(seconds), 'missed': missed}
+    if seconds:
+        result.update(median_ms=round(seconds[len(seconds) // 2] * 1000, 1),
+                      worst_ms=round(seconds[-1] * 1000, 1),
+                      first_event=sorted({event for _, event in timings}))
+    return result
+
+
+def main():
+    # Headless: VLC's dummy audio and video outputs, local media files
+    parser = argparse.ArgumentParser(description="Zap time from switch request to first Playing/Vout event")
+    parser.add_argument('media', nargs='+', help="Local media files or stream URLs to zap through")
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--timeout', type=float, default=10.0)
+    args = parser.parse_args()
+
+    instance = vlc.Instance('--aout=dummy', '--vout=dummy', '--no-video-title-show', '--quiet')
+    player = instance.media_player_new()
+    zapper = ChannelZapper(instance, player)
+    try:
+        for label, fresh in (('fresh media', True), ('cached and prepared', False)):
+            timings, missed = zap_through(zapper, args.media, args.rounds, fresh, args.timeout)
+            print(json.dumps(summary(label, timings, missed)))
+    finally:
+        player.stop()
+        zapper.cache.clear()
+        player.release()
+        instance.release()
+
+
+if __name__ == '__main__':
+    main()
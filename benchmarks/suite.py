@@ -0,0 +1,258 @@
+import argparse
+import functools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from synthetic import write_playlist
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+# A result regresses when it is this much worse than its baseline...
+TOLERANCE = 0.5
+# ...and worse by more than these, so millisecond timings and small
+# heaps do not fail on noise
+MIN_SLOWDOWN_S = 0.1
+MIN_GROWTH_MB = 10.0
+
+# Search terms typed into the viewer's search box
+QUERIES = ['bbc', 'الجزيرة', 'sport 12', 'xyzzy', '']
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+# Each case runs in its own interpreter, gets the playlist path (or URL)
+# and returns how many channels it handled. Only the call is timed; setup
+# such as creating the QApplication is not.
+
+def read_channels(path):
+    from m3u_parser import iter_m3u_file
+    return list(iter_m3u_file(path))
+
+
+def make_viewer():
+    from PyQt5.QtWidgets import QApplication
+    from playlist_viewer import PlaylistViewer
+    app = QApplication(sys.argv)
+    viewer = PlaylistViewer()
+    viewer.app = app
+    return viewer
+
+
+def case_parse(path):
+    from m3u_parser import parse_m3u
+    with open(path, encoding='utf-8') as f:
+        content = f.read()
+    return lambda: len(parse_m3u(content))
+
+
+def case_parse_stream(path):
+    from m3u_parser import iter_m3u_file
+    return lambda: sum(1 for _ in iter_m3u_file(path))
+
+
+def case_categorize(path):
+    # PlaylistViewer.categorize_channels: classify and add to the model
+    viewer = make_viewer()
+    channels = read_channels(path)
+    return lambda: viewer.categorize_channels(channels)
+
+
+def case_filter(path):
+    viewer = make_viewer()
+    count = viewer.categorize_channels(read_channels(path))
+    viewer.tree.expandToDepth(0)
+
+    def run():
+        for query in QUERIES:
+            viewer.search_input.setText(query)
+            viewer.filter_channels()
+        return count * len(QUERIES)
+    return run
+
+
+def case_tree(path):
+    # From the first batch to the painted, expanded tree
+    viewer = make_viewer()
+    channels = read_channels(path)
+    batch = list(zip(viewer.categorizer.classify_many(channels), channels))
+
+    def run():
+        viewer.add_channels(batch)
+        viewer.show()
+        viewer.tree.expandToDepth(0)
+        viewer.app.processEvents()
+        viewer.tree.viewport().repaint()
+        return len(batch)
+    return run
+
+
+def case_combo(path):
+    # The toolbar combo: switch through every category, open the popup
+    from PyQt5.QtWidgets import QComboBox
+    viewer = make_viewer()
+    model = viewer.model
+    count = viewer.categorize_channels(read_channels(path))
+    combo = QComboBox()
+    combo.setEditable(True)
+    combo.setModel(model)
+    combo.view().setUniformItemSizes(True)
+    combo.show()
+
+    def run():
+        for category in model.categories:
+            combo.setRootModelIndex(model.index(model.category_rows[category], 0))
+            combo.setCurrentIndex(-1)
+            combo.showPopup()
+            viewer.app.processEvents()
+            combo.hidePopup()
+        return count
+    return run
+
+
+def case_download(url):
+    from playlist_reader import PlaylistReader
+    return lambda: sum(1 for _ in PlaylistReader([url]).read())
+
+
+CASES = {
+    'parse': case_parse,
+    'parse_stream': case_parse_stream,
+    'categorize': case_categorize,
+    'filter': case_filter,
+    'tree': case_tree,
+    'combo': case_combo,
+    'download': case_download,
+}
+
+
+def run_case(name, source):
+    run = CASES[name](source)
+    start = time.perf_counter()
+    channels = run()
+    elapsed = time.perf_counter() - start
+    return {'channels': channels, 'seconds': round(elapsed, 4), 'peak_rss_mb': round(peak_rss_mb(), 1)}
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+def run_child(case, entries, source, env):
+    # Qt's warnings on the offscreen platform are only shown on failure
+    child = subprocess.run([sys.executable, __file__, '--run', case, source], env=env,
+                           capture_output=True, text=True)
+    if child.returncode:
+        sys.stderr.write(child.stderr)
+        raise SystemExit(f"{case} at {entries} entries failed")
+    return json.loads(child.stdout)
+
+
+def run_suite(cases, sizes, repeat):
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        server = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(QuietHandler, directory=tmp))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        # An empty home directory, so no rules file, cache or settings
+        # of the user's changes the results
+        env = dict(os.environ, QT_QPA_PLATFORM='offscreen', HOME=tmp)
+        try:
+            for entries in sizes:
+                name = f'{entries}.m3u'
+                path = os.path.join(tmp, name)
+                write_playlist(path, entries, mixed=True)
+                for case in cases:
+                    source = f'http://127.0.0.1:{server.server_address[1]}/{name}' if case == 'download' else path
+                    # The fastest of several runs; slower ones measure the machine
+                    runs = [run_child(case, entries, source, env) for _ in range(repeat)]
+                    result = dict(case=case, entries=entries, **min(runs, key=lambda run: run['seconds']))
+                    result['entries_per_sec'] = round(entries / result['seconds']) if result['seconds'] else None
+                    print(json.dumps(result), file=sys.stderr)
+                    results.append(result)
+        finally:
+            server.shutdown()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    # Returns a message per result that is worse than its baseline
+    known = {(result['case'], result['entries']): result for result in baseline['results']}
+    regressions = []
+    for result in results:
+        base = known.get((result['case'], result['entries']))
+        if base is None:
+            continue
+        for key, slack, unit in (('seconds', MIN_SLOWDOWN_S, 's'), ('peak_rss_mb', MIN_GROWTH_MB, 'MB')):
+            limit = max(base[key] * (1 + tolerance), base[key] + slack)
+            if result[key] > limit:
+                regressions.append(f"{result['case']} at {result['entries']} entries: {key} "
+                                   f"{result[key]}{unit} vs. baseline {base[key]}{unit}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark suite over synthetic playlists: wall time, peak memory and "
+                    "entries/s per case, compared against a stored baseline")
+    parser.add_argument('--sizes', default='1000,10000,100000', help="Playlist entries, comma separated (up to 1000000)")
+    parser.add_argument('--cases', default=','.join(CASES), help="Comma separated; default: all of them")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per case and size; the fastest counts")
+    parser.add_argument('--output', help="Write the results as JSON here")
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    parser.add_argument('--update-baseline', action='store_true', help="Store these results as the new baseline")
+    parser.add_argument('--run', nargs=2, metavar=('CASE', 'SOURCE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        # Child process: one measurement, so peak RSS is not shared between runs
+        print(json.dumps(run_case(*args.run)))
+        return 0
+
+    cases = args.cases.split(',')
+    unknown = set(cases) - set(CASES)
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(sorted(unknown))}")
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': run_suite(cases, [int(size) for size in args.sizes.split(',')], args.repeat),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --update-baseline to store one", file=sys.stderr)
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        regressions = compare(report['results'], json.load(f), args.tolerance)
+    for message in regressions:
+        print(f"regression: {message}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
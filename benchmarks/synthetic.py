@@ -0,0 +1,71 @@
+import random
+
+GROUPS = ['News', 'Sports', 'Movies', 'Kids', 'Music', 'Series', 'Documentary', 'General']
+WORDS = ['Al Jazeera', 'BBC', 'Sport', 'Cinema', 'Cartoon', 'MTV', 'Drama', 'TV',
+         'الجزيرة', 'رياضة', 'أفلام', 'أطفال', 'أخبار', 'مسلسلات']
+
+# Provider group-title prefixes seen in the wild
+PREFIXES = ['AR', 'UK', 'US', 'FR', 'VOD', '']
+
+# Lines that real playlists carry between entries and the parser must skip
+JUNK = ['', '#EXTGRP:Misc', '# generated by panel v2', 'not a playlist line',
+        '#EXTINF:-1 tvg-id="orphan",Entry without a URL', '#PLAYLIST:Everything']
+
+
+def write_playlist(path, entries, seed=0, mixed=False):
+    # Write a provider-style M3U playlist with ``entries`` channels. With
+    # ``mixed``, entries vary the way real exports do: optional and extra
+    # attributes, catch-up options, titles with commas and quotes, repeated
+    # channels (about 5%) and junk lines (about 2%). The same arguments
+    # always give the same file.
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('#EXTM3U x-tvg-url="http://epg.example/guide.xml.gz"\n' if mixed else '#EXTM3U\n')
+        for i in range(entries):
+            if mixed:
+                f.write(mixed_entry(rng, i))
+                continue
+            group = rng.choice(GROUPS)
+            title = f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}"
+            f.write(f'#EXTINF:-1 tvg-id="ch{i}.example" tvg-name="{title}" '
+                    f'tvg-logo="http://logos.example/{i}.png" group-title="{group}",{title}\n')
+            if i % 7 == 0:
+                f.write('#EXTVLCOPT:http-user-agent=Mozilla/5.0\n')
+            f.write(f'http://streams.example:8080/live/user/pass/{i}.ts\n')
+
+
+def mixed_entry(rng, i):
+    lines = []
+    roll = rng.random()
+    if roll < 0.02:
+        lines.append(rng.choice(JUNK))
+    # A repeat of an earlier channel, as merged provider lists have
+    n = rng.randrange(i) if i and 0.02 <= roll < 0.07 else i
+    # Everything else follows from n, so a repeat matches the original
+    mix = n * 2654435761 % 4294967296
+    title = f"{WORDS[mix % len(WORDS)]} {WORDS[mix // 16 % len(WORDS)]} {n}"
+    if n % 11 == 0:
+        title += ', HD'
+    prefix = PREFIXES[mix // 256 % len(PREFIXES)]
+    group = GROUPS[mix // 4096 % len(GROUPS)]
+    if prefix:
+        group = f"{prefix} | {group}"
+
+    attrs = []
+    if n % 5:
+        attrs.append(f'tvg-id="ch{n}.example"')
+    if n % 3:
+        attrs.append(f'tvg-name="{title}"')
+    if n % 4:
+        attrs.append(f'tvg-logo="http://logos.example/{n}.png"')
+    attrs.append(f'group-title="{group}"')
+    if n % 9 == 0:
+        attrs.append('catchup="default" catchup-days="3"')
+    lines.append(f'#EXTINF:-1 {" ".join(attrs)},{title}')
+    if n % 7 == 0:
+        lines.append('#EXTVLCOPT:http-user-agent=Mozilla/5.0')
+    if n % 13 == 0:
+        lines.append('#KODIPROP:inputstream.adaptive.license_type=clearkey')
+    extension = 'm3u8' if n % 6 == 0 else 'ts'
+    lines.append(f'http://streams.example:8080/live/user/pass/{n}.{extension}')
+    return '\n'.join(lines) + '\n'
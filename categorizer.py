@@ -0,0 +1,250 @@
+import hashlib
+import json
+import os
+import re
+from itertools import compress
+from operator import not_
+from channel_search import normalize
+
+# User-editable rules; when the file is missing the built-in rules are used
+CONFIG_PATH = os.path.join(os.path.expanduser('~'), '.config', 'universal-media-player', 'categories.json')
+
+# ``categories`` is the display order. ``rules`` are tried in priority order;
+# a keyword matches whole words only, unless it ends in "*" (word prefix),
+# and may span several words. A channel number glued on ("MTV2") still
+# counts as the whole word. ``groups`` are extra keywords that only apply
+# to a provider's group-title. A channel's group-title decides first, then
+# its tvg-name and tvg-id, then its title.
+DEFAULT_RULES = {
+    "default": "Live TV",
+    "categories": ["Live TV", "Movies", "Series", "Sports", "News", "Kids", "Music", "Others"],
+    "rules": [
+        {"category": "News",
+         "keywords": ["news", "cnn", "bbc", "aljazeera", "jazeera",
+                      "أخبار", "إخبارية", "الجزيرة"],
+         "groups": ["أخبار"]},
+        {"category": "Movies",
+         "keywords": ["movie*", "film*", "cinema*", "أفلام", "فيلم", "سينما"],
+         "groups": ["vod", "box office"]},
+        {"category": "Series",
+         "keywords": ["series", "show", "shows", "drama*", "مسلسل*", "دراما"],
+         "groups": ["tv shows"]},
+        {"category": "Sports",
+         "keywords": ["sport*", "football", "soccer", "tennis", "رياضة", "رياضية", "كرة"],
+         "groups": []},
+        {"category": "Kids",
+         "keywords": ["kids", "child*", "cartoon*", "أطفال", "كرتون"],
+         "groups": []},
+        {"category": "Music",
+         "keywords": ["music*", "mtv", "song*", "موسيقى", "أغاني"],
+         "groups": []},
+    ],
+}
+
+
+# Bumped when the same rules would categorize channels differently, so
+# categories cached by an older version are not reused
+ENGINE_VERSION = 2
+
+# Folds ASCII digits to '0' in UTF-8 titles. Digits stay word characters,
+# so keywords without digits match a folded title exactly as the original.
+FOLD_DIGITS = bytes.maketrans(b'123456789', b'000000000')
+
+
+def keyword_pattern(keyword):
+    keyword = normalize(keyword.strip())
+    prefix = keyword.endswith('*')
+    keyword = keyword.rstrip('*')
+    pattern = re.escape(keyword).replace(r'\ ', r'[ \t]+')
+    if '\u0621' <= keyword[:1] <= '\u064a':
+        # Arabic words usually carry the definite article
+        pattern = '(?:ال)?' + pattern
+    return pattern if prefix else pattern + r'\d*\b'
+
+
+def compile_rules(rules, key_lists, phrases=None):
+    # One alternation with a named group per rule, so a single scan finds
+    # every keyword and ``lastgroup`` tells which rule it belongs to.
+    # ``phrases`` selects only multi-word (True) or single-word (False) keywords.
+    alternatives = []
+    for number, rule in enumerate(rules):
+        keywords = [keyword for key in key_lists for keyword in rule.get(key, [])
+                    if phrases is None or (' ' in keyword.strip()) == phrases]
+        if keywords:
+            patterns = '|'.join(keyword_pattern(keyword) for keyword in keywords)
+            alternatives.append(f'(?P<r{number}>{patterns})')
+    if not alternatives:
+        return None
+    return re.compile(r'\b(?:' + '|'.join(alternatives) + ')')
+
+
+class Categorizer:
+    # Group-titles are classified once each and cached. Titles are split on
+    # whitespace and each distinct word is classified once and cached, so
+    # a title costs about one dict lookup per word; only titles of rules
+    # with multi-word keywords need a regex scan. Batches go further: whole
+    # titles and tvg hints, with channel numbers folded away, are cached
+    # with their category, and are looked up with C-level joins, splits and
+    # maps.
+    WORD_CACHE_SIZE = 200000
+
+    def __init__(self, config=None):
+        config = config or DEFAULT_RULES
+        self.default = config.get('default', 'Live TV')
+        self.rules = config['rules']
+        self.categories = list(config.get('categories') or [])
+        for name in [self.default] + [rule['category'] for rule in self.rules]:
+            if name not in self.categories:
+                self.categories.append(name)
+        self.word_re = compile_rules(self.rules, ['keywords'], phrases=False)
+        self.phrase_re = compile_rules(self.rules, ['keywords'], phrases=True)
+        self.group_re = compile_rules(self.rules, ['keywords', 'groups'])
+        self.group_cache = {'': None}
+        self.word_cache = {}
+        self.title_cache = {}       # Folded title (bytes) -> category
+        self.hint_cache = {}        # Folded tvg hint (bytes) -> category, '' when it decides nothing
+        self.fold_digits = not any(ch.isdigit() for rule in self.rules
+                                   for keyword in rule.get('keywords', []) for ch in keyword)
+        # Identifies the rules, so cached categorizations can be invalidated
+        state = json.dumps({'engine': ENGINE_VERSION, 'config': config}, sort_keys=True)
+        self.fingerprint = hashlib.sha1(state.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def load(cls, path=CONFIG_PATH):
+        if not os.path.exists(path):
+            return cls()
+        try:
+            with open(path, encoding='utf-8') as f:
+                config = json.load(f)
+            return cls(config)
+        except (KeyError, TypeError, re.error) as e:
+            raise ValueError(f"Invalid category rules in {path}: {e}") from e
+
+    def match(self, regex, text):
+        # Highest-priority rule with a keyword in ``text``, or None
+        if regex is None or not text:
+            return None
+        best = None
+        for m in regex.finditer(normalize(text)):
+            number = int(m.lastgroup[1:])
+            if best is None or number < best:
+                best = number
+                if best == 0:
+                    break
+        return best
+
+    def match_word(self, word):
+        if word.isdigit():
+            # Channel numbers are endless and never keywords; keep them out
+            return None
+        number = self.match(self.word_re, word)
+        if len(self.word_cache) >= self.WORD_CACHE_SIZE:
+            self.word_cache.clear()
+        self.word_cache[word] = number
+        return number
+
+    def match_title(self, title):
+        best = None
+        cache = self.word_cache
+        for word in title.split():
+            number = cache.get(word, -1)
+            if number == -1:
+                number = self.match_word(word)
+            if number is not None and (best is None or number < best):
+                best = number
+        if self.phrase_re is not None:
+            number = self.match(self.phrase_re, title)
+            if number is not None and (best is None or number < best):
+                best = number
+        return best
+
+    def classify_group(self, group_title):
+        if group_title not in self.group_cache:
+            number = self.match(self.group_re, group_title)
+            self.group_cache[group_title] = None if number is None else self.rules[number]['category']
+        return self.group_cache[group_title]
+
+    def title_category(self, title):
+        number = self.match_title(title)
+        return self.default if number is None else self.rules[number]['category']
+
+    def hint_category(self, hint):
+        # Category of a tvg hint, or '' when it has no keyword
+        number = self.match_title(hint)
+        return '' if number is None else self.rules[number]['category']
+
+    def classify(self, title, group_title='', tvg_id='', tvg_name=''):
+        category = self.classify_group(group_title) if group_title else None
+        if not category and (tvg_id or tvg_name):
+            category = self.hint_category(f'{tvg_name} | {tvg_id}')
+        return category or self.title_category(title)
+
+    def classify_channel(self, channel):
+        return self.classify(channel.title, channel.group_title, channel.tvg_id, channel.tvg_name)
+
+    def text_keys(self, texts):
+        # Cache keys for ``texts``: UTF-8, digits folded when no keyword has
+        # any. One join, encode and split for the whole batch.
+        text = '\n'.join(texts).encode('utf-8', 'surrogatepass')
+        if self.fold_digits:
+            text = text.translate(FOLD_DIGITS)
+        keys = text.split(b'\n')
+        if len(keys) != len(texts):
+            # A text with a line break in it; rare enough to go one by one
+            keys = [text.encode('utf-8', 'surrogatepass') for text in texts]
+            if self.fold_digits:
+                keys = [key.translate(FOLD_DIGITS) for key in keys]
+        return keys
+
+    def classify_texts(self, texts, cache, decide):
+        # decide(text) for every text, through ``cache``
+        keys = self.text_keys(texts)
+        try:
+            return list(map(cache.__getitem__, keys))
+        except KeyError:
+            pass
+        if len(cache) >= self.WORD_CACHE_SIZE:
+            cache.clear()
+        result = []
+        for text, key in zip(texts, keys):
+            category = cache.get(key)
+            if category is None:
+                category = cache[key] = decide(text)
+            result.append(category)
+        return result
+
+    def classify_hinted(self, channels):
+        # Group-titles, then tvg hints, then titles; each step only sees the
+        # channels the steps before left undecided
+        groups = [channel.group_title for channel in channels]
+        group_cache = self.group_cache
+        for group_title in set(groups).difference(group_cache):
+            self.classify_group(group_title)
+        result = list(map(group_cache.__getitem__, groups))
+        rest = list(compress(range(len(result)), map(not_, result)))
+        if not rest:
+            return result
+        left = list(map(channels.__getitem__, rest))
+        hints = [f'{channel.tvg_name} | {channel.tvg_id}' if channel.tvg_id or channel.tvg_name else ''
+                 for channel in left]
+        if any(hints):
+            for i, category in zip(rest, self.classify_texts(hints, self.hint_cache, self.hint_category)):
+                result[i] = category
+            rest = list(compress(range(len(result)), map(not_, result)))
+            left = list(map(channels.__getitem__, rest))
+        titles = [channel.title for channel in left]
+        for i, category in zip(rest, self.classify_texts(titles, self.title_cache, self.title_category)):
+            result[i] = category
+        return result
+
+    def classify_many(self, channels):
+        # Same as classify_channel for every channel. Playlists tend to carry
+        # hints on every entry or on none: a batch with any goes through
+        # classify_hinted, and one without is looked up by title alone.
+        if not channels:
+            return []
+        first = channels[0]
+        if (first.group_title or first.tvg_id or first.tvg_name
+                or any([channel.group_title or channel.tvg_id or channel.tvg_name for channel in channels])):
+            return self.classify_hinted(channels)
+        return self.classify_texts([channel.title for channel in channels], self.title_cache, self.title_category)
@@ -0,0 +1,428 @@
+import time
+from array import array
+from bisect import bisect_left
+from PyQt5.QtCore import QAbstractItemModel, QAbstractListModel, QModelIndex, Qt
+from PyQt5.QtGui import QColor
+from channel_search import PrefixIndex, SearchIndex
+from channel_store import ChannelStore
+from playlist_cache import PlaylistSnapshot
+from stream_prober import DEAD
+
+CATEGORIES = ["Live TV", "Movies", "Series", "Sports", "News", "Kids", "Music", "Others"]
+
+# Custom data roles returning the Channel record, or its ID, behind a row
+ChannelRole = Qt.UserRole
+ChannelIdRole = Qt.UserRole + 1
+
+
+class ChannelTreeModel(QAbstractItemModel):
+    # Two-level model: categories at the top, channels below them.
+    # Channels live once in a ChannelStore; each category only keeps an
+    # array of channel IDs into it, and rows are handed to the view in
+    # FETCH_BATCH slices through canFetchMore/fetchMore. A channel's ID is
+    # also its position in the search index.
+    FETCH_BATCH = 1000
+
+    # Channel title, and what the programme guide says is on now
+    COLUMNS = 2
+
+    def __init__(self, categories=CATEGORIES, parent=None):
+        super().__init__(parent)
+        self.categories = list(categories)
+        self.category_rows = {name: row for row, name in enumerate(self.categories)}
+        self.store = ChannelStore(self.categories)
+        self.category_of = self.store.category_of               # Category row per channel
+        self.rows = self.store.rows                             # All channel IDs per category
+        self.visible = self.rows                                # IDs matching the filter
+        self.loaded = [0] * len(self.categories)                # Rows exposed to the view
+        self.filter_text = ''
+        self.search = SearchIndex()
+        self.health = {}                # Stream URL -> ProbeResult, kept across playlists
+        self.hide_dead = False
+        self.sort_by_latency = False
+        self.prefix_indexes = {}        # Category row -> PrefixIndex over its visible rows
+        self.epg = None                 # EpgIndex for the guide column, once a guide is loaded
+        self.fingerprints = None        # Fingerprints of the listed channels, once refreshed
+        self.logos = None               # LogoLoader for channel icons, while logos are shown
+
+    # Backing store
+
+    def clear(self):
+        self.store = ChannelStore(self.categories)
+        self.category_of = self.store.category_of
+        self.rows = self.store.rows
+        self.filter_text = ''
+        self.search = SearchIndex()
+        self.fingerprints = None
+        self.update_visible()
+
+    def add_channels(self, batch):
+        # ``batch`` holds (category, Channel) tuples; returns the new IDs
+        categories = [category for category, _ in batch]
+        channels = [channel for _, channel in batch]
+        for channel in channels:
+            self.search.add(channel.title)
+        channel_ids = self.store.extend(channels, categories)
+        touched = {self.category_rows[category] for category in dict.fromkeys(categories)}
+        if self.visible is not self.rows:
+            for channel_id in channel_ids:
+                if self.accepts(channel_id):
+                    self.visible[self.category_of[channel_id]].append(channel_id)
+
+        for row in touched:
+            self.prefix_indexes.pop(row, None)
+            # Fill the first screenful right away; the rest waits for fetchMore
+            wanted = min(len(self.visible[row]), self.FETCH_BATCH)
+            if wanted > self.loaded[row]:
+                parent = self.index(row, 0)
+                self.beginInsertRows(parent, self.loaded[row], wanted - 1)
+                self.loaded[row] = wanted
+                self.endInsertRows()
+            category_index = self.index(row, 0)
+            self.dataChanged.emit(category_index, category_index, [Qt.DisplayRole])
+        return channel_ids
+
+    def apply_diff(self, diff):
+        # Applies a PlaylistDiff from a refresh. Without a filter or view
+        # option only the rows that changed are removed, replaced or
+        # inserted, so the view keeps its scroll position and selection;
+        # otherwise the filtered rows are worked out again.
+        store = self.store
+        incremental = self.visible is self.rows
+        # Channels that changed category leave theirs and are added anew
+        moved = [i for i, (channel_id, category, _) in enumerate(diff.changed)
+                 if store.category(channel_id) != category]
+        gone = {}
+        for channel_id in diff.removed + [diff.changed[i][0] for i in moved]:
+            gone.setdefault(self.category_of[channel_id], []).append(store.position(channel_id))
+        for row, positions in gone.items():
+            positions.sort()
+            self.prefix_indexes.pop(row, None)
+            if not incremental:
+                store.remove(row, positions)
+                continue
+            split = bisect_left(positions, self.loaded[row])
+            if split < len(positions):
+                store.remove(row, positions[split:])
+            # Rows the view has are taken out a run at a time, last first
+            end = split
+            while end:
+                start = end - 1
+                while start and positions[start - 1] == positions[start] - 1:
+                    start -= 1
+                parent = self.index(row, 0)
+                self.beginRemoveRows(parent, positions[start], positions[end - 1])
+                store.remove(row, positions[start:end])
+                self.loaded[row] -= end - start
+                self.endRemoveRows()
+                end = start
+
+        changed_ids = [None] * len(diff.changed)
+        moved = set(moved)
+        for i, (channel_id, _, channel) in enumerate(diff.changed):
+            if i in moved:
+                continue
+            self.search.add(channel.title)
+            changed_ids[i], position = store.replace(channel_id, channel)
+            row = self.category_of[channel_id]
+            self.prefix_indexes.pop(row, None)
+            if incremental and position < self.loaded[row]:
+                parent = self.index(row, 0)
+                self.dataChanged.emit(self.index(position, 0, parent),
+                                      self.index(position, self.COLUMNS - 1, parent))
+
+        batch = [diff.changed[i][1:] for i in sorted(moved)] + diff.added
+        if incremental:
+            new_ids = self.add_channels(batch) if batch else []
+            for row in gone:
+                category_index = self.index(row, 0)
+                self.dataChanged.emit(category_index, category_index, [Qt.DisplayRole])
+        else:
+            for channel in batch:
+                self.search.add(channel[1].title)
+            new_ids = store.extend([channel for _, channel in batch], [category for category, _ in batch])
+            self.update_visible()
+        for i, channel_id in zip(sorted(moved), new_ids):
+            changed_ids[i] = channel_id
+        diff.commit(changed_ids, new_ids[len(moved):])
+        self.fingerprints = diff.fingerprints
+
+    def restore(self, snapshot):
+        # Swap in a PlaylistSnapshot prepared off the GUI thread
+        self.store = snapshot.store
+        self.category_of = self.store.category_of
+        self.rows = self.store.rows
+        self.filter_text = ''
+        self.search = snapshot.search
+        self.fingerprints = None
+        self.update_visible()
+
+    def snapshot(self):
+        return PlaylistSnapshot(self.store, self.search)
+
+    def category_channels(self, category):
+        return [self.store.get(channel_id) for channel_id in self.visible[self.category_rows[category]]]
+
+    def channel_id(self, index):
+        # ID in ``store`` of the channel at ``index``, or None for a category
+        if not index.isValid() or not index.internalId():
+            return None
+        return self.visible[index.internalId() - 1][index.row()]
+
+    def channel(self, index):
+        channel_id = self.channel_id(index)
+        return None if channel_id is None else self.store.get(channel_id)
+
+    def neighbour_urls(self, index, count):
+        # URLs of up to ``count`` listed channels either side of ``index``
+        if not index.isValid() or not index.internalId():
+            return []
+        parent = index.parent()
+        row = index.row()
+        rows = range(max(0, row - count), min(self.rowCount(parent), row + count + 1))
+        return [self.store.url[self.channel_id(self.index(r, 0, parent))] for r in rows if r != row]
+
+    def complete(self, category, prefix, limit=50):
+        # IDs of listed channels in ``category`` whose title starts
+        # with ``prefix``; the index is built on first use after a change
+        row = self.category_rows[category]
+        index = self.prefix_indexes.get(row)
+        if index is None:
+            index = self.prefix_indexes[row] = PrefixIndex(self.search.titles, self.visible[row])
+        return index.complete(prefix, limit)
+
+    def channel_index(self, channel_id):
+        # Model index of the channel, fetching rows up to it
+        row = self.category_of[channel_id]
+        try:
+            child = self.visible[row].index(channel_id)
+        except ValueError:
+            return QModelIndex()
+        if child >= self.loaded[row]:
+            parent = self.index(row, 0)
+            self.beginInsertRows(parent, self.loaded[row], child)
+            self.loaded[row] = child + 1
+            self.endInsertRows()
+        return self.index(child, 0, self.index(row, 0))
+
+    # Programme guide
+
+    def set_epg(self, epg):
+        self.epg = epg
+        self.refresh_guide()
+
+    def refresh_guide(self):
+        # Programmes change with the clock; only loaded rows can be on screen
+        for row, loaded in enumerate(self.loaded):
+            if loaded:
+                parent = self.index(row, 0)
+                self.dataChanged.emit(self.index(0, 1, parent), self.index(loaded - 1, 1, parent),
+                                      [Qt.DisplayRole, Qt.ToolTipRole])
+
+    def guide_data(self, channel_id, role):
+        tvg_id = self.store.tvg_id[channel_id] if self.epg is not None else ''
+        if not tvg_id:
+            return None
+        if role == Qt.DisplayRole:
+            return self.epg.now_title(tvg_id)
+        if role == Qt.ToolTipRole:
+            airing, following = self.epg.now_next(tvg_id)
+            lines = [f"Now: {airing.describe()}" if airing else None,
+                     f"Next: {following.describe()}" if following else None]
+            return "\n".join(line for line in lines if line) or None
+        return None
+
+    # Filtering
+
+    def set_filter(self, text):
+        text = text.strip()
+        if text == self.filter_text:
+            return
+        self.filter_text = text
+        self.update_visible()
+
+    def set_view_options(self, hide_dead, sort_by_latency):
+        self.hide_dead = hide_dead
+        self.sort_by_latency = sort_by_latency
+        self.update_visible()
+
+    def set_health(self, results):
+        # Call update_visible() afterwards to re-apply hiding and sorting;
+        # doing it for every batch would keep resetting the view
+        for result in results:
+            self.health[result.url] = result
+
+    def expire_health(self, ttl):
+        # Drops results older than ``ttl`` seconds, as HealthTable.load()
+        # does across sessions; True when any went. Call update_visible()
+        # afterwards while hiding or sorting.
+        cutoff = time.time() - ttl
+        stale = [url for url, result in self.health.items() if result.checked_at < cutoff]
+        for url in stale:
+            del self.health[url]
+        return bool(stale)
+
+    def is_dead(self, channel_id):
+        result = self.health.get(self.store.url[channel_id])
+        return result is not None and result.status == DEAD
+
+    def accepts(self, channel_id):
+        if self.filter_text and not self.search.matches(channel_id, self.filter_text):
+            return False
+        return not (self.hide_dead and self.is_dead(channel_id))
+
+    def latency_key(self, channel_id):
+        # Measured streams fastest first, then unprobed ones, dead ones last
+        result = self.health.get(self.store.url[channel_id])
+        if result is None:
+            return (1, 0.0)
+        if result.status == DEAD:
+            return (2, 0.0)
+        return (0, result.ttfb)
+
+    def update_visible(self):
+        self.beginResetModel()
+        if self.filter_text:
+            # Results come back ranked; each category keeps that order
+            visible = [array('I') for _ in self.categories]
+            category_of = self.category_of
+            removed = self.store.removed
+            for channel_id in self.search.search(self.filter_text):
+                if channel_id not in removed:
+                    visible[category_of[channel_id]].append(channel_id)
+        else:
+            visible = self.rows
+        if self.hide_dead and self.health:
+            is_dead = self.is_dead
+            visible = [array('I', [p for p in rows if not is_dead(p)]) for rows in visible]
+        if self.sort_by_latency and self.health:
+            # Stable, so equal keys keep search rank or playlist order
+            visible = [array('I', sorted(rows, key=self.latency_key)) for rows in visible]
+        if visible is self.rows and (self.hide_dead or self.sort_by_latency):
+            # New channels must go through accepts() while an option is on
+            visible = [array('I', rows) for rows in visible]
+        self.visible = visible
+        self.loaded = [min(len(rows), self.FETCH_BATCH) for rows in self.visible]
+        self.prefix_indexes = {}
+        self.endResetModel()
+
+    # QAbstractItemModel interface
+
+    def index(self, row, column, parent=QModelIndex()):
+        # Bounds are checked by hand; hasIndex() would call back into rowCount()
+        if not 0 <= column < self.COLUMNS or row < 0:
+            return QModelIndex()
+        if not parent.isValid():
+            if row >= len(self.categories):
+                return QModelIndex()
+            return self.createIndex(row, column, 0)
+        if parent.internalId() or row >= self.loaded[parent.row()]:
+            return QModelIndex()
+        # Channel rows carry their category row (+1) as internal id
+        return self.createIndex(row, column, parent.row() + 1)
+
+    def parent(self, index):
+        if not index.isValid() or not index.internalId():
+            return QModelIndex()
+        return self.createIndex(index.internalId() - 1, 0, 0)
+
+    def rowCount(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return len(self.categories)
+        if parent.internalId() or parent.column() > 0:
+            return 0
+        return self.loaded[parent.row()]
+
+    def columnCount(self, parent=QModelIndex()):
+        return self.COLUMNS
+
+    def hasChildren(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return True
+        if parent.internalId():
+            return False
+        return len(self.visible[parent.row()]) > 0
+
+    def canFetchMore(self, parent):
+        if not parent.isValid() or parent.internalId():
+            return False
+        return self.loaded[parent.row()] < len(self.visible[parent.row()])
+
+    def fetchMore(self, parent):
+        if not self.canFetchMore(parent):
+            return
+        row = parent.row()
+        start = self.loaded[row]
+        end = min(len(self.visible[row]), start + self.FETCH_BATCH)
+        self.beginInsertRows(parent, start, end - 1)
+        self.loaded[row] = end
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if not index.internalId():
+            if role == Qt.DisplayRole and index.column() == 0:
+                name = self.categories[index.row()]
+                count = len(self.visible[index.row()])
+                return f"{name} ({count})" if count else name
+            return None
+        if index.column() == 1:
+            return self.guide_data(self.channel_id(index), role)
+        if role == Qt.DisplayRole:
+            return self.store.title[self.channel_id(index)]
+        if role == Qt.DecorationRole:
+            # Only rows being painted ask, so only logos on screen are fetched
+            url = self.store.tvg_logo[self.channel_id(index)] if self.logos is not None else ''
+            return self.logos.pixmap(url) if url else None
+        if role == ChannelRole:
+            return self.channel(index)
+        if role == ChannelIdRole:
+            return self.channel_id(index)
+        if role in (Qt.ToolTipRole, Qt.ForegroundRole):
+            result = self.health.get(self.store.url[self.channel_id(index)])
+            if result is None:
+                return None
+            if role == Qt.ToolTipRole:
+                return result.describe()
+            return QColor(Qt.gray) if result.status == DEAD else None
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return ("Channels", "Now")[section] if 0 <= section < self.COLUMNS else None
+        return None
+
+
+class ChannelListModel(QAbstractListModel):
+    # A flat, short list of channels from a ChannelTreeModel, by ID;
+    # used for type-to-find completions
+    def __init__(self, source, parent=None):
+        super().__init__(parent)
+        self.source = source
+        self.channel_ids = []
+
+    def set_channel_ids(self, channel_ids):
+        self.beginResetModel()
+        self.channel_ids = channel_ids
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.channel_ids)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        channel_id = self.channel_ids[index.row()]
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            return self.source.store.title[channel_id]
+        if role == ChannelRole:
+            return self.source.store.get(channel_id)
+        if role == ChannelIdRole:
+            return channel_id
+        return None
@@ -0,0 +1,173 @@
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+# Arabic letters that NFKD leaves alone but users type interchangeably;
+# hamza forms (أ إ آ ؤ ئ) and harakat are already handled by decomposition
+_ARABIC_FOLD = str.maketrans({'ٱ': 'ا', 'ى': 'ي', 'ة': 'ه', 'ـ': None})
+_COMBINING_RE = re.compile('[\u0300-\u036f\u064b-\u065f\u0670]')
+
+
+def normalize(text):
+    # Case- and diacritic-folded form used for both indexing and queries
+    text = text.casefold()
+    if text.isascii():
+        return text
+    # Latin accents and Arabic harakat/hamza marks become combining marks
+    text = _COMBINING_RE.sub('', unicodedata.normalize('NFKD', text))
+    return text.translate(_ARABIC_FOLD)
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    # Trigram index over normalized channel titles. Queries of three or
+    # more characters start from the shortest posting list and are checked
+    # as substrings; one- and two-character queries match word starts
+    # through a small prefix index. A query that extends the previous
+    # substring query narrows its results instead of starting over, which
+    # is the common case while typing.
+    RANK_LIMIT = 5000       # Only rank result sets up to this size
+    FUZZY_RATIO = 0.6       # Share of query trigrams a fuzzy hit must contain
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.titles = []        # Normalized title per position
+        self.postings = {}      # Trigram -> array of positions, ascending
+        self.prefixes = {}      # One/two character word prefix -> positions
+        self.last_query = ''
+        self.last_results = None
+
+    def __len__(self):
+        return len(self.titles)
+
+    def dump(self):
+        # Picklable state; titles are stored as one string to load fast.
+        # Posting arrays are copied, as dump() of ChannelStore copies.
+        return {'count': len(self.titles), 'titles': '\n'.join(self.titles),
+                'postings': {gram: posting[:] for gram, posting in self.postings.items()},
+                'prefixes': {prefix: posting[:] for prefix, posting in self.prefixes.items()}}
+
+    @classmethod
+    def load(cls, state):
+        index = cls()
+        index.titles = state['titles'].split('\n') if state['count'] else []
+        index.postings = state['postings']
+        index.prefixes = state['prefixes']
+        return index
+
+    def add(self, title):
+        position = len(self.titles)
+        title = normalize(title)
+        self.titles.append(title)
+        postings = self.postings
+        for gram in trigrams(title):
+            posting = postings.get(gram)
+            if posting is None:
+                posting = postings[gram] = array('I')
+            posting.append(position)
+        prefixes = self.prefixes
+        for prefix in {word[:n] for word in title.split() for n in (1, 2)}:
+            posting = prefixes.get(prefix)
+            if posting is None:
+                posting = prefixes[prefix] = array('I')
+            posting.append(position)
+
+        # Keep the cached result set valid while channels stream in
+        if self.last_results is not None and self.last_query in title:
+            self.last_results.append(position)
+        return position
+
+    def matches(self, position, query):
+        return normalize(query) in self.titles[position]
+
+    def search(self, query, rank=True, fuzzy=True):
+        # Return matching positions, best matches first when ranked
+        query = normalize(query.strip())
+        if not query:
+            self.last_query, self.last_results = '', None
+            return list(range(len(self.titles)))
+
+        titles = self.titles
+        if len(query) < 3 and not any(ch.isspace() for ch in query):
+            # Too short for trigrams; nothing to narrow from later either
+            self.last_query, self.last_results = '', None
+            results = self.prefixes.get(query, ())
+            if rank and len(results) <= self.RANK_LIMIT:
+                return self.rank(results, query)
+            return list(results)
+
+        if self.last_results is not None and self.last_query in query:
+            candidates = self.last_results
+        elif len(query) >= 3:
+            postings = [self.postings.get(gram) for gram in trigrams(query)]
+            candidates = [] if None in postings else min(postings, key=len)
+        else:
+            candidates = range(len(titles))
+        results = [p for p in candidates if query in titles[p]]
+
+        self.last_query, self.last_results = query, results
+        if not results and fuzzy:
+            return self.fuzzy_search(query)
+        if rank and len(results) <= self.RANK_LIMIT:
+            return self.rank(results, query)
+        return list(results)
+
+    def rank(self, results, query):
+        # Prefix matches first, then matches at a word start, then the rest
+        titles = self.titles
+        word = ' ' + query
+
+        def score(position):
+            title = titles[position]
+            if title.startswith(query):
+                return 0
+            return 1 if word in title else 2
+
+        return sorted(results, key=score)
+
+    def fuzzy_search(self, query):
+        # Typo-tolerant fallback: positions sharing most of the query's trigrams
+        grams = trigrams(query)
+        if len(grams) < 2:
+            return []
+        hits = Counter()
+        for gram in grams:
+            posting = self.postings.get(gram)
+            if posting is not None:
+                hits.update(posting)
+        needed = max(2, int(len(grams) * self.FUZZY_RATIO + 0.5))
+        matches = [(count, position) for position, count in hits.items() if count >= needed]
+        matches.sort(key=lambda match: (-match[0], match[1]))
+        return [position for _, position in matches]
+
+
+class PrefixIndex:
+    # Type-to-find over a fixed set of positions: normalized titles are kept
+    # sorted, so the titles starting with a prefix are one contiguous run
+    # found by bisection
+    def __init__(self, titles, positions):
+        # ``titles`` are the normalized titles of a SearchIndex
+        self.positions = array('I', sorted(positions, key=titles.__getitem__))
+        self.keys = list(map(titles.__getitem__, self.positions))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def complete(self, prefix, limit=50):
+        prefix = normalize(prefix.strip())
+        if not prefix:
+            return []
+        keys = self.keys
+        start = bisect_left(keys, prefix)
+        end = start
+        stop = min(len(keys), start + limit)
+        while end < stop and keys[end].startswith(prefix):
+            end += 1
+        return list(self.positions[start:end])
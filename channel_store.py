@@ -0,0 +1,283 @@
+from array import array
+from bisect import bisect_left
+from itertools import accumulate, chain, islice
+from operator import attrgetter
+from m3u_parser import Channel
+
+
+class StringColumn:
+    # Strings stored as UTF-8 in one buffer, with each row's end offset.
+    # About len(text) + 4 bytes per row, instead of a str object each.
+    __slots__ = ('data', 'ends')
+
+    def __init__(self, data=b'', ends=None):
+        self.data = bytearray(data)
+        self.ends = array('I') if ends is None else ends
+
+    def __len__(self):
+        return len(self.ends)
+
+    def __getitem__(self, row):
+        return self.raw(row).decode('utf-8')
+
+    def raw(self, row):
+        start = self.ends[row - 1] if row else 0
+        return bytes(self.data[start:self.ends[row]])
+
+    def append(self, text):
+        self.data += text.encode('utf-8')
+        self.ends.append(len(self.data))
+
+    def extend(self, texts):
+        encoded = [text.encode('utf-8') for text in texts]
+        self.ends.extend(islice(accumulate(map(len, encoded), initial=len(self.data)), 1, None))
+        self.data += b''.join(encoded)
+
+    def hashes(self):
+        # hash() of every row's UTF-8 bytes, without decoding any of them
+        data = bytes(self.data)
+        ends = self.ends
+        return list(map(hash, map(data.__getitem__, map(slice, chain((0,), ends), ends))))
+
+    def dump(self):
+        return bytes(self.data), self.ends[:]
+
+
+class InternedColumn:
+    # For fields with few distinct values (group-title, catchup, source):
+    # each distinct value is kept once and rows store its number
+    __slots__ = ('values', 'numbers', 'codes')
+
+    def __init__(self, typecode='I', values=None, codes=None):
+        self.values = values or []
+        self.numbers = {value: number for number, value in enumerate(self.values)}
+        self.codes = array(typecode) if codes is None else codes
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, row):
+        return self.values[self.codes[row]]
+
+    def append(self, value):
+        number = self.numbers.get(value)
+        if number is None:
+            number = self.numbers[value] = len(self.values)
+            self.values.append(value)
+        self.codes.append(number)
+
+    def extend(self, values):
+        numbers = self.numbers
+        for value in dict.fromkeys(values):
+            if value not in numbers:
+                numbers[value] = len(self.values)
+                self.values.append(value)
+        self.codes.extend(map(numbers.__getitem__, values))
+
+    def dump(self):
+        return list(self.values), self.codes[:]
+
+
+class HashIndex:
+    # Lookup by exact value without a dict of a million strings: row IDs
+    # sorted by the value's hash, found by bisection and confirmed against
+    # the column. Rows added after the build are scanned linearly until
+    # there are enough of them to make a rebuild worthwhile.
+    def __init__(self, column):
+        self.column = column
+        hashes = column.hashes()
+        order = sorted(range(len(hashes)), key=hashes.__getitem__)
+        self.hashes = array('q', [hashes[row] for row in order])
+        self.rows = array('I', order)
+
+    def stale(self):
+        added = len(self.column) - len(self.rows)
+        return added > max(1000, len(self.rows) // 8)
+
+    def find(self, value):
+        column = self.column
+        value = value.encode('utf-8')
+        key = hash(value)
+        hashes = self.hashes
+        found = []
+        i = bisect_left(hashes, key)
+        while i < len(hashes) and hashes[i] == key:
+            row = self.rows[i]
+            if column.raw(row) == value:
+                found.append(row)
+            i += 1
+        found.sort()
+        found.extend(row for row in range(len(self.rows), len(column)) if column.raw(row) == value)
+        return found
+
+
+class ChannelStore:
+    # All channels of a playlist in columns, under stable integer IDs:
+    # a channel's ID is the order it was added in and never changes or gets
+    # reused while the store lives. Channel objects are only built on
+    # demand by get(). Secondary indexes: by category (kept as channels
+    # are added) and by title, URL or tvg-id (built on first lookup).
+    # A refresh removes channels by marking their IDs, and a changed
+    # channel gets a new ID that takes the old one's place in its category.
+    STRING_FIELDS = ('title', 'url', 'tvg_id', 'tvg_name', 'tvg_logo')
+    INTERNED_FIELDS = ('group_title', 'catchup', 'source')
+    INDEXED_FIELDS = ('title', 'url', 'tvg_id')
+
+    def __init__(self, categories):
+        self.categories = list(categories)
+        self.category_numbers = {name: row for row, name in enumerate(self.categories)}
+        self.title = StringColumn()
+        self.url = StringColumn()
+        self.tvg_id = StringColumn()
+        self.tvg_name = StringColumn()
+        self.tvg_logo = StringColumn()
+        self.group_title = InternedColumn('I')
+        self.catchup = InternedColumn('H')
+        self.source = InternedColumn('H')
+        self.durations = array('i')
+        self.name_is_title = array('B')                     # tvg-name is usually the title again
+        self.category_of = array('B')                       # Category row per channel
+        self.rows = [array('I') for _ in self.categories]   # Channel IDs per category
+        self.extras = {}                                    # ID -> (attrs, options), when set
+        self.indexes = {}                                   # Field -> HashIndex
+        self.removed = set()                                # IDs taken out by a refresh
+        self.order = {}                                     # Replacement ID -> ID it took the place of
+
+    def __len__(self):
+        return len(self.durations)
+
+    def live_count(self):
+        return len(self.durations) - len(self.removed)
+
+    def add(self, channel, category):
+        return self.extend([channel], [category])[0]
+
+    def extend(self, channels, categories):
+        # add() for a batch, a column at a time; returns the new IDs
+        channel_ids = self.append(channels, categories)
+        rows = self.rows
+        category_of = self.category_of
+        for channel_id in channel_ids:
+            rows[category_of[channel_id]].append(channel_id)
+        return channel_ids
+
+    def append(self, channels, categories):
+        # Stores channels under new IDs without listing them in a category
+        first = len(self.durations)
+        for field in self.STRING_FIELDS + self.INTERNED_FIELDS:
+            if field != 'tvg_name':
+                getattr(self, field).extend(list(map(attrgetter(field), channels)))
+        flags = [channel.tvg_name == channel.title for channel in channels]
+        self.tvg_name.extend(['' if same else channel.tvg_name for same, channel in zip(flags, channels)])
+        self.name_is_title.extend(flags)
+        self.durations.extend(map(attrgetter('duration'), channels))
+        self.category_of.extend(map(self.category_numbers.__getitem__, categories))
+        for channel_id, channel in enumerate(channels, first):
+            if channel.attrs or channel.options:
+                self.extras[channel_id] = (channel.attrs, channel.options)
+        return range(first, len(self.durations))
+
+    def get(self, channel_id):
+        attrs, options = self.extras.get(channel_id, (None, None))
+        title = self.title[channel_id]
+        tvg_name = title if self.name_is_title[channel_id] else self.tvg_name[channel_id]
+        return Channel(title, self.url[channel_id], self.durations[channel_id],
+                       self.tvg_id[channel_id], tvg_name, self.tvg_logo[channel_id],
+                       self.group_title[channel_id], self.catchup[channel_id], self.source[channel_id],
+                       attrs, options)
+
+    def __iter__(self):
+        return map(self.get, self.ids())
+
+    def ids(self):
+        # IDs of the channels still listed, ascending
+        if not self.removed:
+            return iter(range(len(self)))
+        return (channel_id for channel_id in range(len(self)) if channel_id not in self.removed)
+
+    def order_key(self, channel_id):
+        # Category rows stay sorted by this: the ID, or for a channel that
+        # replaced another, the ID of the one it replaced
+        return self.order.get(channel_id, channel_id)
+
+    def position(self, channel_id):
+        # Row of a listed channel within its category
+        rows = self.rows[self.category_of[channel_id]]
+        return bisect_left(rows, self.order_key(channel_id), key=self.order_key)
+
+    def replace(self, channel_id, channel):
+        # A changed channel, listed in the old one's place in the same
+        # category; returns its new ID and that row
+        row = self.position(channel_id)
+        new_id = self.append([channel], [self.category(channel_id)])[0]
+        self.order[new_id] = self.order_key(channel_id)
+        self.order.pop(channel_id, None)
+        self.removed.add(channel_id)
+        self.rows[self.category_of[channel_id]][row] = new_id
+        return new_id, row
+
+    def remove(self, category_row, positions):
+        # Drops the channels at ``positions`` (ascending) of a category in
+        # one pass over the rows after the first of them
+        rows = self.rows[category_row]
+        self.removed.update(rows[position] for position in positions)
+        tail = array('I')
+        start = positions[0]
+        for position in positions:
+            tail.extend(rows[start:position])
+            start = position + 1
+        tail.extend(rows[start:])
+        del rows[positions[0]:]
+        rows.extend(tail)
+
+    def category(self, channel_id):
+        return self.categories[self.category_of[channel_id]]
+
+    def by_category(self, category):
+        return self.rows[self.category_numbers[category]]
+
+    def find(self, field, value):
+        # IDs of every channel whose ``field`` equals ``value``, ascending;
+        # titles and tvg-ids are often shared, so this is always a list
+        if field not in self.INDEXED_FIELDS:
+            raise ValueError(f"No index on {field}")
+        index = self.indexes.get(field)
+        if index is None or index.stale():
+            index = self.indexes[field] = HashIndex(getattr(self, field))
+        found = index.find(value)
+        if self.removed:
+            found = [channel_id for channel_id in found if channel_id not in self.removed]
+        return found
+
+    def dump(self):
+        # Picklable state: a few large buffers and arrays, quick to load.
+        # Everything is copied, so the state can be pickled on another
+        # thread while this store keeps changing.
+        return {
+            'categories': list(self.categories),
+            'strings': {field: getattr(self, field).dump() for field in self.STRING_FIELDS},
+            'interned': {field: getattr(self, field).dump() for field in self.INTERNED_FIELDS},
+            'durations': self.durations[:],
+            'name_is_title': self.name_is_title[:],
+            'category_of': self.category_of[:],
+            'rows': [rows[:] for rows in self.rows],
+            'extras': dict(self.extras),
+            'removed': set(self.removed),
+            'order': dict(self.order),
+        }
+
+    @classmethod
+    def load(cls, state):
+        store = cls(state['categories'])
+        for field, (data, ends) in state['strings'].items():
+            setattr(store, field, StringColumn(data, ends))
+        for field, (values, codes) in state['interned'].items():
+            setattr(store, field, InternedColumn(codes.typecode, values, codes))
+        store.durations = state['durations']
+        store.name_is_title = state['name_is_title']
+        store.category_of = state['category_of']
+        store.rows = state['rows']
+        store.extras = state['extras']
+        store.removed = state['removed']
+        store.order = state['order']
+        return store
@@ -0,0 +1,253 @@
+import calendar
+import gc
+import gzip
+import hashlib
+import io
+import os
+import pickle
+import time
+from array import array
+from bisect import bisect_right
+from xml.etree.ElementTree import iterparse
+
+EPG_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'universal-media-player', 'epg')
+
+# Bumped whenever the saved index layout changes; older files are ignored
+FORMAT_VERSION = 1
+
+# Programmes that ended longer ago than this are not kept
+KEEP_PAST = 6 * 3600
+
+# Midnight UTC as epoch seconds per 'YYYYMMDD'; a guide spans a few weeks at most
+_days = {}
+
+# Parsed times by their text. Channels share programme slots, so most
+# stamps in a guide repeat; the cache is dropped when it gets this big.
+_times = {}
+MAX_CACHED_TIMES = 100000
+
+
+def parse_xmltv_time(text):
+    # '20240131203000 +0100' -> epoch seconds. Seconds and the UTC offset
+    # may be missing; a time without an offset is taken as UTC.
+    seconds = _times.get(text)
+    if seconds is None:
+        if len(_times) >= MAX_CACHED_TIMES:
+            _times.clear()
+        seconds = _times[text] = _parse_time(text)
+    return seconds
+
+
+def _parse_time(text):
+    digits, _, offset = text.strip().partition(' ')
+    day = _days.get(digits[:8])
+    if day is None:
+        day = _days[digits[:8]] = calendar.timegm((int(digits[:4]), int(digits[4:6]), int(digits[6:8]), 0, 0, 0))
+    seconds = day + int(digits[8:10] or 0) * 3600 + int(digits[10:12] or 0) * 60 + int(digits[12:14] or 0)
+    offset = offset.strip()
+    if len(offset) == 5 and offset[0] in '+-':
+        shift = int(offset[1:3]) * 3600 + int(offset[3:5]) * 60
+        seconds -= shift if offset[0] == '+' else -shift
+    return seconds
+
+
+def open_xmltv(source):
+    # A binary file object for a path or a stream, gunzipped on the fly
+    # when the data starts with the gzip magic (.xml.gz, or a server that
+    # sends gzip without saying so in Content-Encoding)
+    if isinstance(source, str):
+        source = open(source, 'rb')
+    if not hasattr(source, 'peek'):
+        source = io.BufferedReader(source)
+    if source.peek(2)[:2] == b'\x1f\x8b':
+        return _GzipReader(fileobj=source)
+    return source
+
+
+class _GzipReader(gzip.GzipFile):
+    # GzipFile leaves a file it was handed open; this one closes it too,
+    # so ``with open_xmltv(path)`` releases the file either way
+    def close(self):
+        fileobj = self.fileobj
+        try:
+            super().close()
+        finally:
+            if fileobj is not None:
+                fileobj.close()
+
+
+def iter_xmltv(source):
+    # (channel id, start, stop, title) for every <programme>, as the file
+    # is read. Each element is cleared once handled and detached from the
+    # root, so memory stays flat however large the guide is. ``stop`` is
+    # None when the programme has none; a programme with a malformed time
+    # is skipped rather than ending the guide there.
+    events = iterparse(source, events=('start', 'end'))
+    _, root = next(events)
+    for event, elem in events:
+        if event != 'end':
+            continue
+        if elem.tag == 'programme':
+            start = elem.get('start')
+            channel = elem.get('channel')
+            if start and channel:
+                stop = elem.get('stop')
+                try:
+                    programme = (channel, parse_xmltv_time(start), parse_xmltv_time(stop) if stop else None,
+                                 elem.findtext('title') or '')
+                except ValueError:
+                    pass
+                else:
+                    yield programme
+            root.clear()
+        elif elem.tag == 'channel':
+            root.clear()
+
+
+class Programme:
+    __slots__ = ('start', 'stop', 'title')
+
+    def __init__(self, start, stop, title):
+        self.start = start      # Epoch seconds
+        self.stop = stop
+        self.title = title
+
+    def __repr__(self):
+        return f"Programme({self.start!r}, {self.stop!r}, {self.title!r})"
+
+    def describe(self):
+        start = time.strftime('%H:%M', time.localtime(self.start))
+        stop = time.strftime('%H:%M', time.localtime(self.stop))
+        return f"{start}-{stop} {self.title}"
+
+
+class EpgIndex:
+    # Programmes per channel as parallel arrays sorted by start time, so
+    # the one airing at a given moment is a bisection away. Channel ids are
+    # matched case-insensitively against the playlist's tvg-id; titles are
+    # stored once and referenced by number.
+    def __init__(self, since=None):
+        self.channels = {}          # Lower-case channel id -> (starts, stops, title numbers)
+        self.titles = []
+        self.title_numbers = {}
+        self.since = time.time() - KEEP_PAST if since is None else since
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def add(self, channel, start, stop, title):
+        if stop is not None and stop < self.since:
+            return
+        key = channel.lower()
+        entry = self.channels.get(key)
+        if entry is None:
+            entry = self.channels[key] = (array('q'), array('q'), array('I'))
+        number = self.title_numbers.get(title)
+        if number is None:
+            number = self.title_numbers[title] = len(self.titles)
+            self.titles.append(title)
+        starts, stops, titles = entry
+        starts.append(start)
+        stops.append(-1 if stop is None else stop)
+        titles.append(number)
+        self.count += 1
+
+    def finish(self):
+        # Sorts channels whose programmes came out of order and gives
+        # programmes without a stop time the next one's start
+        for key, (starts, stops, titles) in self.channels.items():
+            if any(starts[i] > starts[i + 1] for i in range(len(starts) - 1)):
+                order = sorted(range(len(starts)), key=starts.__getitem__)
+                starts = array('q', [starts[i] for i in order])
+                stops = array('q', [stops[i] for i in order])
+                titles = array('I', [titles[i] for i in order])
+                self.channels[key] = (starts, stops, titles)
+            if -1 in stops:
+                for i, stop in enumerate(stops):
+                    if stop < 0:
+                        stops[i] = starts[i + 1] if i + 1 < len(starts) else starts[i] + 3600
+        self.title_numbers = {}
+        return self
+
+    def has(self, channel):
+        return channel.lower() in self.channels
+
+    def current(self, channel, now=None):
+        # Position of the programme airing at ``now`` and the channel's
+        # arrays, or (None, entry) when nothing is on
+        entry = self.channels.get(channel.lower())
+        if entry is None:
+            return None, None
+        now = time.time() if now is None else now
+        i = bisect_right(entry[0], now) - 1
+        if i >= 0 and entry[1][i] > now:
+            return i, entry
+        return None, entry
+
+    def now_title(self, channel, now=None):
+        i, entry = self.current(channel, now)
+        return None if i is None else self.titles[entry[2][i]]
+
+    def now_next(self, channel, now=None):
+        # (airing, following) Programme pair; either may be None
+        now = time.time() if now is None else now
+        i, entry = self.current(channel, now)
+        if entry is None:
+            return None, None
+        starts, stops, titles = entry
+        upcoming = bisect_right(starts, now)
+        airing = None if i is None else Programme(starts[i], stops[i], self.titles[titles[i]])
+        following = None
+        if upcoming < len(starts):
+            following = Programme(starts[upcoming], stops[upcoming], self.titles[titles[upcoming]])
+        return airing, following
+
+    def dump(self):
+        return {'channels': self.channels, 'titles': self.titles, 'since': self.since, 'count': self.count}
+
+    @classmethod
+    def load(cls, state):
+        index = cls(state['since'])
+        index.channels = state['channels']
+        index.titles = state['titles']
+        index.count = state['count']
+        return index
+
+
+class EpgCache:
+    # Parsed guides on disk, one file per guide URL, with the HTTP
+    # validators they were downloaded with and the time they were stored
+    def __init__(self, directory=EPG_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, url):
+        return os.path.join(self.directory, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.epg')
+
+    def load(self, url):
+        # (EpgIndex, validators, stored_at), or None
+        gc.disable()
+        try:
+            with open(self.path(url), 'rb') as f:
+                state = pickle.load(f)
+            if state.get('version') != FORMAT_VERSION or state.get('url') != url:
+                return None
+            return EpgIndex.load(state['index']), state['validators'], state['stored_at']
+        except (OSError, pickle.UnpicklingError, EOFError, KeyError, ValueError):
+            return None
+        finally:
+            gc.enable()
+
+    def store(self, url, index, validators):
+        # Best effort: a failed write only means the next load downloads again
+        path = self.path(url)
+        state = {'version': FORMAT_VERSION, 'url': url, 'validators': validators,
+                 'stored_at': time.time(), 'index': index.dump()}
+        try:
+            with open(path + '.tmp', 'wb') as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(path + '.tmp', path)
+        except OSError:
+            return False
+        return True
@@ -0,0 +1,88 @@
+import os
+import time
+from PyQt5.QtCore import QThread, pyqtSignal
+from epg import EpgIndex, iter_xmltv, open_xmltv
+from playlist_cache import PlaylistCache
+from playlist_sources import TIMEOUT, make_session
+
+
+class EpgLoader(QThread):
+    guide_loaded = pyqtSignal(object)           # EpgIndex
+    progress_changed = pyqtSignal(int)          # Programmes read so far
+    load_failed = pyqtSignal(str)
+
+    # A cached guide younger than this is used without asking the server
+    FRESH_FOR = 6 * 3600
+
+    PROGRESS_INTERVAL = 0.25
+
+    def __init__(self, url, cache=None, parent=None):
+        super().__init__(parent)
+        self.url = url
+        self.cache = cache
+        self.from_cache = False
+
+    def cancel(self):
+        self.requestInterruption()
+
+    def run(self):
+        try:
+            index = self.load()
+        except Exception as e:
+            if not self.isInterruptionRequested():
+                self.load_failed.emit(str(e) or type(e).__name__)
+            return
+        if index is not None and not self.isInterruptionRequested():
+            self.guide_loaded.emit(index)
+
+    def load(self):
+        cached = self.cache.load(self.url) if self.cache else None
+        if os.path.exists(self.url):
+            # Local files are re-read whenever they change
+            validators = [None, str(os.path.getmtime(self.url))]
+            if cached and cached[1] == validators:
+                self.from_cache = True
+                return cached[0]
+            with open_xmltv(self.url) as source:
+                return self.build(source, validators)
+
+        if cached and time.time() - cached[2] < self.FRESH_FOR:
+            self.from_cache = True
+            return cached[0]
+        headers = PlaylistCache.conditional_headers(cached[1]) if cached else {}
+        session = make_session(1)
+        try:
+            with session.get(self.url, stream=True, headers=headers, timeout=TIMEOUT) as response:
+                if cached and response.status_code == 304:
+                    self.from_cache = True
+                    # Stored again to restart the freshness period
+                    self.cache.store(self.url, cached[0], cached[1])
+                    return cached[0]
+                response.raise_for_status()
+                validators = [response.headers.get('ETag'), response.headers.get('Last-Modified')]
+                # Lets urllib3 undo Content-Encoding (a .xml.gz body is gunzipped
+                # by open_xmltv), and keeps it readable through io wrappers once
+                # the body is exhausted
+                response.raw.decode_content = True
+                response.raw.auto_close = False
+                return self.build(open_xmltv(response.raw), validators)
+        finally:
+            session.close()
+
+    def build(self, source, validators):
+        index = EpgIndex()
+        add = index.add
+        last_progress = time.monotonic()
+        for count, programme in enumerate(iter_xmltv(source), 1):
+            add(*programme)
+            if not count % 1000:
+                if self.isInterruptionRequested():
+                    return None
+                now = time.monotonic()
+                if now - last_progress >= self.PROGRESS_INTERVAL:
+                    self.progress_changed.emit(count)
+                    last_progress = now
+        index.finish()
+        if self.cache:
+            self.cache.store(self.url, index, validators)
+        return index
@@ -0,0 +1,51 @@
+import time
+from PyQt5.QtCore import QThread, pyqtSignal
+from stream_prober import DEAD, StreamProber
+
+
+class HealthChecker(QThread):
+    results_ready = pyqtSignal(list)            # Batch of ProbeResult
+    progress_changed = pyqtSignal(int, int, int)  # Probed, total, dead so far
+    check_finished = pyqtSignal(int)            # Streams probed
+
+    # Results are stored and emitted in batches rather than one by one
+    BATCH_INTERVAL = 0.5
+
+    def __init__(self, urls, health=None, prober=None, parent=None):
+        super().__init__(parent)
+        self.urls = list(urls)
+        self.health = health        # HealthTable, or None to keep results in memory only
+        self.prober = prober or StreamProber()
+        self.probed = 0
+        self.dead = 0
+
+    def cancel(self):
+        self.requestInterruption()
+
+    def run(self):
+        batch = []
+        last_flush = time.monotonic()
+        for result in self.prober.iter_probe(self.urls, self.isInterruptionRequested):
+            batch.append(result)
+            self.probed += 1
+            if result.status == DEAD:
+                self.dead += 1
+            now = time.monotonic()
+            if now - last_flush >= self.BATCH_INTERVAL:
+                self.flush(batch)
+                batch = []
+                last_flush = now
+        if batch:
+            self.flush(batch)
+        if not self.isInterruptionRequested():
+            self.check_finished.emit(self.probed)
+
+    def flush(self, batch):
+        # Results are worth keeping even when the check is cancelled later
+        if self.health is not None:
+            try:
+                self.health.store(batch)
+            except Exception:
+                pass
+        self.results_ready.emit(batch)
+        self.progress_changed.emit(self.probed, len(self.urls), self.dead)
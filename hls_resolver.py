@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit
+import m3u8
+from playlist_sources import make_session
+from stream_prober import MAX_MANIFEST, PROBE_TIMEOUT
+
+
+def looks_like_hls(url):
+    # Only .m3u8 URLs are fetched; anything else could be an endless stream
+    return urlsplit(url).path.lower().endswith('.m3u8')
+
+
+class VariantPolicy:
+    # Picks one variant of a master playlist: the highest bandwidth among
+    # variants within ``max_height`` and ``max_bandwidth``, or the lowest
+    # bandwidth when none fits. Variants without a bandwidth sort last.
+    def __init__(self, max_height=1080, max_bandwidth=None):
+        self.max_height = max_height
+        self.max_bandwidth = max_bandwidth
+
+    def fits(self, variant):
+        info = variant.stream_info
+        if self.max_bandwidth and (info.bandwidth or 0) > self.max_bandwidth:
+            return False
+        if self.max_height and info.resolution and info.resolution[1] > self.max_height:
+            return False
+        return True
+
+    def choose(self, variants):
+        if not variants:
+            return None
+        bandwidth = lambda variant: variant.stream_info.bandwidth or 0
+        fitting = [variant for variant in variants if self.fits(variant)]
+        if fitting:
+            return max(fitting, key=bandwidth)
+        return min(variants, key=bandwidth)
+
+
+class HlsResolver:
+    # Turns an HLS master playlist URL into the URL of one variant, so the
+    # player opens a media playlist straight away instead of probing the
+    # variants itself. Results are cached for ``ttl`` seconds (variant URLs
+    # often carry short-lived tokens); URLs that need no resolving are
+    # cached too, so a recent channel never waits for a fetch.
+    TTL = 60
+    MAX_ENTRIES = 256
+
+    def __init__(self, policy=None, ttl=TTL, max_entries=MAX_ENTRIES, timeout=PROBE_TIMEOUT):
+        self.policy = policy or VariantPolicy()
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.session = make_session(4, retries=1)
+        self.cache = OrderedDict()      # URL -> (URL to play, expiry time), least recent first
+        self.lock = threading.Lock()
+
+    def cached(self, url):
+        # URL to play from the cache, or None when it has to be resolved
+        if not looks_like_hls(url):
+            return url
+        with self.lock:
+            entry = self.cache.get(url)
+            if entry is None:
+                return None
+            if entry[1] < time.monotonic():
+                del self.cache[url]
+                return None
+            self.cache.move_to_end(url)
+            return entry[0]
+
+    def resolve(self, url):
+        # Blocking; returns ``url`` itself when it is not a master playlist
+        # or cannot be fetched, leaving the player to deal with it
+        resolved = self.cached(url)
+        if resolved is not None:
+            return resolved
+        try:
+            resolved = self.fetch_variant(url)
+        except Exception:
+            return url
+        with self.lock:
+            self.cache[url] = (resolved, time.monotonic() + self.ttl)
+            self.cache.move_to_end(url)
+            while len(self.cache) > self.max_entries:
+                self.cache.popitem(last=False)
+        return resolved
+
+    def fetch_variant(self, url):
+        with self.session.get(url, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            body = bytearray()
+            for chunk in response.iter_content(16 * 1024):
+                body += chunk
+                if len(body) > MAX_MANIFEST:
+                    return url
+            base = response.url
+        playlist = m3u8.loads(body.decode('utf-8', 'replace'), uri=base)
+        if not playlist.is_variant:
+            return url
+        variant = self.policy.choose(playlist.playlists)
+        return variant.absolute_uri if variant is not None else url
+
+    def forget(self, url):
+        with self.lock:
+            self.cache.pop(url, None)
@@ -0,0 +1,132 @@
+import hashlib
+import os
+import sqlite3
+import time
+
+LOGO_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'universal-media-player', 'logos')
+
+# (connect, read) timeouts for a logo; a slow logo is not worth waiting for
+LOGO_TIMEOUT = (5, 10)
+
+# Logos are small; anything bigger is not a logo
+MAX_LOGO_BYTES = 2 * 1024 * 1024
+
+
+# Refusals worth asking again about later, like server errors
+RETRY_STATUSES = (408, 429)
+
+
+def fetch_logo(session, url, timeout=LOGO_TIMEOUT, max_bytes=MAX_LOGO_BYTES):
+    # The image bytes at ``url``, or None when they will not be had: not
+    # HTTP, refused, or too big for a logo. Timeouts, dropped connections
+    # and server errors raise requests.RequestException instead, as a later
+    # try may well work.
+    if not url.startswith(('http://', 'https://')):
+        return None
+    with session.get(url, stream=True, timeout=timeout) as response:
+        if response.status_code >= 500 or response.status_code in RETRY_STATUSES:
+            response.raise_for_status()
+        if not response.ok:
+            return None
+        body = bytearray()
+        for chunk in response.iter_content(64 * 1024):
+            body += chunk
+            if len(body) > max_bytes:
+                return None
+        return bytes(body)
+
+
+class LogoCache:
+    # Downscaled logo thumbnails on disk. Files are named by the SHA-1 of
+    # their content, so channels sharing a logo under different URLs
+    # share the file; SQLite maps each URL to its thumbnail and remembers
+    # URLs that failed, which are tried again after FAILURE_TTL seconds.
+    # Beyond MAX_BYTES, the thumbnails stored longest ago are evicted.
+    MAX_BYTES = 64 * 1024 * 1024
+    FAILURE_TTL = 24 * 3600
+
+    def __init__(self, directory=LOGO_DIR, max_bytes=MAX_BYTES, failure_ttl=FAILURE_TTL):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.failure_ttl = failure_ttl
+        os.makedirs(directory, exist_ok=True)
+        self.db_path = os.path.join(directory, 'index.sqlite')
+        self.execute("""CREATE TABLE IF NOT EXISTS logos (
+                            url TEXT PRIMARY KEY,
+                            digest TEXT NOT NULL,
+                            stored_at REAL NOT NULL)""")
+        self.execute("""CREATE TABLE IF NOT EXISTS thumbnails (
+                            digest TEXT PRIMARY KEY,
+                            size INTEGER NOT NULL,
+                            stored_at REAL NOT NULL)""")
+        self.stored = 0     # Bytes written since the last eviction pass
+
+    def execute(self, sql, params=()):
+        # A connection per call, so the cache can be used from any thread
+        db = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            with db:
+                return db.execute(sql, params).fetchall()
+        finally:
+            db.close()
+
+    def path(self, digest):
+        return os.path.join(self.directory, digest[:2], digest + '.png')
+
+    def lookup(self, url):
+        # Thumbnail bytes; b'' when the URL failed recently; None when unknown
+        rows = self.execute("SELECT digest, stored_at FROM logos WHERE url = ?", (url,))
+        if not rows:
+            return None
+        digest, stored_at = rows[0]
+        if not digest:
+            return b'' if time.time() - stored_at < self.failure_ttl else None
+        try:
+            with open(self.path(digest), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def store(self, url, data):
+        # Best effort: a failed write only means the logo is fetched again
+        digest = hashlib.sha1(data).hexdigest()
+        path = self.path(digest)
+        now = time.time()
+        try:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path + '.tmp', 'wb') as f:
+                    f.write(data)
+                os.replace(path + '.tmp', path)
+                self.execute("INSERT OR REPLACE INTO thumbnails VALUES (?, ?, ?)", (digest, len(data), now))
+                self.stored += len(data)
+            self.execute("INSERT OR REPLACE INTO logos VALUES (?, ?, ?)", (url, digest, now))
+            # Summing sizes for every logo would cost more than the writes
+            if self.stored > self.max_bytes // 16:
+                self.stored = 0
+                self.evict()
+        except (OSError, sqlite3.Error):
+            return False
+        return True
+
+    def store_failure(self, url):
+        try:
+            self.execute("INSERT OR REPLACE INTO logos VALUES (?, '', ?)", (url, time.time()))
+        except sqlite3.Error:
+            pass
+
+    def evict(self):
+        rows = self.execute("SELECT digest, size FROM thumbnails ORDER BY stored_at DESC")
+        total = 0
+        for digest, size in rows:
+            total += size
+            if total <= self.max_bytes:
+                continue
+            self.execute("DELETE FROM thumbnails WHERE digest = ?", (digest,))
+            self.execute("DELETE FROM logos WHERE digest = ?", (digest,))
+            try:
+                os.remove(self.path(digest))
+            except OSError:
+                pass
+        self.execute("DELETE FROM logos WHERE digest = '' AND stored_at < ?",
+                     (time.time() - self.failure_ttl,))
@@ -0,0 +1,207 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from PyQt5.QtCore import QBuffer, QByteArray, QIODevice, QObject, QSize, Qt, pyqtSignal
+from PyQt5.QtGui import QImage, QPixmap
+from logo_cache import fetch_logo
+from m3u_parallel import default_workers
+from metrics import metrics
+
+# Logos are scaled to fit this box, keeping their aspect ratio
+LOGO_SIZE = QSize(40, 24)
+
+# Logos asked for but not yet being fetched. Newest first: when scrolling
+# outruns the fetches, the rows scrolled past are dropped, not waited for.
+MAX_PENDING = 256
+
+
+def scale_logo(data, size=LOGO_SIZE):
+    # QImage of ``data`` scaled down to fit ``size``; null when undecodable
+    image = QImage.fromData(data)
+    if image.isNull():
+        return image
+    if image.width() > size.width() or image.height() > size.height():
+        image = image.scaled(size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    return image.convertToFormat(QImage.Format_ARGB32_Premultiplied)
+
+
+def encode_png(image):
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, 'PNG')
+    return bytes(data)
+
+
+def pixmap_cost(pixmap):
+    return pixmap.width() * pixmap.height() * max(pixmap.depth(), 8) // 8
+
+
+class PixmapLru:
+    # URL -> QPixmap, least recently used evicted once the pixmaps'
+    # memory exceeds ``budget`` bytes
+    def __init__(self, budget):
+        self.budget = budget
+        self.pixmaps = OrderedDict()
+        self.bytes = 0
+
+    def __len__(self):
+        return len(self.pixmaps)
+
+    def get(self, url):
+        pixmap = self.pixmaps.get(url)
+        if pixmap is not None:
+            self.pixmaps.move_to_end(url)
+        return pixmap
+
+    def put(self, url, pixmap):
+        old = self.pixmaps.pop(url, None)
+        if old is not None:
+            self.bytes -= pixmap_cost(old)
+        self.pixmaps[url] = pixmap
+        self.bytes += pixmap_cost(pixmap)
+        while self.bytes > self.budget and self.pixmaps:
+            _, evicted = self.pixmaps.popitem(last=False)
+            self.bytes -= pixmap_cost(evicted)
+
+    def clear(self):
+        self.pixmaps.clear()
+        self.bytes = 0
+
+
+class LogoLoader(QObject):
+    # Channel logos for the rows on screen. pixmap() answers from memory
+    # and queues what is missing; worker threads take the newest requests
+    # first, read the thumbnail from the disk cache or fetch the logo over
+    # one pooled session, and decode and scale it off the GUI thread. The
+    # GUI thread only turns finished images into pixmaps. Up to
+    # ``concurrency`` workers wait on the network, but only ``decoders``
+    # decode at once, as decoding holds the GIL. Loading waits until no
+    # logo has been asked for in SETTLE seconds: each logo costs a few ms
+    # of CPU, which a fast scroll needs for painting, and rows scrolled
+    # past within a frame are not worth it. A logo that cannot be had is
+    # not asked for again this session, nor for a day from the disk cache;
+    # one that failed for network reasons is tried again after RETRY_DELAY
+    # seconds. Workers are daemon threads, so a slow logo server never
+    # holds up quitting.
+    logo_ready = pyqtSignal(str)            # URL whose pixmap is now in memory
+    image_loaded = pyqtSignal(str, QImage)  # From the workers; null when the logo failed
+    fetch_failed = pyqtSignal(str)          # From the workers; the network failed, not the logo
+
+    MEMORY_BUDGET = 16 * 1024 * 1024
+    CONCURRENCY = 8
+    SETTLE = 0.05
+    RETRY_DELAY = 60
+
+    def __init__(self, cache=None, memory_budget=MEMORY_BUDGET, concurrency=CONCURRENCY, decoders=None,
+                 parent=None):
+        super().__init__(parent)
+        self.cache = cache
+        self.concurrency = concurrency
+        self.decoding = threading.BoundedSemaphore(decoders or default_workers())
+        self.pixmaps = PixmapLru(memory_budget)
+        self.failed = set()         # URLs with no usable logo, this session
+        self.retry_at = {}          # URL -> time.monotonic() from which a failed fetch is retried
+        self.pending = set()        # URLs queued or being loaded
+        self.wanted = deque()       # Queued URLs, newest last
+        self.requested_at = 0.0     # time.monotonic() of the newest request
+        self.condition = threading.Condition()
+        self.workers = []
+        self.session = None
+        self.session_lock = threading.Lock()
+        self.image_loaded.connect(self.on_image_loaded)
+        self.fetch_failed.connect(self.on_fetch_failed)
+
+    def pixmap(self, url):
+        # The logo's pixmap, or None while it loads (or has none)
+        pixmap = self.pixmaps.get(url)
+        if pixmap is None and url not in self.pending and url not in self.failed:
+            if url not in self.retry_at or time.monotonic() >= self.retry_at[url]:
+                self.request(url)
+        return pixmap
+
+    def request(self, url):
+        with self.condition:
+            self.pending.add(url)
+            self.wanted.append(url)
+            self.requested_at = time.monotonic()
+            if len(self.wanted) > MAX_PENDING:
+                self.pending.discard(self.wanted.popleft())
+            if len(self.workers) < self.concurrency:
+                worker = threading.Thread(target=self.work, name='logo-loader', daemon=True)
+                self.workers.append(worker)
+                worker.start()
+            self.condition.notify()
+
+    def clear_pending(self):
+        # Drops the queued requests, as when the list shown is replaced
+        with self.condition:
+            for url in self.wanted:
+                self.pending.discard(url)
+            self.wanted.clear()
+
+    def work(self):
+        while True:
+            with self.condition:
+                while not self.wanted or time.monotonic() < self.requested_at + self.SETTLE:
+                    self.condition.wait(self.SETTLE if self.wanted else None)
+                url = self.wanted.pop()
+            try:
+                image = self.load(url)
+            except Exception:
+                image = QImage()
+            if image is None:
+                self.fetch_failed.emit(url)
+            else:
+                self.image_loaded.emit(url, image)
+
+    def get_session(self):
+        with self.session_lock:
+            if self.session is None:
+                from playlist_sources import make_session
+                self.session = make_session(self.concurrency, retries=1)
+            return self.session
+
+    def load(self, url):
+        # The logo's image; null when there is none; None when the network
+        # failed and it is worth trying again
+        data = self.cache.lookup(url) if self.cache is not None else None
+        if data == b'':
+            return QImage()
+        if data is not None:
+            with self.decoding:
+                image = QImage.fromData(data)
+            if not image.isNull():
+                metrics.count('logo.disk_hits')
+                return image
+        from requests import RequestException
+        with metrics.span('logo.fetch'):
+            try:
+                data = fetch_logo(self.get_session(), url)
+            except RequestException:
+                metrics.count('logo.fetch_errors')
+                return None
+        with self.decoding:
+            image = scale_logo(data) if data else QImage()
+            thumbnail = encode_png(image) if self.cache is not None and not image.isNull() else None
+        if self.cache is not None:
+            if thumbnail is None:
+                self.cache.store_failure(url)
+            else:
+                self.cache.store(url, thumbnail)
+        return image
+
+    def on_fetch_failed(self, url):
+        self.pending.discard(url)
+        self.retry_at[url] = time.monotonic() + self.RETRY_DELAY
+
+    def on_image_loaded(self, url, image):
+        self.pending.discard(url)
+        self.retry_at.pop(url, None)
+        if image.isNull():
+            self.failed.add(url)
+            metrics.count('logo.failures')
+            return
+        self.pixmaps.put(url, QPixmap.fromImage(image))
+        metrics.observe('logo.memory_bytes', self.pixmaps.bytes)
+        self.logo_ready.emit(url)
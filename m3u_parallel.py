@@ -0,0 +1,129 @@
+import marshal
+import mmap
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from m3u_parser import (SNIFF_BYTES, Channel, detect_encoding, is_ascii_compatible, iter_blocks,
+                        iter_m3u_chunks, iter_m3u_file)
+
+# Smaller files are parsed in this process: starting the workers costs
+# about as much as parsing this many bytes serially
+PARALLEL_MIN_BYTES = 16 * 1024 * 1024
+
+# Ranges per worker; more and smaller ranges let the merge start sooner
+# and even out slow workers
+RANGES_PER_WORKER = 4
+MIN_RANGE_BYTES = 2 * 1024 * 1024
+
+# Entries always start on a line beginning with this
+ENTRY_MARK = b'\n#EXTINF:'
+
+# Text fields of Channel, sent back as one newline-joined string each: no
+# field can hold a newline, as every one comes from a single line
+TEXT_FIELDS = ('title', 'url', 'tvg_id', 'tvg_name', 'tvg_logo', 'group_title', 'catchup')
+
+
+def default_workers():
+    # The cores this process may run on, which can be fewer than the machine has
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def find_entry(f, offset):
+    # Offset of the first #EXTINF line that starts after ``offset``, or None
+    f.seek(offset)
+    position = offset           # File offset of the next block
+    tail = b''
+    while True:
+        block = f.read(64 * 1024)
+        if not block:
+            return None
+        window = tail + block
+        found = window.find(ENTRY_MARK)
+        if found != -1:
+            return position - len(tail) + found + 1
+        tail = window[1 - len(ENTRY_MARK):]
+        position += len(block)
+
+
+def split_ranges(path, parts):
+    # (start, end) byte ranges covering the file, each after the first
+    # starting on an #EXTINF line so no entry is cut in two
+    size = os.path.getsize(path)
+    step = max(size // parts, MIN_RANGE_BYTES)
+    bounds = [0]
+    with open(path, 'rb') as f:
+        while bounds[-1] + step < size:
+            start = find_entry(f, bounds[-1] + step)
+            if start is None:
+                break
+            bounds.append(start)
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+def parse_range(path, start, end, encoding='utf-8'):
+    # Runs in a worker. Returns the range's channels column by column,
+    # marshalled: a few large strings and lists are far cheaper to send
+    # back and load than a million pickled Channels. The range is read
+    # through a memory map and decoded a block at a time; ranges split on
+    # ASCII, so this matches decoding the whole file.
+    header = {}
+    fields = TEXT_FIELDS + ('duration', 'attrs', 'options')
+    columns = [[] for _ in fields]
+    appends = [column.append for column in columns]
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        for channel in iter_m3u_chunks(iter_blocks(data, start, end), encoding, header):
+            for append, field in zip(appends, fields):
+                append(getattr(channel, field))
+    texts = ['\n'.join(column) for column in columns[:len(TEXT_FIELDS)]]
+    return marshal.dumps((header, texts, columns[len(TEXT_FIELDS):]))
+
+
+def load_range(data):
+    # The header and Channels of a parse_range() result
+    header, texts, (durations, attrs, options) = marshal.loads(data)
+    if not durations:
+        return header, []
+    title, url, tvg_id, tvg_name, tvg_logo, group_title, catchup = (text.split('\n') for text in texts)
+    return header, map(Channel, title, url, durations, tvg_id, tvg_name, tvg_logo, group_title, catchup,
+                       repeat(''), attrs, options)
+
+
+def iter_m3u_file_parallel(path, header=None, workers=None, progress=None, cancelled=None):
+    # Channels of a local playlist, in file order, identical to what
+    # iter_m3u_file gives. Large files are split on entry boundaries and
+    # parsed by a pool of processes; smaller ones, UTF-16 ones, or any
+    # with a single core, are parsed here. ``progress`` is called with the
+    # bytes parsed so far, and ``cancelled`` is checked between ranges.
+    workers = workers or default_workers()
+    size = os.path.getsize(path)
+    encoding = 'utf-8'
+    if workers >= 2 and size >= PARALLEL_MIN_BYTES:
+        with open(path, 'rb') as f:
+            encoding, offset = detect_encoding(f.read(SNIFF_BYTES))
+    if workers < 2 or size < PARALLEL_MIN_BYTES or not is_ascii_compatible(encoding):
+        yield from iter_m3u_file(path, header=header, progress=progress, cancelled=cancelled)
+        return
+
+    ranges = split_ranges(path, workers * RANGES_PER_WORKER)
+    ranges[0] = (offset, ranges[0][1])
+    # Spawned rather than forked: the GUI calls this from a thread, and
+    # forking a threaded process is not safe
+    context = multiprocessing.get_context('spawn')
+    pool = ProcessPoolExecutor(min(workers, len(ranges)), mp_context=context)
+    try:
+        futures = [pool.submit(parse_range, path, start, end, encoding) for start, end in ranges]
+        for future, (start, end) in zip(futures, ranges):
+            if cancelled is not None and cancelled():
+                return
+            range_header, channels = load_range(future.result())
+            if header is not None:
+                header.update(range_header)
+            yield from channels
+            if progress is not None:
+                progress(end)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
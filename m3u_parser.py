@@ -0,0 +1,248 @@
+import codecs
+import mmap
+import os
+import re
+
+CHUNK_SIZE = 64 * 1024
+
+# The encoding of a local file is guessed from this many leading bytes
+SNIFF_BYTES = 1024 * 1024
+
+# Byte order marks, longest first: (mark, encoding of the text after it)
+BOMS = ((codecs.BOM_UTF8, 'utf-8'), (codecs.BOM_UTF16_LE, 'utf-16-le'), (codecs.BOM_UTF16_BE, 'utf-16-be'))
+
+# Largest duration kept, in seconds: what a 32-bit array('i') holds
+MAX_DURATION = 2 ** 31 - 1
+
+# key="value" pairs inside an #EXTINF line (tvg-id, tvg-name, group-title, ...)
+_ATTR_RE = re.compile(r'([A-Za-z0-9_-]+)="([^"]*)"')
+
+# Per-entry option lines that may sit between #EXTINF and the stream URL
+_OPTION_PREFIXES = ('#EXTVLCOPT:', '#KODIPROP:')
+
+
+class Channel:
+    # Attributes with a dedicated slot; anything else goes into ``attrs``
+    KNOWN_ATTRS = {
+        'tvg-id': 'tvg_id',
+        'tvg-name': 'tvg_name',
+        'tvg-logo': 'tvg_logo',
+        'group-title': 'group_title',
+        'catchup': 'catchup',
+    }
+
+    __slots__ = ('title', 'url', 'duration', 'tvg_id', 'tvg_name', 'tvg_logo',
+                 'group_title', 'catchup', 'source', 'attrs', 'options')
+
+    def __init__(self, title, url='', duration=-1, tvg_id='', tvg_name='',
+                 tvg_logo='', group_title='', catchup='', source='', attrs=None, options=None):
+        self.title = title
+        self.url = url
+        self.duration = duration
+        self.tvg_id = tvg_id
+        self.tvg_name = tvg_name
+        self.tvg_logo = tvg_logo
+        self.group_title = group_title
+        self.catchup = catchup
+        self.source = source        # Playlist URL the channel came from
+        self.attrs = attrs          # Extra #EXTINF attributes, or None
+        self.options = options      # #EXTVLCOPT/#KODIPROP lines, or None
+
+    def __repr__(self):
+        return f"Channel({self.title!r}, {self.url!r})"
+
+    def __eq__(self, other):
+        if not isinstance(other, Channel):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+
+def parse_extinf(line):
+    # '#EXTINF:-1 tvg-id="a" group-title="News, World",Channel Name'
+    body = line[8:]
+
+    # The title starts after the first comma that is not inside quotes
+    comma = body.find(',')
+    while comma != -1 and body.count('"', 0, comma) % 2:
+        comma = body.find(',', comma + 1)
+    if comma == -1:
+        header, title = body, ''
+    else:
+        header, title = body[:comma], body[comma + 1:].strip()
+
+    duration = header.split(None, 1)[0] if header.strip() else '-1'
+    try:
+        duration = int(float(duration))
+    except (ValueError, OverflowError):
+        duration = -1
+    # Durations are stored as C ints (ChannelStore.durations); anything
+    # past that is as meaningless as 'inf' or 'nan'
+    if not -1 <= duration <= MAX_DURATION:
+        duration = -1
+
+    channel = Channel(title, duration=duration)
+    extra = None
+    for key, value in _ATTR_RE.findall(header):
+        slot = Channel.KNOWN_ATTRS.get(key.lower())
+        if slot:
+            setattr(channel, slot, value)
+        else:
+            if extra is None:
+                extra = {}
+            extra[key] = value
+    channel.attrs = extra
+
+    if not channel.title:
+        channel.title = channel.tvg_name
+    return channel
+
+
+def iter_m3u(lines, header=None):
+    # Yield a Channel for every #EXTINF entry that is followed by a URL.
+    # Option lines may appear between the two; a new #EXTINF without a URL
+    # in between simply replaces the pending entry. Attributes of the
+    # #EXTM3U line (x-tvg-url, ...) go into ``header`` when one is given.
+    pending = None
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line[0] == '#':
+            if line.startswith('#EXTINF:'):
+                pending = parse_extinf(line)
+            elif header is not None and line.startswith('#EXTM3U'):
+                header.update(_ATTR_RE.findall(line))
+            elif pending is not None:
+                if line.startswith(_OPTION_PREFIXES):
+                    if pending.options is None:
+                        pending.options = []
+                    pending.options.append(line)
+                elif line.startswith('#EXTGRP:') and not pending.group_title:
+                    pending.group_title = line[8:].strip()
+            continue
+        if pending is not None:
+            pending.url = line
+            if pending.title:
+                yield pending
+            pending = None
+
+
+def detect_encoding(head):
+    # (encoding, byte order mark length) of a playlist from its first
+    # bytes: a byte order mark; UTF-16 without one, told by its zero
+    # bytes; UTF-8 when the bytes are valid UTF-8; otherwise CP1256, the
+    # Windows Arabic code page older exports are saved in
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding, len(bom)
+    sample = head[:4096]
+    if sample.count(0) > len(sample) // 4:
+        zeros_first = sample[0::2].count(0) > sample[1::2].count(0)
+        return ('utf-16-be' if zeros_first else 'utf-16-le'), 0
+    try:
+        head.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # A character cut off by the end of the sample is not an error
+        if e.reason != 'unexpected end of data' or len(head) - e.start > 3:
+            return 'cp1256', 0
+    return 'utf-8', 0
+
+
+def is_ascii_compatible(encoding):
+    return not encoding.startswith('utf-16')
+
+
+def iter_blocks(data, start, end, block_size=CHUNK_SIZE, progress=None, cancelled=None):
+    # data[start:end] a block at a time. ``progress`` is called with the
+    # offset reached and ``cancelled`` checked, once per block. Pages of a
+    # memory map are handed back once their block is copied out, so a
+    # large file does not stay resident in this process.
+    release = getattr(data, 'madvise', None) if hasattr(mmap, 'MADV_DONTNEED') else None
+    for position in range(start, end, block_size):
+        if cancelled is not None and cancelled():
+            return
+        stop = min(position + block_size, end)
+        yield data[position:stop]
+        if release is not None:
+            first = position - position % mmap.PAGESIZE
+            release(mmap.MADV_DONTNEED, first, stop - first)
+        if progress is not None:
+            progress(stop)
+
+
+def iter_lines(chunks, encoding='utf-8-sig'):
+    # Turn an iterable of byte chunks into text lines while only ever
+    # holding one chunk plus the current partial line in memory
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    remainder = ''
+    for chunk in chunks:
+        if not chunk:
+            continue
+        lines = (remainder + decoder.decode(chunk)).split('\n')
+        remainder = lines.pop()
+        yield from lines
+    remainder += decoder.decode(b'', final=True)
+    if remainder:
+        yield remainder
+
+
+def iter_m3u_chunks(chunks, encoding='utf-8-sig', header=None):
+    return iter_m3u(iter_lines(chunks, encoding), header)
+
+
+def iter_m3u_response(response, chunk_size=CHUNK_SIZE):
+    # ``response`` must come from requests.get(..., stream=True)
+    return iter_m3u_chunks(response.iter_content(chunk_size))
+
+
+def iter_m3u_file(path, chunk_size=CHUNK_SIZE, header=None, progress=None, cancelled=None):
+    # Channels of a local playlist in UTF-8, UTF-16 or CP1256. The file is
+    # memory-mapped and decoded a block at a time, so a large playlist
+    # never becomes one large string. ``progress`` and ``cancelled`` are
+    # as for iter_blocks().
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if not size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            encoding, offset = detect_encoding(data[:SNIFF_BYTES])
+            yield from iter_m3u_chunks(iter_blocks(data, offset, size, chunk_size, progress, cancelled),
+                                       encoding, header)
+
+
+def parse_m3u(content):
+    # Convenience wrapper for playlists that are already in memory
+    return list(iter_m3u(content.splitlines()))
+
+
+def is_channel_list(path):
+    # Whether a local .m3u/.m3u8 file lists channels for the browser,
+    # rather than being an HLS playlist of one stream for the player
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(64 * 1024)
+    except OSError:
+        return False
+    encoding, offset = detect_encoding(head)
+    text = head[offset:].decode(encoding, 'replace')
+    return '#EXTINF' in text and '#EXT-X-' not in text
+
+
+def guide_urls(header):
+    # XMLTV guide URLs named by an #EXTM3U header; providers use either
+    # attribute, sometimes with several comma-separated URLs
+    urls = []
+    for key in ('x-tvg-url', 'url-tvg'):
+        urls.extend(url.strip() for url in header.get(key, '').split(','))
+    return [url for url in dict.fromkeys(urls) if url]
+
+
+def format_entry(channel):
+    # The M3U lines for ``channel``, in the form iter_m3u reads back
+    attrs = [(key, getattr(channel, slot)) for key, slot in Channel.KNOWN_ATTRS.items()]
+    attrs.extend((channel.attrs or {}).items())
+    header = ''.join(f' {key}="{value.replace(chr(34), chr(39))}"' for key, value in attrs if value)
+    lines = [f"#EXTINF:{channel.duration}{header},{channel.title}"]
+    lines.extend(channel.options or ())
+    lines.append(channel.url)
+    return '\n'.join(lines) + '\n'
@@ -1,16 +1,42 @@
 import sys
-import vlc
+import threading
+import time
 import os
+from startup_profile import StartupProfile
+
+# Set up before the remaining imports, so --profile-startup can time them
+profile = StartupProfile.from_argv(sys.argv)
+
+import argparse
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
                            QPushButton, QFileDialog, QHBoxLayout, QLabel,
                            QSlider, QMenuBar, QMenu, QStatusBar, QAction, QInputDialog, 
-                           QLineEdit, QMessageBox, QToolBar, QComboBox, QSizePolicy)
-from PyQt5.QtCore import Qt, QTimer, QSize
-from PyQt5.QtGui import QIcon, QPixmap
-from playlist_viewer import PlaylistViewer
+                           QLineEdit, QMessageBox, QToolBar, QComboBox, QSizePolicy, QCompleter,
+                           QDockWidget)
+from PyQt5.QtCore import Qt, QEvent, QModelIndex, QTimer, QSize, pyqtSignal
+from PyQt5.QtGui import QIcon
+from categorizer import Categorizer
+from metrics import metrics
+
+# VLC, the playlist viewer (with the channel model, cache and prober) and
+# the HTTP stack are imported and created when first needed, after the
+# window is up: see ensure_player(), ensure_playlist_viewer() and
+# ensure_resolver().
+
+# Metrics given with --metrics are written out this often, and on exit
+METRICS_INTERVAL = 10 * 1000
+
+# Channels either side of the playing one that get their media prepared;
+# the same as ChannelZapper.NEIGHBOURS, without importing VLC for it
+NEIGHBOURS = 2
 
 class MediaPlayer(QMainWindow):
-    def __init__(self):
+    # Emitted from worker and VLC threads, handled on the GUI thread
+    stream_resolved = pyqtSignal(int, str, float)  # Start request, URL to play, resolve seconds
+    zap_finished = pyqtSignal(str, float, str)  # URL, seconds since the start request, VLC event
+    neighbours_resolved = pyqtSignal(int, list)  # Start request, neighbour URLs to play
+
+    def __init__(self, profile=profile):
         super().__init__()
         self.setWindowTitle("Universal Media Player")
         self.setGeometry(100, 100, 800, 600)
@@ -98,18 +124,35 @@ class MediaPlayer(QMainWindow):
             }
         """)
 
-        # Create playlist viewer
-        self.playlist_viewer = PlaylistViewer()
-        self.playlist_viewer.channel_selected.connect(self.play_channel)
+        profile.mark("style sheet")
 
-        # Set window icon
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        icon_path = os.path.join(script_dir, "logo.svg")
-        self.setWindowIcon(QIcon(icon_path))
+        # Created when first needed: see ensure_playlist_viewer()
+        self.playlist_viewer = None
+        self.stats_dock = None
 
-        # Create VLC instance and media player
-        self.instance = vlc.Instance()
-        self.mediaplayer = self.instance.media_player_new()
+        # Set window icon; the SVG is only rendered at the sizes asked for
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        self.logo = QIcon(os.path.join(script_dir, "logo.svg"))
+        self.setWindowIcon(self.logo)
+
+        # VLC instance and media player, created by ensure_player() on first
+        # use: creating the instance scans VLC's plugins
+        self.instance = None
+        self.mediaplayer = None
+        self.zapper = None
+        self.telemetry = None
+
+        # HLS master playlists are resolved to one variant before VLC opens
+        # them; ensure_resolver() creates the resolver with its HTTP session
+        self.resolver = None
+        self.start_request = 0  # Bumped for every stream start; late resolutions are dropped
+        self.start_clock = None  # (resolve seconds, mode) until VLC starts playing
+        self.start_message = ''
+        self.start_neighbours = []  # Channels to prepare once the current start is under way
+        self.start_times = {'direct': [], 'resolved': [], 'cached': []}  # Start latency in seconds per mode
+        self.stream_resolved.connect(self.on_stream_resolved)
+        self.zap_finished.connect(self.on_zap_finished)
+        self.neighbours_resolved.connect(self.on_neighbours_resolved)
         
         # Create central widget and layout
         self.central_widget = QWidget()
@@ -118,6 +161,7 @@ class MediaPlayer(QMainWindow):
 
         # Create toolbar
         self.create_toolbar()
+        profile.mark("toolbar")
 
         # Create video widget
         self.video_widget = QWidget()
@@ -165,6 +209,8 @@ class MediaPlayer(QMainWindow):
 
         self.layout.addLayout(self.controls_layout)
 
+        profile.mark("video area and controls")
+
         # Create menu bar
         self.create_menu_bar()
 
@@ -172,10 +218,18 @@ class MediaPlayer(QMainWindow):
         self.statusBar = QStatusBar()
         self.setStatusBar(self.statusBar)
 
-        # Timer for updating the time slider
-        self.timer = QTimer(self)
-        self.timer.setInterval(100)
-        self.timer.timeout.connect(self.update_ui)
+        # Playback statistics next to the status messages
+        self.stats_label = QLabel()
+        self.statusBar.addPermanentWidget(self.stats_label)
+
+        # Time, position and state follow VLC's events (see ensure_player);
+        # refreshes are coalesced to one per display frame and skipped while hidden
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.timeout.connect(self.refresh_playback)
+        refresh_rate = QApplication.primaryScreen().refreshRate() if QApplication.primaryScreen() else 0
+        self.frame_interval = 1.0 / (refresh_rate if refresh_rate > 0 else 60)
+        self.last_refresh = 0.0
 
         # Setup fullscreen handling
         self.is_fullscreen = False
@@ -185,7 +239,54 @@ class MediaPlayer(QMainWindow):
         self.setup_shortcuts()
 
         self.is_playing = False
+        profile.mark("menus, status bar, shortcuts")
+
+    def ensure_player(self):
+        # The VLC instance and everything that depends on it
+        if self.mediaplayer is not None:
+            return self.mediaplayer
+        import vlc
+        from playback_telemetry import PlaybackTelemetry
+        from zapper import ChannelZapper
+        self.instance = vlc.Instance()
+        self.mediaplayer = self.instance.media_player_new()
+
+        # Channel switches reuse prepared media and are timed to the first frame
+        self.zapper = ChannelZapper(self.instance, self.mediaplayer,
+                                    lambda url, seconds, event: self.zap_finished.emit(url, seconds, event))
+        self.telemetry = PlaybackTelemetry(self.mediaplayer, self)
+        self.telemetry.changed.connect(self.on_playback_changed)
+        self.mediaplayer.audio_set_volume(self.volume_slider.value())
         self.setup_ui()
+        return self.mediaplayer
+
+    def ensure_resolver(self):
+        if self.resolver is None:
+            from hls_resolver import HlsResolver
+            self.resolver = HlsResolver()
+        return self.resolver
+
+    def ensure_playlist_viewer(self):
+        if self.playlist_viewer is not None:
+            return self.playlist_viewer
+        from playlist_viewer import PlaylistViewer
+        from channel_model import ChannelListModel
+        self.playlist_viewer = PlaylistViewer()
+        self.playlist_viewer.channel_selected.connect(self.play_channel)
+
+        # The toolbar combos list the viewer's model from now on
+        model = self.playlist_viewer.model
+        self.category_combo.blockSignals(True)
+        self.category_combo.clear()
+        self.category_combo.addItems(model.categories)
+        self.category_combo.blockSignals(False)
+        self.content_combo.setModel(model)
+        self.content_combo.view().setUniformItemSizes(True)
+        model.modelReset.connect(self.restore_content_root)
+        self.completion_model = ChannelListModel(model, self)
+        self.completer.setModel(self.completion_model)
+        self.on_category_changed(self.category_combo.currentText())
+        return self.playlist_viewer
 
     def create_toolbar(self):
         # Create toolbar
@@ -193,18 +294,38 @@ class MediaPlayer(QMainWindow):
         self.toolbar.setIconSize(QSize(32, 32))
         self.addToolBar(self.toolbar)
 
-        # Add category selector
+        # Add category selector. Until the playlist viewer exists there are
+        # no channels, so the categories come straight from the rules file.
         self.category_combo = QComboBox()
-        self.category_combo.addItems(["Live TV", "Movies", "Series", "Sports", "News", "Kids", "Music"])
+        try:
+            self.category_combo.addItems(Categorizer.load().categories)
+        except (OSError, ValueError):
+            self.category_combo.addItems(Categorizer().categories)
         self.category_combo.currentTextChanged.connect(self.on_category_changed)
         self.toolbar.addWidget(self.category_combo)
 
-        # Add channel/content selector
+        # Add channel/content selector. It lists one category of the playlist
+        # viewer's model, so rows are fetched lazily as the popup scrolls, and
+        # it only plays a channel the user activates.
         self.content_combo = QComboBox()
         self.content_combo.setMinimumWidth(200)
-        self.content_combo.currentTextChanged.connect(self.on_content_selected)
+        self.content_combo.setEditable(True)
+        self.content_combo.setInsertPolicy(QComboBox.NoInsert)
+        self.content_combo.lineEdit().setPlaceholderText("Type to find a channel...")
+        self.content_combo.activated.connect(self.on_content_activated)
         self.toolbar.addWidget(self.content_combo)
 
+        # Type-to-find over the category's titles through a sorted prefix
+        # index; the combo's own completer would scan the rows instead.
+        # The model behind it is set by ensure_playlist_viewer().
+        self.content_combo.setCompleter(None)
+        self.completion_model = None
+        self.completer = QCompleter(self)
+        self.completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+        self.completer.setWidget(self.content_combo.lineEdit())
+        self.completer.activated[QModelIndex].connect(self.on_completion_activated)
+        self.content_combo.lineEdit().textEdited.connect(self.on_content_text_edited)
+
         # Add spacer
         spacer = QWidget()
         spacer.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
@@ -216,11 +337,9 @@ class MediaPlayer(QMainWindow):
         logo_layout.setContentsMargins(0, 0, 0, 0)
         logo_layout.setSpacing(5)
 
-        # Add logo
+        # Add logo, rendered once at the size shown
         logo_label = QLabel()
-        pixmap = QPixmap(os.path.join(os.path.dirname(os.path.abspath(__file__)), "logo.svg"))
-        scaled_pixmap = pixmap.scaled(32, 32, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        logo_label.setPixmap(scaled_pixmap)
+        logo_label.setPixmap(self.logo.pixmap(32, 32))
         logo_layout.addWidget(logo_label)
 
         # Add name label with custom styling
@@ -239,21 +358,50 @@ class MediaPlayer(QMainWindow):
         self.toolbar.addWidget(logo_container)
 
     def on_category_changed(self, category):
-        # Clear current content combo
-        self.content_combo.clear()
-        
-        # Get items from playlist viewer for the selected category
-        if hasattr(self.playlist_viewer, 'categories') and category in self.playlist_viewer.categories:
-            category_item = self.playlist_viewer.categories[category]
-            for i in range(category_item.childCount()):
-                item = category_item.child(i)
-                self.content_combo.addItem(item.text(0))
-
-    def on_content_selected(self, content):
-        # Play the selected content if it exists in the channels dictionary
-        if content in self.playlist_viewer.channels:
-            url = self.playlist_viewer.channels[content]
-            self.play_channel(url, content)
+        # Point content_combo at the category; no items are copied
+        if self.playlist_viewer is None:
+            return
+        model = self.playlist_viewer.model
+        self.content_combo.setRootModelIndex(model.index(model.category_rows[category], 0))
+        self.content_combo.setCurrentIndex(-1)
+
+    def restore_content_root(self):
+        # A model reset (new playlist, search, health options) drops the root
+        text = self.content_combo.currentText()
+        self.on_category_changed(self.category_combo.currentText())
+        self.content_combo.setEditText(text)
+
+    def on_content_activated(self, row):
+        if self.playlist_viewer is None:
+            return
+        model = self.playlist_viewer.model
+        self.play_index(model.index(row, 0, self.content_combo.rootModelIndex()))
+
+    def on_content_text_edited(self, text):
+        if self.playlist_viewer is None:
+            return
+        with metrics.span('search.complete'):
+            channel_ids = self.playlist_viewer.model.complete(self.category_combo.currentText(), text)
+        self.completion_model.set_channel_ids(channel_ids)
+        if channel_ids:
+            self.completer.complete()
+        else:
+            self.completer.popup().hide()
+
+    def on_completion_activated(self, index):
+        from channel_model import ChannelIdRole
+        channel_id = index.data(ChannelIdRole)
+        if channel_id is None:
+            return
+        model = self.playlist_viewer.model
+        self.content_combo.setEditText(model.store.title[channel_id])
+        self.play_index(model.channel_index(channel_id))
+
+    def play_index(self, index):
+        model = self.playlist_viewer.model
+        channel_id = model.channel_id(index)
+        if channel_id is not None:
+            self.start_channel(channel_id, model.neighbour_urls(index, NEIGHBOURS))
 
     def setup_shortcuts(self):
         # F11 for fullscreen
@@ -328,6 +476,26 @@ class MediaPlayer(QMainWindow):
         exit_action.triggered.connect(self.close)
         file_menu.addAction(exit_action)
         
+        # Playback menu
+        playback_menu = menubar.addMenu("Playback")
+
+        # Resolve HLS master playlists before playing them
+        self.resolve_action = QAction("Resolve HLS Variants", self)
+        self.resolve_action.setCheckable(True)
+        self.resolve_action.setChecked(True)
+        playback_menu.addAction(self.resolve_action)
+
+        # Channel start latency with and without resolving
+        start_times_action = QAction("Channel Start Times", self)
+        start_times_action.triggered.connect(self.show_start_times)
+        playback_menu.addAction(start_times_action)
+
+        # Timings and counters of the hot paths, in a dock
+        statistics_action = QAction("Statistics", self)
+        statistics_action.setShortcut("Ctrl+Shift+S")
+        statistics_action.triggered.connect(self.show_statistics)
+        playback_menu.addAction(statistics_action)
+
         # Subtitle menu
         subtitle_menu = menubar.addMenu("Subtitles")
         
@@ -337,32 +505,149 @@ class MediaPlayer(QMainWindow):
         subtitle_menu.addAction(load_subtitle_action)
 
     def show_playlist_viewer(self):
-        self.playlist_viewer.show()
-
-    def play_channel(self, url, name):
-        media = self.instance.media_new(url)
-        self.mediaplayer.set_media(media)
-        self.play_pause()
-        self.statusBar.showMessage(f"Playing: {name}")
+        self.ensure_playlist_viewer().show()
+
+    def play_channel(self, channel_id):
+        neighbours = self.playlist_viewer.neighbour_urls(NEIGHBOURS)
+        self.start_channel(channel_id, neighbours)
+
+    def start_channel(self, channel_id, neighbours=()):
+        # Channel IDs refer to the playlist viewer's current ChannelStore
+        store = self.playlist_viewer.model.store
+        self.start_stream(store.url[channel_id], f"Playing: {store.title[channel_id]}", neighbours)
+
+    def start_stream(self, url, message, neighbours=()):
+        # Times the start from here until VLC shows the first frame
+        self.start_request += 1
+        self.start_message = message
+        start = time.perf_counter()
+        self.start_neighbours = list(neighbours)
+        if not self.resolve_action.isChecked():
+            self.start_clock = (0.0, 'direct')
+            self.play_media(url, start)
+            return
+        from hls_resolver import looks_like_hls
+        # The resolver and its HTTP session only exist once an HLS stream was played
+        resolver = self.ensure_resolver() if looks_like_hls(url) else self.resolver
+        # Neighbours are prepared under the URL they will play from, so an
+        # HLS one waits until its variant is known; without a resolver yet,
+        # it is not prepared at all
+        self.start_neighbours, unresolved = [], []
+        for neighbour in neighbours:
+            if not looks_like_hls(neighbour):
+                self.start_neighbours.append(neighbour)
+            elif resolver is not None:
+                resolved = resolver.cached(neighbour)
+                if resolved is None:
+                    unresolved.append(neighbour)
+                else:
+                    self.start_neighbours.append(resolved)
+        resolved = resolver.cached(url) if resolver is not None else None
+        if not looks_like_hls(url):
+            self.start_clock = (0.0, 'direct')
+            self.play_media(url, start)
+        elif resolved is not None:
+            self.start_clock = (0.0, 'cached')
+            self.play_media(resolved, start)
+        else:
+            # Fetching the master playlist must not block the GUI; the
+            # neighbours are resolved after it, on the same thread
+            self.start_clock = (0.0, 'resolved')
+            self.statusBar.showMessage(f"Opening: {message}")
+            threading.Thread(target=self.resolve_stream, args=(self.start_request, url, start, unresolved),
+                             daemon=True).start()
+            return
+        if unresolved:
+            threading.Thread(target=self.resolve_neighbours, args=(self.start_request, unresolved),
+                             daemon=True).start()
+
+    def resolve_stream(self, request, url, start, neighbours=()):
+        resolved = self.resolver.resolve(url)
+        self.stream_resolved.emit(request, resolved, time.perf_counter() - start)
+        if neighbours:
+            self.resolve_neighbours(request, neighbours)
+
+    def resolve_neighbours(self, request, neighbours):
+        resolved = []
+        for neighbour in neighbours:
+            # Given up once another channel is started
+            if request != self.start_request:
+                return
+            resolved.append(self.resolver.resolve(neighbour))
+        self.neighbours_resolved.emit(request, resolved)
+
+    def on_neighbours_resolved(self, request, urls):
+        if request != self.start_request or self.zapper is None:
+            return
+        self.zapper.prepare(urls)
+
+    def on_stream_resolved(self, request, url, seconds):
+        if request != self.start_request:
+            return
+        self.start_clock = (seconds, 'resolved')
+        self.play_media(url, time.perf_counter() - seconds)
+
+    def play_media(self, url, start):
+        # Straight to the new media; no pause/resume toggling on the way
+        self.ensure_player()
+        if not self.zapper.switch(url, self.start_neighbours, start):
+            self.start_clock = None
+            metrics.count('zap.failures')
+            self.statusBar.showMessage(f"Could not play: {url}")
+            return
+        self.play_button.setText("Pause")
+        self.is_playing = True
+        self.statusBar.showMessage(self.start_message)
+
+    def on_zap_finished(self, url, elapsed, event):
+        # Pausing and resuming do not start a zap, so this is a fresh start
+        if self.start_clock is None:
+            return
+        resolve, mode = self.start_clock
+        self.start_clock = None
+        self.start_times[mode].append(elapsed)
+        metrics.record('zap.' + mode, elapsed)
+        if resolve:
+            metrics.record('hls.resolve', resolve)
+        detail = f"started in {elapsed * 1000:.0f} ms"
+        if resolve:
+            detail += f", {resolve * 1000:.0f} ms resolving"
+        self.statusBar.showMessage(f"{self.start_message} ({detail})")
+
+    def show_statistics(self):
+        # Created on first use; showing the panel turns metrics on
+        if self.stats_dock is None:
+            from stats_panel import StatsPanel
+            self.stats_dock = QDockWidget("Statistics", self)
+            self.stats_dock.setObjectName("statistics")
+            self.stats_dock.setWidget(StatsPanel(metrics, self.stats_dock))
+            self.addDockWidget(Qt.RightDockWidgetArea, self.stats_dock)
+        self.stats_dock.show()
+        self.stats_dock.raise_()
+
+    def show_start_times(self):
+        lines = []
+        for mode, times in self.start_times.items():
+            if times:
+                times = sorted(times)
+                lines.append(f"{mode}: {len(times)} starts, median {times[len(times) // 2] * 1000:.0f} ms, "
+                             f"worst {times[-1] * 1000:.0f} ms")
+        QMessageBox.information(self, "Channel Start Times", "\n".join(lines) or "No channel started yet")
 
     def open_url(self):
         url, ok = QInputDialog.getText(self, 'Open URL',
                                      'Enter video URL:', QLineEdit.Normal)
         if ok and url:
-            media = self.instance.media_new(url)
-            self.mediaplayer.set_media(media)
-            self.play_pause()
-            self.statusBar.showMessage(f"Playing URL: {url}")
+            self.start_stream(url, f"Playing URL: {url}")
 
     def open_stream(self):
         url, ok = QInputDialog.getText(self, 'Open IPTV Stream',
                                      'Enter IPTV stream URL (m3u/m3u8):', QLineEdit.Normal)
         if ok and url:
+            if self.open_channel_list(url):
+                return
             if url.lower().endswith(('.m3u', '.m3u8')):
-                media = self.instance.media_new(url)
-                self.mediaplayer.set_media(media)
-                self.play_pause()
-                self.statusBar.showMessage(f"Playing IPTV Stream: {url}")
+                self.start_stream(url, f"Playing IPTV Stream: {url}")
             else:
                 QMessageBox.warning(self, "Invalid Format",
                                   "Please enter a valid M3U/M3U8 playlist URL")
@@ -372,11 +657,21 @@ class MediaPlayer(QMainWindow):
         filename, _ = dialog.getOpenFileName(self, "Open Video",
                                            "",
                                            "Video Files (*.mp4 *.avi *.mkv *.mov);;IPTV Playlists (*.m3u *.m3u8);;All Files (*.*)")
-        if filename:
-            media = self.instance.media_new(filename)
-            self.mediaplayer.set_media(media)
-            self.play_pause()
-            self.statusBar.showMessage(f"Playing: {filename}")
+        if filename and not self.open_channel_list(filename):
+            self.start_stream(filename, f"Playing: {filename}")
+
+    def open_channel_list(self, source):
+        # Local channel lists (paths or file:// URLs) fill the browser
+        # instead of going to VLC as one item; returns whether it was one
+        from m3u_parser import is_channel_list
+        from playlist_reader import local_path
+        path = local_path(source)
+        if path is None or path == '-' or not is_channel_list(path):
+            return False
+        viewer = self.ensure_playlist_viewer()
+        viewer.load_file(source)
+        viewer.show()
+        return True
 
     def setup_ui(self):
         if sys.platform.startswith('linux'):  # for Linux
@@ -387,19 +682,20 @@ class MediaPlayer(QMainWindow):
             self.mediaplayer.set_nsobject(int(self.video_widget.winId()))
 
     def play_pause(self):
+        if self.mediaplayer is None:
+            # Nothing was opened yet
+            self.open_file()
+            return
         if self.mediaplayer.is_playing():
             self.mediaplayer.pause()
             self.play_button.setText("Play")
             self.is_playing = False
-            self.timer.stop()
         else:
             if self.mediaplayer.play() == -1:
                 self.open_file()
                 return
-            self.mediaplayer.play()
             self.play_button.setText("Pause")
             self.is_playing = True
-            self.timer.start()
 
     def load_subtitle(self):
         dialog = QFileDialog()
@@ -407,33 +703,120 @@ class MediaPlayer(QMainWindow):
                                            "",
                                            "Subtitle Files (*.srt *.ass *.ssa);;All Files (*.*)")
         if filename:
-            self.mediaplayer.video_set_subtitle_file(filename)
+            self.ensure_player().video_set_subtitle_file(filename)
             self.statusBar.showMessage(f"Loaded subtitles: {filename}")
 
     def set_volume(self):
         volume = self.volume_slider.value()
-        self.mediaplayer.audio_set_volume(volume)
+        if self.mediaplayer is not None:
+            self.mediaplayer.audio_set_volume(volume)
         self.volume_label.setText(f"Volume: {volume}%")
 
     def set_position(self):
         pos = self.time_slider.value()
-        self.mediaplayer.set_position(pos / 1000.0)
+        if self.mediaplayer is not None:
+            self.mediaplayer.set_position(pos / 1000.0)
+
+    def on_playback_changed(self):
+        # Hidden or minimised: leave the telemetry un-taken, so no further
+        # signals arrive until the window is shown again
+        if not self.isVisible() or self.isMinimized():
+            return
+        wait = self.last_refresh + self.frame_interval - time.perf_counter()
+        if wait > 0:
+            if not self.refresh_timer.isActive():
+                self.refresh_timer.start(int(wait * 1000) + 1)
+            return
+        self.refresh_playback()
+
+    def refresh_playback(self):
+        telemetry = self.telemetry
+        if telemetry is None:
+            return
+        from playback_telemetry import ENDED, ERROR, PAUSED, STOPPED, format_time
+        telemetry.take()
+        self.last_refresh = time.perf_counter()
+
+        # Widgets are only touched when what they show changes
+        if telemetry.live:
+            text = f"{format_time(telemetry.time)} / LIVE" if telemetry.time > 0 else "LIVE"
+        else:
+            text = f"{format_time(telemetry.time)} / {format_time(telemetry.length)}"
+        if self.time_label.text() != text:
+            self.time_label.setText(text)
+        self.time_slider.setEnabled(not telemetry.live)
+        position = 0 if telemetry.live else int(telemetry.position * 1000)
+        if self.time_slider.value() != position and not self.time_slider.isSliderDown():
+            self.time_slider.setValue(position)
+
+        playing = telemetry.state not in (PAUSED, STOPPED, ENDED, ERROR)
+        if playing != self.is_playing:
+            self.is_playing = playing
+            self.play_button.setText("Pause" if playing else "Play")
+        if telemetry.state == ERROR:
+            self.statusBar.showMessage(f"Playback failed: {self.start_message}")
+
+        telemetry.sample_stats()
+        stats = telemetry.describe_stats()
+        if self.stats_label.text() != stats:
+            self.stats_label.setText(stats)
+
+    def changeEvent(self, event):
+        # Catch up on whatever was skipped while minimised
+        super().changeEvent(event)
+        if event.type() == QEvent.WindowStateChange and not self.isMinimized():
+            self.refresh_playback()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh_playback()
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Universal Media Player")
+    parser.add_argument('--profile-startup', nargs='?', const='', metavar='FILE',
+                        help="Report time per startup phase and per import on standard error, "
+                             "and as JSON to FILE if given")
+    parser.add_argument('--metrics', metavar='FILE',
+                        help="Collect metrics and write them to FILE every few seconds and on exit: "
+                             "Prometheus text for a .prom file, JSON lines otherwise")
+    # Exits once the deferred setup has been timed; used by benchmarks/bench_startup.py
+    parser.add_argument('--quit-after-startup', action='store_true', help=argparse.SUPPRESS)
+    # Qt's own options (-style, ...) are left for QApplication
+    return parser.parse_known_args(argv)[0]
+
+
+def finish_startup_profile(player, args):
+    profile.mark("first window")
+    if args.quit_after_startup:
+        # What the lazy start moved out of the way, timed on its own
+        player.ensure_playlist_viewer()
+        profile.mark("playlist viewer (deferred)")
+        try:
+            player.ensure_player()
+        except Exception as e:
+            print(f"VLC unavailable: {e}", file=sys.stderr)
+        profile.mark("VLC player (deferred)")
+    profile.report()
+    if args.profile_startup:
+        profile.dump(args.profile_startup)
+    if args.quit_after_startup:
+        QApplication.quit()
 
-    def update_ui(self):
-        media_pos = int(self.mediaplayer.get_position() * 1000)
-        self.time_slider.setValue(media_pos)
-        
-        # Update time display
-        if self.mediaplayer.is_playing():
-            time_current = self.mediaplayer.get_time() // 1000  # Current time in seconds
-            duration = self.mediaplayer.get_length() // 1000    # Total length in seconds
-            
-            current_str = f"{time_current//60:02d}:{time_current%60:02d}"
-            total_str = f"{duration//60:02d}:{duration%60:02d}"
-            self.time_label.setText(f"{current_str} / {total_str}")
 
 if __name__ == '__main__':
+    args = parse_args(sys.argv[1:])
+    profile.mark("imports")
     app = QApplication(sys.argv)
+    profile.mark("QApplication")
     player = MediaPlayer()
     player.show()
+    if args.metrics:
+        metrics.enabled = True
+        export_timer = QTimer()
+        export_timer.timeout.connect(lambda: metrics.export(args.metrics))
+        export_timer.start(METRICS_INTERVAL)
+        app.aboutToQuit.connect(lambda: metrics.export(args.metrics))
+    if profile.enabled:
+        # Runs once the event loop has shown the window
+        QTimer.singleShot(0, lambda: finish_startup_profile(player, args))
     sys.exit(app.exec_())
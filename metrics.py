@@ -0,0 +1,162 @@
+import json
+import os
+import re
+import threading
+import time
+
+# Prometheus metric names: lower case, underscores, this prefix
+PREFIX = 'ump_'
+
+SPAN = 'span'           # Durations in seconds
+COUNTER = 'counter'     # Running totals (bytes, channels, stalls)
+VALUE = 'value'         # Sampled values (bytes/s)
+
+
+class Stat:
+    __slots__ = ('kind', 'count', 'total', 'min', 'max', 'last')
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+        self.last = None
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.last = value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def as_dict(self):
+        return {'kind': self.kind, 'count': self.count, 'total': self.total,
+                'min': self.min, 'max': self.max, 'last': self.last}
+
+
+class Span:
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class NullSpan:
+    # What span() hands out while metrics are off: nothing is timed
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Metrics:
+    # Timing spans, counters and sampled values for the hot paths, keyed by
+    # dotted names ("playlist.parse"). Recording is thread-safe: loader and
+    # VLC threads record alongside the GUI. While ``enabled`` is False every
+    # call returns straight away, and span() hands out a shared no-op, so
+    # instrumented code costs an attribute check.
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.stats = {}             # Name -> Stat
+        self.lock = threading.Lock()
+        self.started = time.time()
+
+    def span(self, name):
+        return Span(self, name) if self.enabled else NULL_SPAN
+
+    def record(self, name, seconds):
+        self.add(name, SPAN, seconds)
+
+    def count(self, name, value=1):
+        self.add(name, COUNTER, value)
+
+    def observe(self, name, value):
+        self.add(name, VALUE, value)
+
+    def add(self, name, kind, value):
+        if not self.enabled:
+            return
+        with self.lock:
+            stat = self.stats.get(name)
+            if stat is None:
+                stat = self.stats[name] = Stat(kind)
+            stat.add(value)
+
+    def reset(self):
+        with self.lock:
+            self.stats = {}
+            self.started = time.time()
+
+    def snapshot(self):
+        # Name -> dict of the Stat's fields, sorted by name
+        with self.lock:
+            return {name: self.stats[name].as_dict() for name in sorted(self.stats)}
+
+    def export(self, path):
+        # Prometheus text format for .prom files, a JSON line otherwise
+        if path.endswith('.prom'):
+            self.write_prometheus(path)
+        else:
+            self.write_jsonl(path)
+
+    def write_jsonl(self, path):
+        # Appends one line per call, so a file collects a time series
+        line = json.dumps({'time': round(time.time(), 3), 'since': round(self.started, 3),
+                           'metrics': self.snapshot()}, ensure_ascii=False)
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+    def write_prometheus(self, path):
+        # Replaced as a whole, as node_exporter's textfile collector expects
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(format_prometheus(self.snapshot()))
+        os.replace(tmp, path)
+
+
+def metric_name(name):
+    return PREFIX + re.sub(r'[^a-zA-Z0-9_]', '_', name).lower()
+
+
+def format_prometheus(snapshot):
+    lines = []
+    for name, stat in snapshot.items():
+        base = metric_name(name)
+        if stat['kind'] == SPAN:
+            base += '_seconds'
+            lines += [f'# TYPE {base} summary',
+                      f'{base}_count {stat["count"]}',
+                      f'{base}_sum {stat["total"]:.6f}',
+                      f'# TYPE {base}_max gauge',
+                      f'{base}_max {stat["max"]:.6f}']
+        elif stat['kind'] == COUNTER:
+            lines += [f'# TYPE {base}_total counter',
+                      f'{base}_total {stat["total"]:g}']
+        else:
+            lines += [f'# TYPE {base} gauge',
+                      f'{base} {stat["last"]:g}',
+                      f'# TYPE {base}_max gauge',
+                      f'{base}_max {stat["max"]:g}']
+    return '\n'.join(lines) + '\n' if lines else ''
+
+
+# The process-wide registry the instrumented modules record into
+metrics = Metrics()
@@ -0,0 +1,160 @@
+import time
+import vlc
+from PyQt5.QtCore import QObject, pyqtSignal
+from metrics import metrics
+
+# Playback states, as shown to the user
+STOPPED = 'Stopped'
+OPENING = 'Opening'
+BUFFERING = 'Buffering'
+PLAYING = 'Playing'
+PAUSED = 'Paused'
+ENDED = 'Ended'
+ERROR = 'Error'
+
+
+def format_time(ms):
+    # "MM:SS" below an hour, "H:MM:SS" from there on; unknown times are "--:--"
+    if ms is None or ms < 0:
+        return "--:--"
+    seconds = ms // 1000
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes:02d}:{seconds:02d}"
+
+
+class PlaybackTelemetry(QObject):
+    # Keeps the latest playback time, length, position and state as VLC
+    # reports them through its event manager; nothing is polled. Events
+    # arrive on a VLC thread and only store values; ``changed`` is emitted
+    # once, and not again until the GUI has called take(), so any number of
+    # events between two refreshes costs a single queued signal.
+    changed = pyqtSignal()
+
+    # Stats are read from libvlc at most this often
+    STATS_INTERVAL = 1.0
+
+    def __init__(self, player, parent=None):
+        super().__init__(parent)
+        self.player = player
+        self.reset()
+        self.notified = False
+        events = player.event_manager()
+        handlers = {
+            vlc.EventType.MediaPlayerTimeChanged: self.on_time_changed,
+            vlc.EventType.MediaPlayerLengthChanged: self.on_length_changed,
+            vlc.EventType.MediaPlayerPositionChanged: self.on_position_changed,
+            vlc.EventType.MediaPlayerBuffering: self.on_buffering,
+            vlc.EventType.MediaPlayerEncounteredError: self.on_error,
+            vlc.EventType.MediaPlayerOpening: lambda event: self.set_state(OPENING),
+            vlc.EventType.MediaPlayerPlaying: lambda event: self.set_state(PLAYING),
+            vlc.EventType.MediaPlayerPaused: lambda event: self.set_state(PAUSED),
+            vlc.EventType.MediaPlayerStopped: lambda event: self.set_state(STOPPED),
+            vlc.EventType.MediaPlayerEndReached: lambda event: self.set_state(ENDED),
+            vlc.EventType.MediaPlayerMediaChanged: self.on_media_changed,
+        }
+        for event_type, handler in handlers.items():
+            events.event_attach(event_type, handler)
+
+    def reset(self):
+        self.time = 0               # Milliseconds played
+        self.length = 0             # Milliseconds; 0 or less for live streams
+        self.position = 0.0         # 0..1
+        self.state = STOPPED
+        self.cache = 100.0          # Buffer fill in percent while buffering
+        self.stalls = 0             # Times playback ran dry after it had started
+        self.stalling = False
+        self.stalled_at = 0.0       # perf_counter() when the current stall began
+        self.bitrate = 0.0          # Input bitrate in kbit/s
+        self.dropped = 0            # Pictures lost since the media started
+        self.displayed = 0
+        self.stats_at = 0.0
+
+    @property
+    def live(self):
+        return self.length <= 0
+
+    def notify(self):
+        if not self.notified:
+            self.notified = True
+            self.changed.emit()
+
+    def take(self):
+        # Called by the GUI when it refreshes; the next event notifies again
+        self.notified = False
+
+    def on_time_changed(self, event):
+        self.time = event.u.new_time
+        self.notify()
+
+    def on_length_changed(self, event):
+        self.length = event.u.new_length
+        self.notify()
+
+    def on_position_changed(self, event):
+        self.position = event.u.new_position
+        self.notify()
+
+    def on_buffering(self, event):
+        self.cache = event.u.new_cache
+        if self.cache < 100:
+            if self.state == PLAYING and not self.stalling:
+                # Buffering after playback started means the stream ran dry
+                self.stalls += 1
+                self.stalling = True
+                self.stalled_at = time.perf_counter()
+                metrics.count('playback.stalls')
+        else:
+            if self.stalling:
+                metrics.record('playback.stall', time.perf_counter() - self.stalled_at)
+            self.stalling = False
+        self.notify()
+
+    def on_error(self, event):
+        self.state = ERROR
+        metrics.count('playback.errors')
+        self.notify()
+
+    def on_media_changed(self, event):
+        self.reset()
+        self.notify()
+
+    def set_state(self, state):
+        self.state = state
+        self.notify()
+
+    def sample_stats(self):
+        # Bitrate and dropped frames from media.get_stats; GUI thread only
+        now = time.monotonic()
+        if now - self.stats_at < self.STATS_INTERVAL:
+            return False
+        self.stats_at = now
+        media = self.player.get_media()
+        if media is None:
+            return False
+        try:
+            stats = vlc.MediaStats()
+            if not media.get_stats(stats):
+                return False
+        finally:
+            # get_media() hands out a new reference
+            media.release()
+        # Scaled the way VLC's own statistics panel does it
+        self.bitrate = stats.input_bitrate * 8000
+        self.dropped = stats.lost_pictures
+        self.displayed = stats.displayed_pictures
+        return True
+
+    def describe_stats(self):
+        parts = [self.state]
+        if self.cache < 100 and self.state in (OPENING, PLAYING):
+            parts[0] = f"{BUFFERING} {self.cache:.0f}%"
+        if self.bitrate:
+            parts.append(f"{self.bitrate:.0f} kb/s")
+        if self.dropped:
+            parts.append(f"{self.dropped} dropped")
+        if self.stalls:
+            parts.append(f"{self.stalls} stalls")
+        return " · ".join(parts)
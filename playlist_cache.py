@@ -0,0 +1,186 @@
+import gc
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import time
+from channel_search import SearchIndex
+from channel_store import ChannelStore
+
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'universal-media-player', 'playlists')
+
+# Bumped whenever the snapshot layout changes; older files are ignored
+FORMAT_VERSION = 4
+
+# Version of the SQLite index layout; a mismatch starts an empty cache
+SCHEMA_VERSION = 2
+
+
+class PlaylistSnapshot:
+    # A parsed, categorized and indexed playlist, ready for ChannelTreeModel.restore
+    __slots__ = ('store', 'search')
+
+    def __init__(self, store, search):
+        self.store = store
+        self.search = search
+
+
+def snapshot_state(snapshot):
+    # What dump_snapshot pickles, as copies: built on the GUI thread, it
+    # can be pickled on another while the model keeps changing
+    return {
+        'version': FORMAT_VERSION,
+        'count': snapshot.store.live_count(),
+        'store': snapshot.store.dump(),
+        'search': snapshot.search.dump(),
+    }
+
+
+def dump_snapshot(state):
+    return pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def load_snapshot(data):
+    # Millions of new objects would trigger repeated full collections
+    # that find nothing to free; pausing the collector halves load time
+    gc.disable()
+    try:
+        state = pickle.loads(data)
+        if state.get('version') != FORMAT_VERSION:
+            return None
+        return PlaylistSnapshot(ChannelStore.load(state['store']), SearchIndex.load(state['search']))
+    finally:
+        gc.enable()
+
+
+def cache_key(urls):
+    # A set of sources loaded together is cached as one playlist
+    return '\n'.join(urls)
+
+
+class PlaylistCache:
+    # Parsed playlists on disk, keyed by their source URLs. Metadata (HTTP
+    # validators per source, size, access time) lives in SQLite; each
+    # snapshot is its own file.
+    # Entries unused for MAX_AGE seconds, or beyond MAX_BYTES in total
+    # (least recently used first), are evicted whenever one is stored.
+    MAX_BYTES = 1024 * 1024 * 1024
+    MAX_AGE = 30 * 24 * 3600
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_BYTES, max_age=MAX_AGE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        os.makedirs(directory, exist_ok=True)
+        self.db_path = os.path.join(directory, 'index.sqlite')
+        if self.execute("PRAGMA user_version")[0][0] != SCHEMA_VERSION:
+            self.reset()
+        self.execute("""CREATE TABLE IF NOT EXISTS playlists (
+                            url TEXT PRIMARY KEY,
+                            filename TEXT NOT NULL,
+                            validators TEXT NOT NULL,
+                            fingerprint TEXT,
+                            size INTEGER NOT NULL,
+                            count INTEGER NOT NULL,
+                            stored_at REAL NOT NULL,
+                            accessed_at REAL NOT NULL)""")
+
+    def reset(self):
+        self.execute("DROP TABLE IF EXISTS playlists")
+        self.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        for name in os.listdir(self.directory):
+            if name.endswith('.snapshot'):
+                os.remove(self.path(name))
+
+    def execute(self, sql, params=()):
+        # A connection per call, so the cache can be used from any thread
+        db = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            with db:
+                return db.execute(sql, params).fetchall()
+        finally:
+            db.close()
+
+    def path(self, filename):
+        return os.path.join(self.directory, filename)
+
+    def lookup(self, key, fingerprint=None):
+        # {'validators': {source url: [etag, last_modified]}, 'count': n},
+        # or None when there is nothing usable cached
+        rows = self.execute("SELECT validators, fingerprint, count FROM playlists WHERE url = ?", (key,))
+        if not rows:
+            return None
+        validators, stored_fingerprint, count = rows[0]
+        if fingerprint is not None and fingerprint != stored_fingerprint:
+            return None
+        return {'validators': json.loads(validators), 'count': count}
+
+    @staticmethod
+    def conditional_headers(validator):
+        headers = {}
+        etag, last_modified = validator or (None, None)
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return headers
+
+    def load(self, url):
+        rows = self.execute("SELECT filename FROM playlists WHERE url = ?", (url,))
+        if not rows:
+            return None
+        try:
+            with open(self.path(rows[0][0]), 'rb') as f:
+                snapshot = load_snapshot(f.read())
+        except Exception:
+            # Best effort: a snapshot that cannot be read back, whatever the
+            # reason, is dropped and the playlist downloaded again
+            snapshot = None
+        if snapshot is None:
+            self.remove(url)
+            return None
+        self.execute("UPDATE playlists SET accessed_at = ? WHERE url = ?", (time.time(), url))
+        return snapshot
+
+    def store(self, url, state, validators, fingerprint=None):
+        # ``state`` is from snapshot_state(). Best effort: a failed write
+        # only means the next load downloads again
+        filename = hashlib.sha1(url.encode('utf-8')).hexdigest() + '.snapshot'
+        temp_path = self.path(filename + '.tmp')
+        try:
+            data = dump_snapshot(state)
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, self.path(filename))
+            now = time.time()
+            self.execute("INSERT OR REPLACE INTO playlists VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         (url, filename, json.dumps(validators), fingerprint, len(data),
+                          state['count'], now, now))
+            self.evict(keep=url)
+        except (OSError, sqlite3.Error):
+            return False
+        return True
+
+    def remove(self, url):
+        rows = self.execute("SELECT filename FROM playlists WHERE url = ?", (url,))
+        self.execute("DELETE FROM playlists WHERE url = ?", (url,))
+        for (filename,) in rows:
+            try:
+                os.remove(self.path(filename))
+            except OSError:
+                pass
+
+    def evict(self, keep=None):
+        # Stale snapshots, then the least recently used ones over max_bytes.
+        # ``keep``, the one just stored, stays even when it alone is too big.
+        cutoff = time.time() - self.max_age
+        stale = [url for (url,) in self.execute("SELECT url FROM playlists WHERE accessed_at < ?", (cutoff,))]
+        total = 0
+        for url, size in self.execute("SELECT url, size FROM playlists ORDER BY accessed_at DESC"):
+            total += size
+            if total > self.max_bytes and url not in stale and url != keep:
+                stale.append(url)
+        for url in stale:
+            self.remove(url)
+        return stale
@@ -0,0 +1,167 @@
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+from itertools import islice
+from categorizer import Categorizer, CONFIG_PATH
+from m3u_parser import format_entry
+from playlist_reader import PlaylistReader
+
+# Channel fields written by the JSON and CSV formats, after the category
+FIELDS = ('title', 'url', 'group_title', 'tvg_id', 'tvg_name', 'tvg_logo', 'duration', 'catchup', 'source')
+
+# Channels are categorized this many at a time
+BATCH_SIZE = 500
+
+
+class M3uWriter:
+    def __init__(self, out):
+        self.out = out
+        out.write('#EXTM3U\n')
+
+    def write(self, channel, category):
+        self.out.write(format_entry(channel))
+
+    def close(self):
+        pass
+
+
+class JsonLinesWriter:
+    # One JSON object per line; extra attributes and options only when set
+    def __init__(self, out):
+        self.out = out
+
+    def record(self, channel, category):
+        record = {'category': category}
+        for field in FIELDS:
+            record[field] = getattr(channel, field)
+        if channel.attrs:
+            record['attrs'] = channel.attrs
+        if channel.options:
+            record['options'] = channel.options
+        return json.dumps(record, ensure_ascii=False)
+
+    def write(self, channel, category):
+        self.out.write(self.record(channel, category) + '\n')
+
+    def close(self):
+        pass
+
+
+class JsonWriter(JsonLinesWriter):
+    # A JSON array, written an element at a time
+    def __init__(self, out):
+        super().__init__(out)
+        self.separator = '[\n'
+
+    def write(self, channel, category):
+        self.out.write(self.separator + self.record(channel, category))
+        self.separator = ',\n'
+
+    def close(self):
+        self.out.write('[]\n' if self.separator == '[\n' else '\n]\n')
+
+
+class CsvWriter:
+    def __init__(self, out):
+        self.writer = csv.writer(out)
+        self.writer.writerow(('category',) + FIELDS)
+
+    def write(self, channel, category):
+        self.writer.writerow([category] + [getattr(channel, field) for field in FIELDS])
+
+    def close(self):
+        pass
+
+
+WRITERS = {'m3u': M3uWriter, 'json': JsonWriter, 'jsonl': JsonLinesWriter, 'csv': CsvWriter}
+
+
+def iter_categorized(channels, categorizer):
+    # (category, channel) pairs, classified a batch at a time
+    channels = iter(channels)
+    while True:
+        batch = list(islice(channels, BATCH_SIZE))
+        if not batch:
+            return
+        yield from zip(categorizer.classify_many(batch), batch)
+
+
+def select(pairs, categories=None, pattern=None):
+    for category, channel in pairs:
+        if categories and category not in categories:
+            continue
+        if pattern is not None and not pattern.search(channel.title):
+            continue
+        yield category, channel
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description="Read M3U playlists, filter and deduplicate their channels, "
+                    "and write them out as M3U, JSON, JSON Lines or CSV.")
+    parser.add_argument('sources', nargs='+', metavar='SOURCE',
+                        help="Playlist URL or file; '-' reads standard input")
+    parser.add_argument('-c', '--category', action='append',
+                        help="Only channels in this category (repeatable)")
+    parser.add_argument('-m', '--match', metavar='REGEX',
+                        help="Only channels whose title matches, case-insensitively")
+    parser.add_argument('--no-dedupe', action='store_true',
+                        help="Keep channels repeated across sources")
+    parser.add_argument('-f', '--format', choices=sorted(WRITERS), default='m3u')
+    parser.add_argument('-o', '--output', help="Output file (default: standard output)")
+    parser.add_argument('-j', '--jobs', type=int, metavar='N',
+                        help="Parser processes for large local files (default: one per core; 1 parses serially)")
+    parser.add_argument('--rules', default=CONFIG_PATH, help="Category rules file")
+    parser.add_argument('-q', '--quiet', action='store_true', help="No summary on standard error")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        categorizer = Categorizer.load(args.rules)
+        pattern = re.compile(args.match, re.IGNORECASE) if args.match else None
+    except (OSError, ValueError, re.error) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    unknown = set(args.category or ()) - set(categorizer.categories)
+    if unknown:
+        print(f"error: unknown categories: {', '.join(sorted(unknown))} "
+              f"(known: {', '.join(categorizer.categories)})", file=sys.stderr)
+        return 2
+
+    reader = PlaylistReader(args.sources, dedupe=not args.no_dedupe, workers=args.jobs)
+    out = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+    channels = reader.read()
+    written = 0
+    try:
+        writer = WRITERS[args.format](out)
+        for category, channel in select(iter_categorized(channels, categorizer), args.category, pattern):
+            writer.write(channel, category)
+            written += 1
+        writer.close()
+        out.flush()
+    except BrokenPipeError:
+        # The reading end (head, ...) has had enough; stop quietly
+        channels.close()
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    finally:
+        if args.output:
+            out.close()
+
+    if not args.quiet:
+        summary = f"{written} channels written"
+        if reader.duplicates:
+            summary += f", {reader.duplicates} duplicates skipped"
+        print(summary, file=sys.stderr)
+    for url, message in reader.failed_sources:
+        print(f"error: {url}: {message}", file=sys.stderr)
+    return 1 if reader.failed_sources and not written else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
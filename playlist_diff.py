@@ -0,0 +1,135 @@
+def text_hash(text):
+    # Hashes strings the way StringColumn.hashes() does, so fingerprints
+    # of parsed channels and of stored ones can be compared
+    return hash(text.encode('utf-8'))
+
+
+def entry_key(url_hash, tvg_id_hash):
+    # Identity of an entry across refreshes: its stream URL and tvg-id
+    return hash((url_hash, tvg_id_hash))
+
+
+def entry_digest(title_hash, tvg_name_hash, tvg_logo_hash, group_title, catchup, source,
+                 duration, category, extras):
+    # Changes whenever anything shown or stored for the entry changes.
+    # ``tvg_name_hash`` is of '' when the name repeats the title, and
+    # ``extras`` is (attrs, options) or None, as ChannelStore keeps them.
+    return hash((title_hash, tvg_name_hash, tvg_logo_hash, group_title, catchup, source,
+                 duration, category, None if extras is None else repr(extras)))
+
+
+def channel_fingerprint(channel, category):
+    # (key, digest) of a parsed Channel
+    tvg_name = '' if channel.tvg_name == channel.title else channel.tvg_name
+    extras = (channel.attrs, channel.options) if channel.attrs or channel.options else None
+    return (entry_key(text_hash(channel.url), text_hash(channel.tvg_id)),
+            entry_digest(text_hash(channel.title), text_hash(tvg_name), text_hash(channel.tvg_logo),
+                         channel.group_title, channel.catchup, channel.source,
+                         channel.duration, category, extras))
+
+
+def unique_key(key, taken):
+    # Repeats of a key (the same stream listed twice under one tvg-id)
+    # are told apart by the order they come in
+    while key in taken:
+        key = hash((key, 1))
+    return key
+
+
+class PlaylistDiff:
+    # What a refresh changes in the loaded playlist: IDs of the entries
+    # that are gone, (ID, category, Channel) for entries whose key stayed
+    # but whose content changed, and (category, Channel) for new entries.
+    # The fingerprints of all of them are kept for commit().
+    __slots__ = ('removed', 'changed', 'added', 'unchanged', 'fingerprints',
+                 'removed_keys', 'changed_keys', 'added_keys')
+
+    def __init__(self, fingerprints):
+        self.removed = []
+        self.changed = []
+        self.added = []
+        self.unchanged = 0
+        self.fingerprints = fingerprints
+        self.removed_keys = []
+        self.changed_keys = []      # (key, digest) per changed channel
+        self.added_keys = []        # (key, digest) per added channel
+
+    def __len__(self):
+        return len(self.removed) + len(self.changed) + len(self.added)
+
+    def describe(self):
+        return f"{len(self.added)} added, {len(self.removed)} removed, {len(self.changed)} changed"
+
+    def commit(self, changed_ids, added_ids):
+        # Records the IDs the changed and added channels were stored
+        # under, so the next refresh compares against them
+        ids = self.fingerprints.ids
+        digests = self.fingerprints.digests
+        for key in self.removed_keys:
+            del ids[key]
+        for channel_id in self.removed:
+            del digests[channel_id]
+        for channel_id, _, _ in self.changed:
+            del digests[channel_id]
+        for new_ids, keys in ((changed_ids, self.changed_keys), (added_ids, self.added_keys)):
+            for channel_id, (key, digest) in zip(new_ids, keys):
+                ids[key] = channel_id
+                digests[channel_id] = digest
+
+
+class Fingerprints:
+    # Key -> ID and ID -> digest for the channels listed in a store.
+    # Built once, off the GUI thread, on the first refresh and kept up to
+    # date by PlaylistDiff.commit() after that.
+    __slots__ = ('ids', 'digests')
+
+    def __init__(self):
+        self.ids = {}
+        self.digests = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_store(cls, store):
+        # Works on the columns' hashes, without building Channels
+        fingerprints = cls()
+        ids = fingerprints.ids
+        digests = fingerprints.digests
+        title, url, tvg_id, tvg_name, tvg_logo = (getattr(store, field).hashes()
+                                                  for field in store.STRING_FIELDS)
+        group_title, catchup, source = store.group_title, store.catchup, store.source
+        durations, extras = store.durations, store.extras
+        for channel_id in store.ids():
+            key = unique_key(entry_key(url[channel_id], tvg_id[channel_id]), ids)
+            ids[key] = channel_id
+            digests[channel_id] = entry_digest(
+                title[channel_id], tvg_name[channel_id], tvg_logo[channel_id],
+                group_title[channel_id], catchup[channel_id], source[channel_id],
+                durations[channel_id], store.category(channel_id), extras.get(channel_id))
+        return fingerprints
+
+    def diff(self, channels, categories):
+        # PlaylistDiff turning the listed channels into ``channels``
+        diff = PlaylistDiff(self)
+        ids = self.ids
+        digests = self.digests
+        seen = set()
+        for channel, category in zip(channels, categories):
+            key, digest = channel_fingerprint(channel, category)
+            key = unique_key(key, seen)
+            seen.add(key)
+            channel_id = ids.get(key)
+            if channel_id is None:
+                diff.added.append((category, channel))
+                diff.added_keys.append((key, digest))
+            elif digests[channel_id] != digest:
+                diff.changed.append((channel_id, category, channel))
+                diff.changed_keys.append((key, digest))
+            else:
+                diff.unchanged += 1
+        for key, channel_id in ids.items():
+            if key not in seen:
+                diff.removed_keys.append(key)
+                diff.removed.append(channel_id)
+        return diff
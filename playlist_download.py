@@ -0,0 +1,359 @@
+import bz2
+import hashlib
+import json
+import lzma
+import os
+import re
+import time
+import zlib
+from playlist_sources import TIMEOUT
+
+DOWNLOAD_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'universal-media-player', 'downloads')
+
+# Dropped transfers are picked up with a Range request this many times,
+# waiting RESUME_BACKOFF * 2**n seconds before each attempt
+MAX_RESUMES = 5
+RESUME_BACKOFF = 0.5
+
+# Partial downloads left by an earlier run are resumed for this long
+MAX_PART_AGE = 7 * 24 * 3600
+
+RAW_CHUNK_SIZE = 64 * 1024
+
+# Playlists compressed as files (.m3u.gz, ...), recognised by their magic bytes
+MAGIC = ((b'\x1f\x8b', 'gzip'), (b'\xfd7zXZ\x00', 'xz'), (b'BZh', 'bzip2'))
+MAGIC_LENGTH = max(len(magic) for magic, _ in MAGIC)
+
+_CONTENT_RANGE_RE = re.compile(r'bytes (\d+)-\d+/(\d+|\*)')
+
+
+class DownloadError(Exception):
+    pass
+
+
+def accept_encoding():
+    # gzip and deflate always; Brotli only when the brotli module is there
+    try:
+        import brotli  # noqa: F401
+        return 'gzip, deflate, br'
+    except ImportError:
+        return 'gzip, deflate'
+
+
+def make_decompressor(kind):
+    # (decompress, flush) for a Content-Encoding or file compression;
+    # None for identity
+    if kind in ('gzip', 'x-gzip'):
+        decompressor = GzipDecompressor()
+        return decompressor.decompress, decompressor.flush
+    if kind == 'deflate':
+        decompressor = zlib.decompressobj()
+        return decompressor.decompress, decompressor.flush
+    if kind == 'br':
+        import brotli
+        decompressor = brotli.Decompressor()
+        return decompressor.process, lambda: b''
+    if kind == 'xz':
+        decompressor = lzma.LZMADecompressor()
+        return decompressor.decompress, lambda: b''
+    if kind == 'bzip2':
+        decompressor = bz2.BZ2Decompressor()
+        return decompressor.decompress, lambda: b''
+    if kind in ('', 'identity'):
+        return None
+    raise DownloadError(f"unsupported Content-Encoding: {kind}")
+
+
+class GzipDecompressor:
+    # zlib only reads one gzip member; concatenated members (pigz, appended
+    # files) are all valid gzip and are read one after the other
+    def __init__(self):
+        self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    def decompress(self, data):
+        out = []
+        while data:
+            out.append(self.decompressor.decompress(data))
+            if not self.decompressor.eof:
+                break
+            data = self.decompressor.unused_data
+            self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        return b''.join(out)
+
+    def flush(self):
+        return self.decompressor.flush()
+
+
+class StreamDecoder:
+    # Undoes the Content-Encoding, then any file compression, a chunk at a
+    # time, so a compressed playlist goes straight into the parser
+    def __init__(self, content_encoding=''):
+        self.transport = make_decompressor(content_encoding.strip().lower())
+        self.file = None
+        self.head = b''             # Start of the body, until it can be sniffed
+        self.sniffed = False
+
+    def decode(self, data):
+        if self.transport is not None:
+            data = self.transport[0](data)
+        return self.decode_file(data)
+
+    def flush(self):
+        data = self.transport[1]() if self.transport is not None else b''
+        return self.decode_file(data, final=True)
+
+    def decode_file(self, data, final=False):
+        if not self.sniffed:
+            self.head += data
+            if len(self.head) < MAGIC_LENGTH and not final:
+                return b''
+            data, self.head = self.head, b''
+            self.sniffed = True
+            for magic, kind in MAGIC:
+                if data.startswith(magic):
+                    self.file = make_decompressor(kind)
+        if self.file is None:
+            return data
+        data = self.file[0](data) if data else b''
+        if final:
+            data += self.file[1]()
+        return data
+
+
+def iter_decoded(chunks, content_encoding=''):
+    decoder = StreamDecoder(content_encoding)
+    for chunk in chunks:
+        data = decoder.decode(chunk)
+        if data:
+            yield data
+    data = decoder.flush()
+    if data:
+        yield data
+
+
+def is_compressed(path):
+    with open(path, 'rb') as f:
+        head = f.read(MAGIC_LENGTH)
+    return any(head.startswith(magic) for magic, _ in MAGIC)
+
+
+def content_range(response):
+    # (first byte, total size or None) of a 206 reply, or None
+    match = _CONTENT_RANGE_RE.match(response.headers.get('Content-Range', ''))
+    if match is None:
+        return None
+    return int(match.group(1)), None if match.group(2) == '*' else int(match.group(2))
+
+
+class Download:
+    # A playlist body fetched over HTTP behind the part of the
+    # requests.Response interface PlaylistReader uses, the way FileSource
+    # does for files. When the connection drops, the transfer carries on
+    # where it stopped with a Range request, after a growing pause. The raw
+    # body is also kept in a .part file as it arrives, so a load that gave
+    # up is resumed the same way by the next one. iter_content() yields the
+    # body with Content-Encoding and file compression undone.
+    def __init__(self, session, url, headers=None, directory=DOWNLOAD_DIR, cancelled=None):
+        self.session = session
+        self.url = url
+        self.directory = directory
+        self.cancelled = cancelled or (lambda: False)
+        self.received = 0           # Raw body bytes, including the .part file
+        self.skip = 0               # Raw bytes to drop from a reply that started over
+        self.resumes = 0            # Range requests made after a dropped connection
+        self.resumed_part = False   # The .part file of an earlier load is used
+        self.complete = False
+        name = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        self.part_path = os.path.join(directory, name + '.part')
+        self.meta_path = os.path.join(directory, name + '.json')
+
+        headers = dict(headers or {}, **{'Accept-Encoding': accept_encoding()})
+        part = self.load_part()
+        if part is None:
+            self.response = self.get(headers)
+        else:
+            self.response = self.get(dict(headers, **self.range_headers(part['size'], part['validator'])))
+            span = content_range(self.response) if self.response.status_code == 206 else None
+            if span is not None and span[0] == part['size'] and \
+                    self.response.headers.get('Content-Encoding', '') == part['encoding']:
+                self.resumed_part = True
+                self.received = part['size']
+            else:
+                self.discard_part()
+                if self.response.status_code == 206:
+                    # Not the continuation asked for; fetch the whole body
+                    self.response.close()
+                    self.response = self.get(headers)
+
+        self.status_code = 200 if self.resumed_part else self.response.status_code
+        self.ok = self.response.ok
+        self.headers = self.response.headers.copy()
+        self.validator = [self.headers.get('ETag'), self.headers.get('Last-Modified')]
+        self.encoding = self.headers.get('Content-Encoding', '')
+        if self.resumed_part:
+            total = content_range(self.response)[1]
+            if total is not None:
+                self.headers['Content-Length'] = str(total)
+
+    @property
+    def raw(self):
+        # tell() counts raw bytes off the wire, as urllib3's does
+        return self
+
+    def tell(self):
+        return self.received
+
+    def get(self, headers):
+        return self.session.get(self.url, stream=True, headers=headers, timeout=TIMEOUT)
+
+    @staticmethod
+    def range_headers(offset, validator):
+        # If-Range makes the server send the whole, new body if it changed
+        headers = {'Range': f'bytes={offset}-'}
+        etag, last_modified = validator
+        if etag and not etag.startswith('W/'):
+            headers['If-Range'] = etag
+        elif last_modified:
+            headers['If-Range'] = last_modified
+        return headers
+
+    def load_part(self):
+        # What an earlier, interrupted load left, if it can be continued
+        try:
+            with open(self.meta_path, encoding='utf-8') as f:
+                meta = json.load(f)
+            size = os.path.getsize(self.part_path)
+            age = time.time() - os.path.getmtime(self.part_path)
+        except (OSError, ValueError):
+            return None
+        if meta.get('url') != self.url or not any(meta.get('validator') or ()) or age > MAX_PART_AGE or not size:
+            self.discard_part()
+            return None
+        return {'size': size, 'validator': meta['validator'], 'encoding': meta.get('encoding', '')}
+
+    def discard_part(self):
+        for path in (self.part_path, self.meta_path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def open_part(self):
+        # Only bodies with a validator are kept for a later load; without
+        # one there is no telling whether the rest would still fit
+        if not self.resumed_part and not any(self.validator):
+            return None
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            part = open(self.part_path, 'r+b' if self.resumed_part else 'wb')
+            with open(self.meta_path, 'w', encoding='utf-8') as f:
+                json.dump({'url': self.url, 'validator': self.validator, 'encoding': self.encoding}, f)
+        except OSError:
+            return None
+        return part
+
+    def iter_content(self, chunk_size=RAW_CHUNK_SIZE):
+        part = self.open_part()
+        try:
+            yield from iter_decoded(self.iter_raw(part, chunk_size), self.encoding)
+        finally:
+            if part is not None:
+                part.close()
+            if self.complete:
+                self.discard_part()
+
+    def iter_raw(self, part, chunk_size):
+        from requests import RequestException
+        from urllib3.exceptions import HTTPError as TransferError
+        if self.resumed_part and part is None:
+            # The .part file could not be reopened, so what it held is
+            # asked for again along with the rest
+            self.response.close()
+            self.received = 0
+            self.request_rest()
+        elif self.resumed_part:
+            # What the earlier load got is parsed before the rest arrives
+            yield from iter(lambda: part.read(chunk_size), b'')
+        while True:
+            try:
+                for chunk in self.response.raw.stream(chunk_size, decode_content=False):
+                    if self.skip:
+                        chunk, self.skip = chunk[self.skip:], max(self.skip - len(chunk), 0)
+                        if not chunk:
+                            continue
+                    if part is not None:
+                        part.write(chunk)
+                    self.received += len(chunk)
+                    yield chunk
+                    if self.cancelled():
+                        return
+                self.complete = True
+                return
+            except (TransferError, RequestException, OSError) as e:
+                self.response.close()
+                if part is not None:
+                    part.flush()
+                if self.resumes >= MAX_RESUMES:
+                    raise DownloadError(self.describe_failure(e)) from e
+                self.resume(e)
+
+    def resume(self, error):
+        # Waits, then asks for the rest. Raises DownloadError when the
+        # playlist changed in the meantime.
+        delay = RESUME_BACKOFF * 2 ** self.resumes
+        self.resumes += 1
+        deadline = time.monotonic() + delay
+        while time.monotonic() < deadline:
+            if self.cancelled():
+                raise DownloadError(self.describe_failure(error))
+            time.sleep(0.05)
+        self.request_rest()
+
+    def request_rest(self):
+        # Asks for the body from ``received`` on, keeping the transfer going
+        # only if the server sends exactly that
+        headers = dict(self.range_headers(self.received, self.validator),
+                       **{'Accept-Encoding': accept_encoding()})
+        try:
+            response = self.get(headers)
+        except Exception as e:
+            self.response = FailedResponse(e)
+            return
+        span = content_range(response) if response.status_code == 206 else None
+        if span is not None and span[0] == self.received:
+            self.response = response
+            return
+        same = [response.headers.get('ETag'), response.headers.get('Last-Modified')] == self.validator and \
+            response.headers.get('Content-Encoding', '') == self.encoding
+        if response.status_code == 200 and same and any(self.validator):
+            # No Range support, but the same body: skip what was read
+            self.response = response
+            self.skip = self.received
+            return
+        response.close()
+        if response.status_code == 200:
+            raise DownloadError("the playlist changed while it was downloading; load it again")
+        self.response = FailedResponse(ConnectionError(f"HTTP {response.status_code}"))
+
+    def describe_failure(self, error):
+        message = f"download interrupted after {self.received // 1024} KB ({error})"
+        if any(self.validator):
+            message += "; loading again resumes it"
+        return message
+
+    def close(self):
+        self.response.close()
+
+
+class FailedResponse:
+    # Stands in for a resume request that failed, so the next attempt
+    # goes through the same path as a dropped transfer
+    def __init__(self, error):
+        self.error = error
+        self.raw = self
+
+    def stream(self, *args, **kwargs):
+        raise self.error
+
+    def close(self):
+        pass
@@ -0,0 +1,120 @@
+import time
+from PyQt5.QtCore import QThread, pyqtSignal
+from metrics import metrics
+from playlist_diff import Fingerprints
+from playlist_reader import PlaylistReader
+
+
+class PlaylistLoader(QThread):
+    channels_loaded = pyqtSignal(list)              # Batch of (category, Channel) tuples
+    progress_changed = pyqtSignal('qint64', 'qint64', int)  # Bytes read, total bytes (0 if unknown), entries
+    snapshot_loaded = pyqtSignal(object)            # PlaylistSnapshot from the cache
+    load_failed = pyqtSignal(str)
+    load_finished = pyqtSignal(int)                 # Total entries
+
+    # Batches stay small so the GUI thread can insert one well inside a frame
+    BATCH_SIZE = 500
+    BATCH_INTERVAL = 0.1
+
+    def __init__(self, urls, categorizer, cache=None, parent=None):
+        super().__init__(parent)
+        self.categorizer = categorizer  # Used on this thread only while loading
+        self.cache = cache
+        self.reader = PlaylistReader(urls, cache, categorizer.fingerprint, self.isInterruptionRequested)
+        self.entries = 0
+        self.from_cache = False
+
+    def cancel(self):
+        self.requestInterruption()
+
+    def run(self):
+        try:
+            self.parse(self.reader.read())
+            if self.reader.unchanged:
+                self.load_cached()
+        except Exception as e:
+            if not self.isInterruptionRequested():
+                self.load_failed.emit(str(e))
+            return
+
+        if self.isInterruptionRequested():
+            return
+        failed = self.reader.failed_sources
+        if self.entries == 0 and failed:
+            self.load_failed.emit("; ".join(f"{url}: {message}" for url, message in failed))
+            return
+        self.load_finished.emit(self.entries)
+
+    def load_cached(self):
+        snapshot = self.cache.load(self.reader.key)
+        if snapshot is None:
+            # The broken entry is gone now, so the next load downloads
+            raise Exception("Cached playlist could not be read, please load it again")
+        self.from_cache = True
+        self.entries = snapshot.store.live_count()
+        if not self.isInterruptionRequested():
+            self.snapshot_loaded.emit(snapshot)
+
+    def parse(self, channels):
+        batch = []
+        last_flush = time.monotonic()
+        for channel in channels:
+            batch.append(channel)
+            self.entries += 1
+            now = time.monotonic()
+            if len(batch) >= self.BATCH_SIZE or now - last_flush >= self.BATCH_INTERVAL:
+                self.flush(batch)
+                batch = []
+                last_flush = now
+        if batch and not self.isInterruptionRequested():
+            self.flush(batch)
+
+    def flush(self, batch):
+        with metrics.span('playlist.categorize'):
+            categories = self.categorizer.classify_many(batch)
+        metrics.count('playlist.channels', len(batch))
+        self.channels_loaded.emit(list(zip(categories, batch)))
+        self.progress_changed.emit(sum(self.reader.bytes_read.values()), self.reader.total_bytes, self.entries)
+
+
+class PlaylistRefresher(QThread):
+    # Reads the loaded playlist again and works out what changed against
+    # the channels on show, for ChannelTreeModel.apply_diff. Sources that
+    # still match the cached copy cost one conditional request each.
+    diff_ready = pyqtSignal(object)     # PlaylistDiff, or None when nothing changed
+    refresh_failed = pyqtSignal(str)
+
+    def __init__(self, urls, categorizer, store, fingerprints=None, cache=None, parent=None):
+        super().__init__(parent)
+        self.categorizer = categorizer
+        self.store = store              # Only read here, while the GUI leaves it alone
+        self.fingerprints = fingerprints
+        self.reader = PlaylistReader(urls, cache, categorizer.fingerprint, self.isInterruptionRequested)
+
+    def cancel(self):
+        self.requestInterruption()
+
+    def run(self):
+        try:
+            channels = list(self.reader.read())
+            if self.isInterruptionRequested():
+                return
+            failed = self.reader.failed_sources
+            if failed:
+                # A missing source would look like all its channels were removed
+                self.refresh_failed.emit("; ".join(f"{url}: {message}" for url, message in failed))
+                return
+            if self.reader.unchanged:
+                self.diff_ready.emit(None)
+                return
+            with metrics.span('playlist.categorize'):
+                categories = self.categorizer.classify_many(channels)
+            with metrics.span('playlist.diff'):
+                fingerprints = self.fingerprints or Fingerprints.from_store(self.store)
+                diff = fingerprints.diff(channels, categories)
+        except Exception as e:
+            if not self.isInterruptionRequested():
+                self.refresh_failed.emit(str(e))
+            return
+        if not self.isInterruptionRequested():
+            self.diff_ready.emit(diff)
@@ -0,0 +1,255 @@
+import os
+import queue
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import unquote, urlsplit
+from m3u_parallel import iter_m3u_file_parallel
+from playlist_download import DOWNLOAD_DIR, Download, is_compressed, iter_decoded
+from m3u_parser import CHUNK_SIZE, guide_urls, iter_m3u_chunks
+from metrics import metrics
+from playlist_cache import cache_key
+from playlist_sources import ChannelMerger, make_session
+
+
+def local_path(source):
+    # File path for a local source ('-' is stdin), or None for a URL
+    if source == '-':
+        return source
+    parts = urlsplit(source)
+    if parts.scheme == 'file':
+        return unquote(parts.path)
+    if parts.scheme in ('http', 'https'):
+        return None
+    return source
+
+
+class FileSource:
+    # A local playlist behind the part of the requests.Response interface
+    # the reader uses. The modification time stands in for Last-Modified,
+    # so unchanged files are served from the playlist cache as well.
+    def __init__(self, path, validator=None):
+        self.url = path
+        if path == '-':
+            self.path = None
+            self.raw = sys.stdin.buffer
+            self.headers = {}
+        else:
+            self.path = path
+            self.raw = open(path, 'rb')
+            self.headers = {'Last-Modified': str(os.path.getmtime(path)),
+                            'Content-Length': str(os.path.getsize(path))}
+        unchanged = validator is not None and validator[1] and validator[1] == self.headers.get('Last-Modified')
+        self.status_code = 304 if unchanged else 200
+        self.ok = True
+
+    def iter_content(self, chunk_size):
+        # Compressed files (.m3u.gz, .m3u.xz, ...) are decompressed on the way
+        return iter_decoded(iter(lambda: self.raw.read(chunk_size), b''))
+
+    def close(self):
+        if self.raw is not sys.stdin.buffer:
+            self.raw.close()
+
+
+class PlaylistReader:
+    # Reads one or more playlists, from URLs or local files, and yields
+    # their channels merged and deduplicated. Every source is fetched and
+    # parsed on its own pool thread, so reading takes about as long as the
+    # slowest source. Qt-free: PlaylistLoader runs one on its thread, and
+    # the command line tool runs one directly.
+    BATCH_SIZE = 500
+
+    def __init__(self, urls, cache=None, fingerprint=None, cancelled=None, dedupe=True, workers=None):
+        self.urls = list(urls)
+        self.key = cache_key(self.urls)
+        self.cache = cache
+        self.fingerprint = fingerprint  # Categorizer fingerprint the cached copy must match
+        self.cancelled = cancelled or (lambda: False)
+        self.dedupe = dedupe
+        self.workers = workers          # Parser processes for large local files; None for one per core
+        self.bytes_read = {}            # Source URL -> bytes read
+        self.total_bytes = 0
+        self.duplicates = 0
+        self.unchanged = False          # Every source confirmed the cached copy
+        self.validators = {}            # Source URL -> [etag, last_modified]
+        self.failed_sources = []        # (url, message) for sources that could not be read
+        self.guide_urls = []            # XMLTV URLs named by the playlists' #EXTM3U lines
+        self.closing = False            # Tells source threads to stop once the merge is over
+        self.download_dir = DOWNLOAD_DIR  # Partial downloads, resumed by the next load
+
+    def stopping(self):
+        return self.closing or self.cancelled()
+
+    def read(self):
+        # Generator of merged channels. Yields nothing and sets
+        # ``unchanged`` when the cached copy can be used instead.
+        session = None
+        if any(local_path(url) is None for url in self.urls):
+            session = make_session(len(self.urls))
+        responses = []
+        try:
+            with ThreadPoolExecutor(len(self.urls)) as pool:
+                responses = self.open_sources(session, pool)
+                if responses is None:
+                    self.unchanged = True
+                    return
+                yield from self.read_sources(pool, responses)
+        finally:
+            for response in responses or ():
+                if response is not None:
+                    response.close()
+            if session is not None:
+                session.close()
+
+    def request(self, session, url, validator=None):
+        path = local_path(url)
+        try:
+            if path is not None:
+                return FileSource(path, validator)
+            headers = self.cache.conditional_headers(validator) if self.cache else {}
+            # Returns once the headers are in
+            with metrics.span('playlist.ttfb'):
+                response = Download(session, url, headers, self.download_dir, self.stopping)
+        except Exception as e:
+            self.failed_sources.append((url, str(e)))
+            return None
+        if response.status_code != 304 and not response.ok:
+            self.failed_sources.append((url, f"HTTP {response.status_code}"))
+            response.close()
+            return None
+        return response
+
+    def open_sources(self, session, pool):
+        # Returns the open responses, or None when the cached copy was confirmed
+        cached = self.cache.lookup(self.key, self.fingerprint) if self.cache else None
+        validators = cached['validators'] if cached else {}
+        responses = list(pool.map(lambda url: self.request(session, url, validators.get(url)), self.urls))
+
+        if cached and all(response is not None and response.status_code == 304 for response in responses):
+            return None
+
+        # Revalidation only pays off when nothing changed; otherwise every
+        # source is parsed again, including the ones that answered 304
+        stale = [i for i, response in enumerate(responses) if response is not None and response.status_code == 304]
+        for i, response in zip(stale, pool.map(lambda i: self.request(session, self.urls[i]), stale)):
+            responses[i].close()
+            responses[i] = response
+
+        for url, response in zip(self.urls, responses):
+            if response is not None:
+                self.validators[url] = [response.headers.get('ETag'), response.headers.get('Last-Modified')]
+                self.total_bytes += int(response.headers.get('Content-Length') or 0)
+        return responses
+
+    def read_sources(self, pool, responses):
+        # Source threads parse into a queue; this thread merges and dedupes
+        # in arrival order
+        channels = queue.Queue(maxsize=64)
+        running = 0
+        for url, response in zip(self.urls, responses):
+            if response is not None:
+                pool.submit(self.pump, url, response, channels)
+                running += 1
+
+        merger = ChannelMerger()
+        try:
+            yield from self.iter_merged(channels, running, merger)
+        finally:
+            self.closing = True
+            self.duplicates = merger.duplicates
+
+    def pump(self, url, response, channels):
+        batch = []
+        header = {}
+        try:
+            for channel in self.iter_channels(url, response, header):
+                channel.source = url
+                batch.append(channel)
+                if len(batch) >= self.BATCH_SIZE:
+                    self.put(channels, batch)
+                    batch = []
+            self.put(channels, batch)
+            self.guide_urls.extend(guide_urls(header))
+        except Exception as e:
+            self.failed_sources.append((url, str(e)))
+        finally:
+            self.put(channels, None)
+
+    def iter_channels(self, url, response, header):
+        path = getattr(response, 'path', None)
+        if path is not None and not is_compressed(path):
+            # Local files are memory-mapped and scanned as bytes, large
+            # ones by a pool of processes
+            def progress(offset):
+                self.bytes_read[url] = offset
+            channels = iter_m3u_file_parallel(path, header, self.workers, progress, self.stopping)
+            yield from self.timed_chunks(url, channels) if metrics.enabled else channels
+            return
+        chunks = self.iter_chunks(url, response)
+        if metrics.enabled:
+            chunks = self.timed_chunks(url, chunks)
+        yield from iter_m3u_chunks(chunks, header=header)
+
+    def timed_chunks(self, url, chunks):
+        # Splits the source's time into waiting for the network and the
+        # rest: decoding and parsing, plus any wait for a merge that fell
+        # behind. Only used while metrics are on. For a memory-mapped file
+        # ``chunks`` are its channels: paging the file in and scanning it
+        # are one pass, which counts as the read.
+        waited = 0.0
+        clock = time.perf_counter
+        started = clock()
+        try:
+            while True:
+                start = clock()
+                chunk = next(chunks, None)
+                waited += clock() - start
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            elapsed = clock() - started
+            size = self.bytes_read.get(url, 0)
+            metrics.record('playlist.download', waited)
+            metrics.record('playlist.parse', elapsed - waited)
+            metrics.count('playlist.bytes', size)
+            if elapsed > 0:
+                metrics.observe('playlist.bytes_per_s', size / elapsed)
+
+    def put(self, channels, item):
+        # Bounded, so a fast source cannot run far ahead of the merge
+        while not self.stopping():
+            try:
+                channels.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def iter_merged(self, channels, running, merger):
+        while running and not self.cancelled():
+            try:
+                batch = channels.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if batch is None:
+                running -= 1
+                continue
+            if not self.dedupe:
+                yield from batch
+                continue
+            for channel in batch:
+                if merger.add(channel):
+                    yield channel
+
+    def iter_chunks(self, url, response):
+        for chunk in response.iter_content(CHUNK_SIZE):
+            if self.stopping():
+                return
+            # Count bytes off the wire so progress matches Content-Length
+            # even when the body is gzip encoded
+            try:
+                self.bytes_read[url] = response.raw.tell()
+            except (AttributeError, OSError):
+                self.bytes_read[url] = self.bytes_read.get(url, 0) + len(chunk)
+            yield chunk
@@ -0,0 +1,55 @@
+import os
+
+# (connect, read) timeouts in seconds for every playlist request
+TIMEOUT = (10, 30)
+RETRIES = 3
+
+
+def split_sources(text):
+    # Playlist URLs or paths separated by whitespace, duplicates dropped,
+    # order kept; a single local file may have spaces in its path
+    text = text.strip()
+    if os.path.isfile(text):
+        return [text]
+    return list(dict.fromkeys(text.split()))
+
+
+def make_session(pool_size=10, retries=RETRIES):
+    # One pooled session per load: connections to a provider are reused,
+    # and connection errors and 429/5xx replies are retried with backoff.
+    # requests is imported here, as it takes longer to import than
+    # everything else the playlist core needs; local files never need it.
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    retry = Retry(total=retries, backoff_factor=0.5,
+                  status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=('GET', 'HEAD'), raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class ChannelMerger:
+    # Drops duplicates while channels from several sources are merged: the
+    # first copy of a stream URL wins, and so does the first source to list
+    # a tvg-id. Repeats of a tvg-id within one source are kept, since
+    # providers use that for quality tiers (SD/HD/FHD) of one channel.
+    def __init__(self):
+        self.urls = set()
+        self.tvg_ids = {}  # tvg-id -> source that supplied it
+        self.duplicates = 0
+
+    def add(self, channel):
+        if channel.url in self.urls:
+            self.duplicates += 1
+            return False
+        if channel.tvg_id:
+            source = self.tvg_ids.setdefault(channel.tvg_id, channel.source)
+            if source != channel.source:
+                self.duplicates += 1
+                return False
+        self.urls.add(channel.url)
+        return True
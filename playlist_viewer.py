@@ -1,159 +1,582 @@
+import sqlite3
 import sys
+import threading
+import time
+from collections import deque
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
-                           QTreeWidget, QTreeWidgetItem, QLabel, QLineEdit,
-                           QProgressBar, QMessageBox)
-from PyQt5.QtCore import Qt, pyqtSignal
-import requests
-import m3u8
+                           QTreeView, QLabel, QLineEdit, QCheckBox, QComboBox,
+                           QProgressBar, QMessageBox, QInputDialog, QFileDialog)
+from PyQt5.QtCore import Qt, QTimer, QModelIndex, QPersistentModelIndex, pyqtSignal
+from categorizer import Categorizer
+from channel_model import ChannelTreeModel
+from epg import EpgCache
+from epg_loader import EpgLoader
+from health_checker import HealthChecker
+from logo_cache import LogoCache
+from logo_loader import LOGO_SIZE, LogoLoader
+from playlist_cache import PlaylistCache, snapshot_state
+from m3u_parser import parse_m3u
+from metrics import metrics
+from playlist_loader import PlaylistLoader, PlaylistRefresher
+from playlist_sources import split_sources
+from stream_prober import HealthTable
 
 class PlaylistViewer(QWidget):
-    channel_selected = pyqtSignal(str, str)  # Signal to emit channel URL and name
+    channel_selected = pyqtSignal(int)  # ID of the channel in self.model.store
+
+    # Longest stretch spent inserting channels before yielding to the event loop
+    INSERT_BUDGET = 0.008
+
+    # Auto-refresh choices, in minutes; 0 is off
+    REFRESH_INTERVALS = (0, 5, 15, 30, 60)
+
+    # Memory for channel logos held as pixmaps; thumbnails past it are
+    # read back from the disk cache when scrolled to again
+    LOGO_MEMORY_BUDGET = LogoLoader.MEMORY_BUDGET
 
     def __init__(self):
         super().__init__()
         self.setWindowTitle("IPTV Playlist Viewer")
         self.resize(800, 600)
+        self.categorizer = self.load_categorizer()
+        self.cache = self.open_cache()
+        self.epg_cache = self.open_epg_cache()
+        self.logos = LogoLoader(self.open_logo_cache(), self.LOGO_MEMORY_BUDGET, parent=self)
         self.setup_ui()
-        self.channels = {}  # Dictionary to store channels data
+        self.health = self.open_health()
+        self.loader = None  # Background PlaylistLoader for the current load
+        self.pending_batches = deque()  # Batches received but not yet inserted
+        self.loaded_count = None  # Set once the loader is done
+        self.cache_pending = None  # (cache key, validators) to store after inserting
+        self.load_report = ''  # Summary shown once the load is done
+        self.checker = None  # Background HealthChecker, while streams are probed
+        self.selected_index = QPersistentModelIndex()  # Channel last opened from the tree
+        self.epg_loader = None  # Background EpgLoader, while a guide loads
+        self.guide_url = ''  # Last guide loaded, or the one the playlist names
+        self.playlist_urls = []  # Sources of the playlist on show, for refreshes
+        self.refresher = None  # Background PlaylistRefresher, while a refresh runs
 
     def setup_ui(self):
         layout = QVBoxLayout(self)
 
+        # Search runs once typing pauses instead of on every keystroke
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(150)
+        self.search_timer.timeout.connect(self.filter_channels)
+
+        # Inserts received batches a time slice at a time
+        self.insert_timer = QTimer(self)
+        self.insert_timer.setInterval(0)
+        self.insert_timer.timeout.connect(self.insert_pending)
+
         # Search bar
         search_layout = QHBoxLayout()
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("Search channels...")
-        self.search_input.textChanged.connect(self.filter_channels)
+        self.search_input.textChanged.connect(self.on_search_text_changed)
         search_layout.addWidget(self.search_input)
         layout.addLayout(search_layout)
 
         # URL input and load button
         url_layout = QHBoxLayout()
         self.url_input = QLineEdit()
-        self.url_input.setPlaceholderText("Enter M3U/M3U8 playlist URL...")
+        self.url_input.setPlaceholderText("Enter one or more M3U/M3U8 playlist URLs or files, separated by spaces...")
         url_layout.addWidget(self.url_input)
         
         self.load_button = QPushButton("Load Playlist")
         self.load_button.clicked.connect(self.load_playlist)
         url_layout.addWidget(self.load_button)
+
+        self.open_button = QPushButton("Open File...")
+        self.open_button.clicked.connect(self.open_file)
+        url_layout.addWidget(self.open_button)
+
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel_load)
+        self.cancel_button.hide()
+        url_layout.addWidget(self.cancel_button)
         layout.addLayout(url_layout)
 
+        # Refresh: only what the provider changed is applied to the list
+        refresh_layout = QHBoxLayout()
+        self.refresh_label = QLabel()
+        refresh_layout.addWidget(self.refresh_label, 1)
+        self.auto_refresh_combo = QComboBox()
+        for minutes in self.REFRESH_INTERVALS:
+            self.auto_refresh_combo.addItem(f"Refresh every {minutes} min" if minutes else "Auto-refresh off",
+                                            minutes)
+        self.auto_refresh_combo.currentIndexChanged.connect(self.on_auto_refresh_changed)
+        refresh_layout.addWidget(self.auto_refresh_combo)
+        self.refresh_button = QPushButton("Refresh")
+        self.refresh_button.setEnabled(False)
+        self.refresh_button.clicked.connect(self.refresh_playlist)
+        refresh_layout.addWidget(self.refresh_button)
+        layout.addLayout(refresh_layout)
+
+        self.auto_refresh_timer = QTimer(self)
+        self.auto_refresh_timer.timeout.connect(self.refresh_playlist)
+
+        # Stream health: probe the listed channels, hide or sort by the result
+        health_layout = QHBoxLayout()
+        self.hide_dead_check = QCheckBox("Hide dead streams")
+        self.hide_dead_check.toggled.connect(self.on_view_options_changed)
+        health_layout.addWidget(self.hide_dead_check)
+        self.sort_latency_check = QCheckBox("Sort by latency")
+        self.sort_latency_check.toggled.connect(self.on_view_options_changed)
+        health_layout.addWidget(self.sort_latency_check)
+        self.logos_check = QCheckBox("Show logos")
+        self.logos_check.setChecked(True)
+        self.logos_check.toggled.connect(self.on_show_logos_changed)
+        health_layout.addWidget(self.logos_check)
+        self.health_label = QLabel()
+        health_layout.addWidget(self.health_label, 1)
+        self.check_button = QPushButton("Check Streams")
+        self.check_button.clicked.connect(self.check_streams)
+        health_layout.addWidget(self.check_button)
+        layout.addLayout(health_layout)
+
+        # Programme guide: an XMLTV file, matched to channels by tvg-id
+        guide_layout = QHBoxLayout()
+        self.guide_label = QLabel("No programme guide loaded")
+        guide_layout.addWidget(self.guide_label, 1)
+        self.guide_button = QPushButton("Load Guide")
+        self.guide_button.clicked.connect(self.load_guide)
+        guide_layout.addWidget(self.guide_button)
+        layout.addLayout(guide_layout)
+
         # Progress bar
         self.progress = QProgressBar()
         self.progress.hide()
         layout.addWidget(self.progress)
 
-        # Channel tree
-        self.tree = QTreeWidget()
-        self.tree.setHeaderLabels(["Channels"])
-        self.tree.itemDoubleClicked.connect(self.on_channel_selected)
+        # Channel tree; rows are only created for what the view fetches
+        self.model = ChannelTreeModel(self.categorizer.categories)
+        self.tree = QTreeView()
+        self.tree.setModel(self.model)
+        self.tree.setUniformRowHeights(True)
+        self.tree.setIconSize(LOGO_SIZE)
+        self.tree.doubleClicked.connect(self.on_channel_selected)
+        self.tree.setColumnHidden(1, True)  # Until a guide is loaded
         layout.addWidget(self.tree)
 
-        # Categories
-        self.categories = {
-            "Live TV": QTreeWidgetItem(self.tree, ["Live TV"]),
-            "Movies": QTreeWidgetItem(self.tree, ["Movies"]),
-            "Series": QTreeWidgetItem(self.tree, ["Series"]),
-            "Sports": QTreeWidgetItem(self.tree, ["Sports"]),
-            "News": QTreeWidgetItem(self.tree, ["News"]),
-            "Kids": QTreeWidgetItem(self.tree, ["Kids"]),
-            "Music": QTreeWidgetItem(self.tree, ["Music"]),
-            "Others": QTreeWidgetItem(self.tree, ["Others"])
-        }
+        # Stream health results expire while the viewer stays open
+        self.health_timer = QTimer(self)
+        self.health_timer.setInterval(5 * 60 * 1000)
+        self.health_timer.timeout.connect(self.expire_health)
+        self.health_timer.start()
+
+        # The guide column follows the clock
+        self.guide_timer = QTimer(self)
+        self.guide_timer.setInterval(30 * 1000)
+        self.guide_timer.timeout.connect(self.model.refresh_guide)
+
+        # Logos arrive one by one; repaint for them at most every 100 ms
+        self.logo_timer = QTimer(self)
+        self.logo_timer.setSingleShot(True)
+        self.logo_timer.setInterval(100)
+        self.logo_timer.timeout.connect(self.tree.viewport().update)
+        self.logos.logo_ready.connect(self.on_logo_ready)
+        self.model.logos = self.logos
+
+    def load_categorizer(self):
+        try:
+            return Categorizer.load()
+        except (OSError, ValueError) as e:
+            QMessageBox.warning(self, "Error", f"Failed to load category rules: {str(e)}")
+            return Categorizer()
+
+    def open_cache(self):
+        # Without a usable cache directory playlists are simply always downloaded
+        try:
+            return PlaylistCache()
+        except (OSError, sqlite3.Error):
+            return None
+
+    def open_epg_cache(self):
+        try:
+            return EpgCache()
+        except OSError:
+            return None
+
+    def open_logo_cache(self):
+        # Without it logos are fetched again every session
+        try:
+            return LogoCache()
+        except (OSError, sqlite3.Error):
+            return None
+
+    def open_health(self):
+        # Probe results are only kept for this session without a health table
+        try:
+            health = HealthTable()
+            health.purge()
+            self.model.health = health.load()
+            return health
+        except (OSError, sqlite3.Error):
+            return None
 
     def load_playlist(self):
-        url = self.url_input.text().strip()
-        if not url:
+        urls = split_sources(self.url_input.text())
+        if not urls:
             QMessageBox.warning(self, "Error", "Please enter a playlist URL")
             return
 
-        try:
-            self.progress.show()
-            self.progress.setRange(0, 0)  # Indeterminate progress
-            self.load_button.setEnabled(False)
-            
-            # Clear existing items
-            for category in self.categories.values():
-                category.takeChildren()
-            self.channels.clear()
-
-            # Download and parse playlist
-            response = requests.get(url)
-            if not response.ok:
-                raise Exception("Failed to download playlist")
-
-            playlist_content = response.text
-            channels = self.parse_m3u(playlist_content)
-
-            # Categorize and add channels
-            self.categorize_channels(channels)
-            
-            self.progress.hide()
-            self.load_button.setEnabled(True)
-            QMessageBox.information(self, "Success", f"Loaded {len(channels)} channels")
-
-        except Exception as e:
-            self.progress.hide()
-            self.load_button.setEnabled(True)
-            QMessageBox.warning(self, "Error", f"Failed to load playlist: {str(e)}")
+        # Loading again while a load is running replaces it
+        self.stop_loader()
+        self.stop_refresher()
+        self.playlist_urls = urls
+        self.refresh_button.setEnabled(False)
+        self.refresh_label.clear()
+
+        # Clear existing items
+        self.model.clear()
+        self.logos.clear_pending()
+
+        self.progress.show()
+        self.progress.setRange(0, 0)  # Indeterminate until the size is known
+        self.progress.setFormat("Connecting...")
+        self.cancel_button.show()
+
+        # Download, parse and categorize off the GUI thread
+        self.loader = PlaylistLoader(urls, self.categorizer, self.cache, self)
+        self.loader.channels_loaded.connect(self.on_channels_loaded)
+        self.loader.snapshot_loaded.connect(self.on_snapshot_loaded)
+        self.loader.progress_changed.connect(self.on_load_progress)
+        self.loader.load_finished.connect(self.on_load_finished)
+        self.loader.load_failed.connect(self.on_load_failed)
+        self.loader.finished.connect(self.loader.deleteLater)
+        self.loader.start()
+
+    def open_file(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Open Playlist", "",
+                                              "Playlists (*.m3u *.m3u8 *.m3u.gz *.m3u.xz);;All Files (*)")
+        if path:
+            self.load_file(path)
+
+    def load_file(self, path):
+        # Local playlists go through the same loader as URLs
+        self.url_input.setText(path)
+        self.load_playlist()
+
+    def cancel_load(self):
+        self.stop_loader()
+        self.end_load()
+
+    def stop_loader(self):
+        if self.loader is not None:
+            # The thread winds down on its own; its late signals are ignored
+            self.loader.cancel()
+            self.loader = None
+        self.pending_batches.clear()
+        self.loaded_count = None
+        self.cache_pending = None
+        self.insert_timer.stop()
+
+    def end_load(self):
+        self.progress.hide()
+        self.cancel_button.hide()
+
+    def on_channels_loaded(self, batch):
+        if self.sender() is not self.loader:
+            return
+        # The loader can outpace the GUI; queue and insert in time slices
+        self.pending_batches.append(batch)
+        self.insert_timer.start()
+
+    def on_snapshot_loaded(self, snapshot):
+        if self.sender() is not self.loader:
+            return
+        with metrics.span('ui.restore'):
+            self.model.restore(snapshot)
+        if self.search_input.text().strip():
+            self.filter_channels()
+
+    def insert_pending(self):
+        deadline = time.perf_counter() + self.INSERT_BUDGET
+        while self.pending_batches and time.perf_counter() < deadline:
+            self.add_channels(self.pending_batches.popleft())
+        if not self.pending_batches:
+            self.insert_timer.stop()
+            if self.loaded_count is not None:
+                self.finish_load()
+
+    def on_load_progress(self, bytes_read, total_bytes, entries):
+        if self.sender() is not self.loader:
+            return
+        if total_bytes > 0:
+            # Kilobytes keep the range inside QProgressBar's int limits
+            self.progress.setRange(0, total_bytes // 1024)
+            self.progress.setValue(min(bytes_read, total_bytes) // 1024)
+            self.progress.setFormat(f"{entries} channels - %p%")
+        else:
+            self.progress.setFormat(f"{entries} channels - {bytes_read // 1024} KB")
+
+    def on_load_finished(self, count):
+        if self.sender() is not self.loader:
+            return
+        loader, self.loader = self.loader, None
+        self.loaded_count = count
+        self.load_report = self.describe_load(loader)
+        if loader.reader.guide_urls and not self.guide_url:
+            self.guide_url = loader.reader.guide_urls[0]
+            if self.model.epg is None:
+                self.guide_label.setText("The playlist names a programme guide; click Load Guide to load it")
+        self.refresh_button.setEnabled(True)
+        if not loader.from_cache:
+            self.store_in_cache(loader.reader)
+        if not self.pending_batches:
+            self.finish_load()
+
+    def describe_load(self, loader):
+        message = f"Loaded {loader.entries} channels"
+        if loader.reader.duplicates:
+            message += f" ({loader.reader.duplicates} duplicates skipped)"
+        for url, error in loader.reader.failed_sources:
+            message += f"\nFailed to load {url}: {error}"
+        return message
+
+    def store_in_cache(self, reader):
+        # Only revalidatable playlists are worth keeping, and a partial
+        # load must not be mistaken for the full set later
+        if self.cache is None or reader.failed_sources:
+            return
+        if not all(etag or last_modified for etag, last_modified in reader.validators.values()):
+            return
+        self.cache_pending = (reader.key, reader.validators)
+
+    def write_cache(self):
+        if self.cache_pending is not None:
+            # Pickling and writing a large playlist takes a while; do it off
+            # the GUI thread, from a copy the model cannot change meanwhile
+            key, validators = self.cache_pending
+            self.cache_pending = None
+            with metrics.span('playlist.snapshot'):
+                state = snapshot_state(self.model.snapshot())
+            threading.Thread(target=self.cache.store, daemon=True,
+                             args=(key, state, validators, self.categorizer.fingerprint)).start()
+
+    def finish_load(self):
+        self.loaded_count = None
+        self.write_cache()
+        self.end_load()
+        QMessageBox.information(self, "Success", self.load_report)
+
+    def on_load_failed(self, message):
+        if self.sender() is not self.loader:
+            return
+        self.loader = None
+        self.end_load()
+        QMessageBox.warning(self, "Error", f"Failed to load playlist: {message}")
+
+    def refresh_playlist(self):
+        # Skipped while a load or another refresh is still running
+        if not self.playlist_urls or self.loader is not None or self.refresher is not None or self.pending_batches:
+            return
+        self.refresher = PlaylistRefresher(self.playlist_urls, self.categorizer, self.model.store,
+                                           self.model.fingerprints, self.cache, self)
+        self.refresher.diff_ready.connect(self.on_diff_ready)
+        self.refresher.refresh_failed.connect(self.on_refresh_failed)
+        self.refresher.finished.connect(self.refresher.deleteLater)
+        self.refresh_button.setEnabled(False)
+        self.refresh_label.setText("Refreshing...")
+        self.refresher.start()
+
+    def stop_refresher(self):
+        if self.refresher is not None:
+            self.refresher.cancel()
+            self.refresher = None
+
+    def on_diff_ready(self, diff):
+        if self.sender() is not self.refresher:
+            return
+        refresher, self.refresher = self.refresher, None
+        self.refresh_button.setEnabled(True)
+        checked = time.strftime('%H:%M')
+        if not diff:
+            self.refresh_label.setText(f"Up to date (checked {checked})")
+            return
+        with metrics.span('ui.refresh'):
+            self.refresh_view(self.model.apply_diff, diff)
+        self.refresh_label.setText(f"Refreshed at {checked}: {diff.describe()}")
+        self.store_in_cache(refresher.reader)
+        self.write_cache()
+
+    def on_refresh_failed(self, message):
+        if self.sender() is not self.refresher:
+            return
+        self.refresher = None
+        self.refresh_button.setEnabled(True)
+        # Auto-refresh runs unattended, so no message box
+        self.refresh_label.setText(f"Refresh failed at {time.strftime('%H:%M')}: {message}")
+
+    def on_auto_refresh_changed(self):
+        minutes = self.auto_refresh_combo.currentData()
+        if minutes:
+            self.auto_refresh_timer.start(minutes * 60 * 1000)
+        else:
+            self.auto_refresh_timer.stop()
 
     def parse_m3u(self, content):
-        channels = []
-        lines = content.splitlines()
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-            if line.startswith('#EXTINF:'):
-                # Parse channel info
-                info = line[8:].split(',', 1)
-                if len(info) > 1:
-                    title = info[1]
-                    # Get URL from next line
-                    if i + 1 < len(lines):
-                        url = lines[i + 1].strip()
-                        if url and not url.startswith('#'):
-                            channels.append({'title': title, 'url': url})
-                i += 2
-            else:
-                i += 1
-        return channels
+        return parse_m3u(content)
 
     def categorize_channels(self, channels):
-        for channel in channels:
-            title = channel['title'].lower()
-            url = channel['url']
-            
-            # Categorize based on keywords
-            if any(word in title for word in ['news', 'cnn', 'bbc', 'aljazeera']):
-                category = 'News'
-            elif any(word in title for word in ['movie', 'film', 'cinema']):
-                category = 'Movies'
-            elif any(word in title for word in ['series', 'show', 'drama']):
-                category = 'Series'
-            elif any(word in title for word in ['sport', 'football', 'soccer', 'tennis']):
-                category = 'Sports'
-            elif any(word in title for word in ['kids', 'child', 'cartoon']):
-                category = 'Kids'
-            elif any(word in title for word in ['music', 'mtv', 'song']):
-                category = 'Music'
-            else:
-                category = 'Live TV'
-
-            # Add to tree
-            item = QTreeWidgetItem(self.categories[category], [channel['title']])
-            self.channels[channel['title']] = url
+        channels = list(channels)
+        batch = list(zip(self.categorizer.classify_many(channels), channels))
+        self.add_channels(batch)
+        return len(batch)
+
+    def add_channels(self, batch):
+        with metrics.span('ui.insert'):
+            self.model.add_channels(batch)
+
+    def on_search_text_changed(self, text):
+        self.search_timer.start()
 
     def filter_channels(self):
-        search_text = self.search_input.text().lower()
-        for category in self.categories.values():
-            for i in range(category.childCount()):
-                item = category.child(i)
-                item.setHidden(search_text not in item.text(0).lower())
+        with metrics.span('search.query'):
+            self.refresh_view(self.model.set_filter, self.search_input.text())
+
+    def on_view_options_changed(self):
+        self.refresh_view(self.model.set_view_options,
+                          self.hide_dead_check.isChecked(), self.sort_latency_check.isChecked())
+
+    def on_logo_ready(self, url):
+        # Not restarted while running, so a stream of logos still repaints
+        if not self.logo_timer.isActive():
+            self.logo_timer.start()
 
-    def on_channel_selected(self, item, column):
-        if not item.parent():  # Skip if category is clicked
+    def on_show_logos_changed(self, checked):
+        self.model.logos = self.logos if checked else None
+        if not checked:
+            self.logos.clear_pending()
+        self.tree.viewport().update()
+
+    def refresh_view(self, update, *args):
+        # The model resets on every change; keep the open categories open
+        expanded = [row for row in range(self.model.rowCount())
+                    if self.tree.isExpanded(self.model.index(row, 0))]
+        update(*args)
+        for row in expanded:
+            self.tree.expand(self.model.index(row, 0))
+
+    def check_streams(self):
+        if self.checker is not None:
+            self.stop_checker()
             return
-        
-        channel_name = item.text(0)
-        if channel_name in self.channels:
-            self.channel_selected.emit(self.channels[channel_name], channel_name)
+        # Probe what is listed now (search results, if any) that has no fresh result
+        self.expire_health()
+        health = self.model.health
+        url = self.model.store.url
+        urls = [url[channel_id] for rows in self.model.visible for channel_id in rows]
+        urls = [url for url in dict.fromkeys(urls) if url not in health]
+        if not urls:
+            self.health_label.setText("All listed streams were checked recently")
+            return
+
+        self.checker = HealthChecker(urls, self.health, parent=self)
+        self.checker.results_ready.connect(self.on_health_results)
+        self.checker.progress_changed.connect(self.on_check_progress)
+        self.checker.check_finished.connect(self.on_check_finished)
+        self.checker.finished.connect(self.checker.deleteLater)
+        self.check_button.setText("Stop Checking")
+        self.health_label.setText(f"Checking {len(urls)} streams...")
+        self.checker.start()
+
+    def stop_checker(self):
+        if self.checker is not None:
+            self.checker.cancel()
+            self.checker = None
+        self.check_button.setText("Check Streams")
+        self.apply_health()
+
+    def on_health_results(self, results):
+        if self.sender() is not self.checker:
+            return
+        self.model.set_health(results)
+        # Tooltips and colours are read on repaint
+        self.tree.viewport().update()
+
+    def on_check_progress(self, probed, total, dead):
+        if self.sender() is not self.checker:
+            return
+        self.health_label.setText(f"Checked {probed}/{total} streams, {dead} dead")
+
+    def on_check_finished(self, probed):
+        if self.sender() is not self.checker:
+            return
+        self.stop_checker()
+
+    def expire_health(self):
+        # Results age out within a session too; stale ones stop greying,
+        # hiding and sorting channels, and are probed again on the next check
+        ttl = self.health.ttl if self.health is not None else HealthTable.TTL
+        if self.model.expire_health(ttl) and self.checker is None:
+            self.apply_health()
+            self.tree.viewport().update()
+
+    def apply_health(self):
+        # Hiding and sorting are re-applied once, when a check ends
+        if self.model.hide_dead or self.model.sort_by_latency:
+            self.on_view_options_changed()
+
+    def on_channel_selected(self, index):
+        channel_id = self.model.channel_id(index)
+        if channel_id is None:  # Skip if category is clicked
+            return
+        self.selected_index = QPersistentModelIndex(index)
+        self.channel_selected.emit(channel_id)
+
+    def neighbour_urls(self, count):
+        # URLs of up to ``count`` channels either side of the last opened one
+        return self.model.neighbour_urls(QModelIndex(self.selected_index), count)
+
+    def load_guide(self):
+        if self.epg_loader is not None:
+            self.stop_epg_loader()
+            return
+        url, ok = QInputDialog.getText(self, "Load Programme Guide",
+                                       "XMLTV guide URL or file (.xml or .xml.gz):", text=self.guide_url)
+        url = url.strip()
+        if not ok or not url:
+            return
+        self.guide_url = url
+        self.epg_loader = EpgLoader(url, self.epg_cache, self)
+        self.epg_loader.guide_loaded.connect(self.on_guide_loaded)
+        self.epg_loader.progress_changed.connect(self.on_guide_progress)
+        self.epg_loader.load_failed.connect(self.on_guide_failed)
+        self.epg_loader.finished.connect(self.epg_loader.deleteLater)
+        self.guide_button.setText("Cancel Guide")
+        self.guide_label.setText("Loading programme guide...")
+        self.epg_loader.start()
+
+    def stop_epg_loader(self):
+        if self.epg_loader is not None:
+            self.epg_loader.cancel()
+            self.epg_loader = None
+        self.guide_button.setText("Load Guide")
+        if self.model.epg is None:
+            self.guide_label.setText("No programme guide loaded")
+
+    def on_guide_progress(self, programmes):
+        if self.sender() is not self.epg_loader:
+            return
+        self.guide_label.setText(f"Loading programme guide... {programmes} programmes")
+
+    def on_guide_loaded(self, epg):
+        if self.sender() is not self.epg_loader:
+            return
+        source = " (cached)" if self.epg_loader.from_cache else ""
+        self.epg_loader = None
+        self.guide_button.setText("Load Guide")
+        self.model.set_epg(epg)
+        self.tree.setColumnHidden(1, False)
+        self.tree.setColumnWidth(0, self.tree.viewport().width() // 2)
+        self.guide_timer.start()
+        self.guide_label.setText(f"Guide: {len(epg)} programmes for {len(epg.channels)} channels{source}")
+
+    def on_guide_failed(self, message):
+        if self.sender() is not self.epg_loader:
+            return
+        self.stop_epg_loader()
+        QMessageBox.warning(self, "Error", f"Failed to load programme guide: {message}")
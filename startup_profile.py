@@ -0,0 +1,67 @@
+import builtins
+import json
+import sys
+import time
+
+
+class StartupProfile:
+    # Wall time per startup phase, and the time spent importing each
+    # top-level module (inclusive of what it imports itself). A disabled
+    # profile records nothing, so call sites need no checks.
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.last = time.perf_counter()
+        self.phases = []            # (name, seconds)
+        self.imports = {}           # Module name -> seconds
+        self.depth = 0
+
+    @classmethod
+    def from_argv(cls, argv):
+        # Enabled by --profile-startup, with or without =FILE; import timing
+        # starts right away, so this has to run before the imports worth measuring
+        profile = cls(any(arg == '--profile-startup' or arg.startswith('--profile-startup=') for arg in argv))
+        if profile.enabled:
+            profile.track_imports()
+        return profile
+
+    def mark(self, name):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last))
+        self.last = now
+
+    def track_imports(self):
+        original = builtins.__import__
+
+        def timed_import(name, *args, **kwargs):
+            # Only the outermost import of a module not loaded yet is timed
+            top = name.partition('.')[0]
+            if self.depth or top in sys.modules or not top:
+                return original(name, *args, **kwargs)
+            self.depth += 1
+            start = time.perf_counter()
+            try:
+                return original(name, *args, **kwargs)
+            finally:
+                self.depth -= 1
+                self.imports[top] = self.imports.get(top, 0.0) + time.perf_counter() - start
+
+        builtins.__import__ = timed_import
+
+    def report(self, out=sys.stderr):
+        if not self.enabled:
+            return
+        print("Startup phases:", file=out)
+        for name, seconds in self.phases:
+            print(f"  {name:<32} {seconds * 1000:8.1f} ms", file=out)
+        print(f"  {'total':<32} {sum(seconds for _, seconds in self.phases) * 1000:8.1f} ms", file=out)
+        print("Imports, slowest first:", file=out)
+        for name, seconds in sorted(self.imports.items(), key=lambda item: -item[1])[:15]:
+            print(f"  {name:<32} {seconds * 1000:8.1f} ms", file=out)
+
+    def dump(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'phases': {name: round(seconds * 1000, 1) for name, seconds in self.phases},
+                       'imports': {name: round(seconds * 1000, 1) for name, seconds in self.imports.items()},
+                       'total_ms': round(sum(seconds for _, seconds in self.phases) * 1000, 1)}, f, indent=2)
@@ -0,0 +1,94 @@
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QTableWidget,
+                             QTableWidgetItem, QHeaderView, QFileDialog, QMessageBox)
+from PyQt5.QtCore import Qt, QTimer
+from metrics import COUNTER, SPAN, metrics
+
+COLUMNS = ["Metric", "Count", "Last", "Mean", "Max", "Total"]
+
+
+def format_value(kind, value):
+    if value is None:
+        return ""
+    if kind == SPAN:
+        return f"{value * 1000:.1f} ms"
+    if abs(value) >= 1000000:
+        return f"{value / 1000000:.1f} M"
+    if abs(value) >= 1000:
+        return f"{value / 1000:.1f} k"
+    return f"{value:g}"
+
+
+class StatsPanel(QWidget):
+    # The metrics registry as a table, refreshed while it is on screen.
+    # Showing the panel turns metrics on; they stay on once started, so
+    # closing and reopening it keeps what was collected.
+    REFRESH_INTERVAL = 1000
+
+    def __init__(self, registry=metrics, parent=None):
+        super().__init__(parent)
+        self.metrics = registry
+
+        layout = QVBoxLayout(self)
+        self.table = QTableWidget(0, len(COLUMNS))
+        self.table.setHorizontalHeaderLabels(COLUMNS)
+        self.table.verticalHeader().hide()
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        layout.addWidget(self.table)
+
+        buttons = QHBoxLayout()
+        self.reset_button = QPushButton("Reset")
+        self.reset_button.clicked.connect(self.reset)
+        buttons.addWidget(self.reset_button)
+        self.export_button = QPushButton("Export...")
+        self.export_button.clicked.connect(self.export)
+        buttons.addWidget(self.export_button)
+        buttons.addStretch(1)
+        layout.addLayout(buttons)
+
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(self.REFRESH_INTERVAL)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.metrics.enabled = True
+        self.refresh()
+        self.refresh_timer.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.refresh_timer.stop()
+
+    def refresh(self):
+        snapshot = self.metrics.snapshot()
+        self.table.setRowCount(len(snapshot))
+        for row, (name, stat) in enumerate(snapshot.items()):
+            kind = stat['kind']
+            mean = stat['total'] / stat['count'] if stat['count'] and kind != COUNTER else None
+            cells = [name, str(stat['count']),
+                     format_value(kind, stat['last']), format_value(kind, mean),
+                     format_value(kind, stat['max']), format_value(kind, stat['total'])]
+            for column, text in enumerate(cells):
+                item = self.table.item(row, column)
+                if item is None:
+                    item = QTableWidgetItem()
+                    if column:
+                        item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                    self.table.setItem(row, column, item)
+                if item.text() != text:
+                    item.setText(text)
+
+    def reset(self):
+        self.metrics.reset()
+        self.refresh()
+
+    def export(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Metrics", "metrics.jsonl",
+                                              "JSON Lines (*.jsonl);;Prometheus text (*.prom)")
+        if not path:
+            return
+        try:
+            self.metrics.export(path)
+        except OSError as e:
+            QMessageBox.warning(self, "Error", f"Could not export metrics: {e}")
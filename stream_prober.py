@@ -0,0 +1,205 @@
+import os
+import sqlite3
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+import m3u8
+from playlist_sources import make_session
+
+HEALTH_DB = os.path.join(os.path.expanduser('~'), '.cache', 'universal-media-player', 'health.sqlite')
+
+# Health states, best first
+OK = 'ok'
+SLOW = 'slow'
+DEAD = 'dead'
+
+# (connect, read) timeouts for a probe; a stream that takes longer is dead to a viewer
+PROBE_TIMEOUT = (5, 10)
+
+# Time to first byte above which a working stream counts as slow
+SLOW_TTFB = 3.0
+
+# HLS manifests are small; anything bigger is not a manifest
+MAX_MANIFEST = 1024 * 1024
+
+
+class ProbeResult:
+    __slots__ = ('url', 'status', 'http_status', 'ttfb', 'error', 'checked_at')
+
+    def __init__(self, url, status, http_status=0, ttfb=None, error='', checked_at=None):
+        self.url = url
+        self.status = status
+        self.http_status = http_status      # 0 when no response came back
+        self.ttfb = ttfb                    # Seconds to the first body byte, or None
+        self.error = error
+        self.checked_at = time.time() if checked_at is None else checked_at
+
+    def __repr__(self):
+        return f"ProbeResult({self.url!r}, {self.status!r}, ttfb={self.ttfb!r})"
+
+    def describe(self):
+        if self.status == DEAD:
+            return f"Dead: {self.error}"
+        return f"{'OK' if self.status == OK else 'Slow'} - {self.ttfb * 1000:.0f} ms"
+
+
+def is_hls(url, content_type):
+    return 'mpegurl' in content_type.lower() or urlsplit(url).path.lower().endswith('.m3u8')
+
+
+def check_manifest(url, text):
+    # Returns an error message, or '' for a playable manifest
+    try:
+        playlist = m3u8.loads(text, uri=url)
+    except Exception as e:
+        return f"Invalid HLS manifest: {e}"
+    if playlist.is_variant:
+        return '' if playlist.playlists else "HLS master playlist without variants"
+    return '' if playlist.segments else "HLS playlist without segments"
+
+
+def probe_url(session, url, timeout=PROBE_TIMEOUT, slow_ttfb=SLOW_TTFB):
+    # A GET rather than HEAD: many IPTV servers answer HEAD wrongly. Only
+    # the first byte of a stream is read, and the whole body of a manifest.
+    # The clock stops at that first byte, so a healthy low-bitrate stream
+    # is not taken for a slow one.
+    start = time.perf_counter()
+    try:
+        with session.get(url, stream=True, timeout=timeout) as response:
+            if not response.ok:
+                return ProbeResult(url, DEAD, response.status_code, error=f"HTTP {response.status_code}")
+            first = next(response.iter_content(1), b'')
+            ttfb = time.perf_counter() - start
+            if not first:
+                return ProbeResult(url, DEAD, response.status_code, ttfb, "Empty response")
+            if is_hls(url, response.headers.get('Content-Type', '')):
+                body = bytearray(first)
+                for chunk in response.iter_content(16 * 1024):
+                    body += chunk
+                    if len(body) > MAX_MANIFEST:
+                        return ProbeResult(url, DEAD, response.status_code, ttfb, "HLS manifest too large")
+                error = check_manifest(response.url, body.decode('utf-8', 'replace'))
+                if error:
+                    return ProbeResult(url, DEAD, response.status_code, ttfb, error)
+    except Exception as e:
+        return ProbeResult(url, DEAD, error=str(e) or type(e).__name__)
+    return ProbeResult(url, SLOW if ttfb > slow_ttfb else OK, response.status_code, ttfb)
+
+
+class HealthTable:
+    # Probe results in SQLite, one row per stream URL. Results older than
+    # ``ttl`` seconds are ignored and the stream gets probed again.
+    TTL = 6 * 3600
+
+    def __init__(self, path=HEALTH_DB, ttl=TTL):
+        self.path = path
+        self.ttl = ttl
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.execute("""CREATE TABLE IF NOT EXISTS health (
+                            url TEXT PRIMARY KEY,
+                            status TEXT NOT NULL,
+                            http_status INTEGER NOT NULL,
+                            ttfb REAL,
+                            error TEXT NOT NULL,
+                            checked_at REAL NOT NULL)""")
+
+    def execute(self, sql, params=(), many=False):
+        # A connection per call, so the table can be used from any thread
+        db = sqlite3.connect(self.path, timeout=10)
+        try:
+            with db:
+                if many:
+                    db.executemany(sql, params)
+                    return []
+                return db.execute(sql, params).fetchall()
+        finally:
+            db.close()
+
+    def load(self):
+        # {url: ProbeResult} for every result still within the TTL
+        rows = self.execute("SELECT url, status, http_status, ttfb, error, checked_at FROM health "
+                            "WHERE checked_at >= ?", (time.time() - self.ttl,))
+        return {row[0]: ProbeResult(*row) for row in rows}
+
+    def store(self, results):
+        self.execute("INSERT OR REPLACE INTO health VALUES (?, ?, ?, ?, ?, ?)",
+                     [(r.url, r.status, r.http_status, r.ttfb, r.error, r.checked_at) for r in results],
+                     many=True)
+
+    def purge(self):
+        self.execute("DELETE FROM health WHERE checked_at < ?", (time.time() - self.ttl,))
+
+
+class StreamProber:
+    # Probes stream URLs on a thread pool with at most ``concurrency``
+    # requests in flight. Per host, at most ``per_host`` requests run at
+    # once and new ones start no faster than ``host_rate`` per second, so
+    # a playlist from one provider does not hammer that provider. URLs are
+    # dispatched round-robin over hosts, so one slow host does not hold
+    # back the others.
+    CONCURRENCY = 64
+    PER_HOST = 4
+    HOST_RATE = 10.0
+
+    def __init__(self, concurrency=CONCURRENCY, per_host=PER_HOST, host_rate=HOST_RATE,
+                 timeout=PROBE_TIMEOUT, slow_ttfb=SLOW_TTFB):
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.interval = 1.0 / host_rate if host_rate else 0.0
+        self.timeout = timeout
+        self.slow_ttfb = slow_ttfb
+
+    def probe(self, urls, stopping=None):
+        return list(self.iter_probe(urls, stopping))
+
+    def iter_probe(self, urls, stopping=None):
+        # Yields a ProbeResult per URL as probes complete
+        queues = OrderedDict()      # Host -> URLs waiting to be probed
+        for url in dict.fromkeys(urls):
+            queues.setdefault(urlsplit(url).netloc.lower(), deque()).append(url)
+        busy = Counter()            # Host -> probes in flight
+        next_start = {}             # Host -> earliest time the next probe may start
+        running = {}                # Future -> host
+
+        # No retries: a stream that fails once is what the viewer would see
+        session = make_session(self.concurrency, retries=0)
+        pool = ThreadPoolExecutor(self.concurrency)
+        try:
+            while queues or running:
+                if stopping is not None and stopping():
+                    return
+                now = time.monotonic()
+                wake = None
+                filling = True
+                while filling and len(running) < self.concurrency:
+                    # One URL per host and pass, until no host can take more
+                    filling = False
+                    for host in list(queues):
+                        if len(running) >= self.concurrency:
+                            break
+                        if busy[host] >= self.per_host:
+                            continue
+                        start = next_start.get(host, now)
+                        if start > now:
+                            wake = start if wake is None else min(wake, start)
+                            continue
+                        url = queues[host].popleft()
+                        if not queues[host]:
+                            del queues[host]
+                        busy[host] += 1
+                        next_start[host] = max(start, now) + self.interval
+                        running[pool.submit(probe_url, session, url, self.timeout, self.slow_ttfb)] = host
+                        filling = True
+
+                timeout = 0.1 if wake is None else min(0.1, max(0.0, wake - time.monotonic()))
+                if not running:
+                    time.sleep(timeout)
+                    continue
+                done, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    busy[running.pop(future)] -= 1
+                    yield future.result()
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+            session.close()
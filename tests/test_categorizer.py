@@ -0,0 +1,85 @@
+import copy
+from categorizer import DEFAULT_RULES, Categorizer
+from m3u_parser import Channel
+
+# Hand-labelled titles, including the substring traps of the old keyword
+# loop; benchmarks/bench_categorizer.py scores both against them
+LABELLED = [
+    ("BBC World News", "", "News"),
+    ("Al Jazeera English", "", "News"),
+    ("الجزيرة مباشر", "", "News"),
+    ("قناة الإخبارية", "", "News"),
+    ("Showtime Sports", "", "Sports"),
+    ("beIN Sports 2 HD", "", "Sports"),
+    ("رياضة 1", "", "Sports"),
+    ("MTV Hits", "", "Music"),
+    ("Smtvx Channel", "", "Live TV"),
+    ("Cartoon Network", "", "Kids"),
+    ("قناة أطفال", "", "Kids"),
+    ("Rotana Drama", "", "Series"),
+    ("مسلسلات رمضان", "", "Series"),
+    ("Cinema 1 HD", "", "Movies"),
+    ("Rambo First Blood", "VOD | Action", "Movies"),
+    ("Channel 4", "UK | News", "News"),
+    ("Newsha TV", "", "Live TV"),
+    ("News24", "", "News"),
+    ("MTV2", "", "Music"),
+    ("Nickelodeon", "Kids", "Kids"),
+]
+
+
+def test_labelled_titles():
+    categorizer = Categorizer()
+    wrong = [(title, group, expected, categorizer.classify(title, group))
+             for title, group, expected in LABELLED if categorizer.classify(title, group) != expected]
+    assert not wrong
+
+
+def test_labelled_batch():
+    channels = [Channel(title, '', group_title=group) for title, group, _ in LABELLED]
+    assert Categorizer().classify_many(channels) == [expected for _, _, expected in LABELLED]
+
+
+def test_tvg_hints_before_title():
+    categorizer = Categorizer()
+    assert categorizer.classify("Channel 7", tvg_name="Sky Sports Main Event") == "Sports"
+    assert categorizer.classify("Channel 7", tvg_id="cnn.us") == "News"
+    # A hint without keywords leaves the title to decide
+    assert categorizer.classify("Cartoon Network", tvg_id="cn.us", tvg_name="CN") == "Kids"
+    # The group-title still comes first
+    assert categorizer.classify("Channel 7", "Movies", tvg_id="cnn.us") == "Movies"
+
+
+def test_batch_matches_single():
+    channels = [
+        Channel("BBC One 1", ''),
+        Channel("Channel 7", '', tvg_id="cnn.us"),
+        Channel("Channel 8", '', group_title="General", tvg_name="Box Office 2"),
+        Channel("Cartoon 3", '', group_title="General"),
+        Channel("", ''),
+        Channel("Sport 24", '', group_title="Kids"),
+        Channel("Line\nbreak news", ''),
+    ]
+    categorizer = Categorizer()
+    expected = [Categorizer().classify_channel(channel) for channel in channels]
+    # Mixed, bare and hinted-only batches take different paths
+    assert categorizer.classify_many(channels) == expected
+    assert categorizer.classify_many(channels[:1] + channels[4:5]) == [expected[0], expected[4]]
+    assert categorizer.classify_many(channels[::-1]) == expected[::-1]
+
+
+def test_digit_keywords():
+    # Channel numbers are folded away only while no keyword has digits
+    config = copy.deepcopy(DEFAULT_RULES)
+    config['rules'][0]['keywords'].append('channel 4')
+    categorizer = Categorizer(config)
+    channels = [Channel("Channel 4", ''), Channel("Channel 5", '')]
+    assert categorizer.classify_many(channels) == ["News", "Live TV"]
+    assert [categorizer.classify_channel(channel) for channel in channels] == ["News", "Live TV"]
+
+
+def test_fingerprint_follows_rules():
+    config = copy.deepcopy(DEFAULT_RULES)
+    config['rules'][0]['keywords'].append('headlines')
+    assert Categorizer().fingerprint == Categorizer(DEFAULT_RULES).fingerprint
+    assert Categorizer(config).fingerprint != Categorizer().fingerprint
@@ -0,0 +1,33 @@
+import gzip
+import io
+
+from epg import iter_xmltv, open_xmltv, parse_xmltv_time
+
+GUIDE = b"""<?xml version="1.0" encoding="UTF-8"?>
+<tv>
+  <channel id="one.uk"><display-name>One</display-name></channel>
+  <programme start="20240131200000 +0000" stop="20240131210000 +0000" channel="one.uk"><title>News</title></programme>
+  <programme start="2024013x2100" stop="20240131220000 +0000" channel="one.uk"><title>Broken</title></programme>
+  <programme start="20240131220000 +0000" channel="one.uk"><title>Film</title></programme>
+</tv>
+"""
+
+
+def test_parse_time_offset():
+    assert parse_xmltv_time('20240131203000 +0100') == parse_xmltv_time('20240131193000')
+
+
+def test_malformed_programme_is_skipped():
+    # The bad start only drops its own programme, not the rest of the guide
+    programmes = list(iter_xmltv(io.BytesIO(GUIDE)))
+    assert [p[3] for p in programmes] == ['News', 'Film']
+    assert programmes[1][2] is None
+
+
+def test_gzip_guide_closes_file(tmp_path):
+    path = tmp_path / 'guide.xml.gz'
+    path.write_bytes(gzip.compress(GUIDE))
+    with open_xmltv(str(path)) as source:
+        inner = source.fileobj
+        assert len(list(iter_xmltv(source))) == 2
+    assert inner.closed
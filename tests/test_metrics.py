@@ -0,0 +1,38 @@
+import time
+
+from metrics import COUNTER, NULL_SPAN, SPAN, Metrics
+
+
+def test_span_and_count_recorded_when_enabled():
+    metrics = Metrics(enabled=True)
+    with metrics.span('work'):
+        time.sleep(0.01)
+    metrics.count('items')
+    metrics.count('items', 4)
+    stats = metrics.snapshot()
+    assert stats['work']['kind'] == SPAN
+    assert stats['work']['count'] == 1
+    assert 0.01 <= stats['work']['total'] < 1.0
+    assert stats['items']['kind'] == COUNTER
+    assert (stats['items']['count'], stats['items']['total'], stats['items']['last']) == (2, 5, 4)
+
+
+def test_nothing_recorded_when_disabled():
+    metrics = Metrics()
+    # The shared no-op span, so a disabled span allocates nothing
+    assert metrics.span('work') is NULL_SPAN
+    with metrics.span('work'):
+        pass
+    metrics.count('items')
+    metrics.observe('rate', 1.5)
+    assert metrics.snapshot() == {}
+
+
+def test_span_records_on_error():
+    metrics = Metrics(enabled=True)
+    try:
+        with metrics.span('work'):
+            raise ValueError
+    except ValueError:
+        pass
+    assert metrics.snapshot()['work']['count'] == 1
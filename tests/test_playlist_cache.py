@@ -0,0 +1,24 @@
+import pickle
+
+from playlist_cache import PlaylistCache
+
+
+def test_snapshot_over_max_bytes_is_kept(tmp_path):
+    cache = PlaylistCache(str(tmp_path), max_bytes=10)
+    assert cache.store('a', {'count': 1, 'body': 'x' * 100}, {})
+    assert cache.lookup('a') is not None
+    # The next store pushes the older one out instead
+    assert cache.store('b', {'count': 1, 'body': 'y' * 100}, {})
+    assert cache.lookup('a') is None
+    assert cache.lookup('b') is not None
+
+
+def test_unreadable_snapshot_is_dropped(tmp_path):
+    cache = PlaylistCache(str(tmp_path))
+    assert cache.store('a', {'count': 1}, {})
+    # Unpickles fine, but is not a snapshot at all
+    filename = cache.execute("SELECT filename FROM playlists WHERE url = ?", ('a',))[0][0]
+    with open(cache.path(filename), 'wb') as f:
+        f.write(pickle.dumps([]))
+    assert cache.load('a') is None
+    assert cache.lookup('a') is None
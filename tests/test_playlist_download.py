@@ -0,0 +1,33 @@
+import os
+
+import playlist_download
+from benchmarks.bench_download import load, serve
+from synthetic import write_playlist
+from m3u_parser import iter_m3u_file
+
+
+def test_unopenable_part_restarts_from_start(tmp_path, monkeypatch):
+    path = str(tmp_path / 'playlist.m3u')
+    write_playlist(path, 2000, mixed=True)
+    expected = [(channel.title, channel.url) for channel in iter_m3u_file(path)]
+    with open(path, 'rb') as f:
+        body = f.read()
+    directory = str(tmp_path / 'downloads')
+    server = serve({'/plain.m3u': (body, '')}, 1, len(body) // 2)
+    url = f'http://127.0.0.1:{server.server_address[1]}/plain.m3u'
+    try:
+        # A load that gives up halfway leaves a .part file behind
+        monkeypatch.setattr(playlist_download, 'MAX_RESUMES', 0)
+        _, reader, _ = load(url, directory)
+        assert reader.failed_sources
+        assert any(name.endswith('.part') for name in os.listdir(directory))
+
+        # The next load is granted the rest, but cannot reopen the .part file
+        monkeypatch.setattr(playlist_download, 'MAX_RESUMES', 5)
+        monkeypatch.setattr(playlist_download.Download, 'open_part', lambda self: None)
+        channels, reader, _ = load(url, directory)
+    finally:
+        server.shutdown()
+    assert not reader.failed_sources
+    assert channels == expected
+    assert server.requests[-2:] == [f'bytes={len(body) // 2}-', 'bytes=0-']
@@ -0,0 +1,25 @@
+import builtins
+
+import pytest
+
+from benchmarks.bench_startup import startup
+from startup_profile import StartupProfile
+
+# Same budget as benchmarks/bench_startup.py, over the median of a few starts
+BUDGET_MS = 250.0
+RUNS = 3
+
+
+def test_profile_flag_forms(monkeypatch):
+    # An enabled profile wraps __import__; put it back afterwards
+    monkeypatch.setattr(builtins, '__import__', builtins.__import__)
+    assert StartupProfile.from_argv(['main.py', '--profile-startup']).enabled
+    assert StartupProfile.from_argv(['main.py', '--profile-startup=startup.json']).enabled
+    assert not StartupProfile.from_argv(['main.py', '--profile-startupx']).enabled
+
+
+def test_first_window_within_budget(tmp_path):
+    pytest.importorskip('PyQt5.QtWidgets')
+    path = str(tmp_path / 'startup.json')
+    samples = sorted(startup(str(tmp_path), path)[0] for _ in range(RUNS))
+    assert samples[RUNS // 2] <= BUDGET_MS, samples
@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import OrderedDict
+import vlc
+
+# Options for every channel. VLC buffers ``network-caching`` ms before the
+# first frame (1000 by default); live TV needs less, and a dropped HTTP
+# connection should be retried rather than end the stream.
+MEDIA_OPTIONS = (':network-caching=750', ':http-reconnect')
+
+# Neighbour pre-parsing gives up after this many milliseconds
+PARSE_TIMEOUT = 3000
+
+
+class MediaCache:
+    # Prepared vlc.Media objects by URL, least recently used evicted first.
+    # A cached Media carries its options and, once pre-parsed, its probed
+    # tracks, so switching to it skips that work.
+    MAX_ENTRIES = 16
+
+    def __init__(self, instance, options=MEDIA_OPTIONS, max_entries=MAX_ENTRIES):
+        self.instance = instance
+        self.options = options
+        self.max_entries = max_entries
+        self.media = OrderedDict()     # URL -> vlc.Media
+
+    def __contains__(self, url):
+        return url in self.media
+
+    def get(self, url):
+        media = self.media.get(url)
+        if media is not None:
+            self.media.move_to_end(url)
+            return media
+        media = self.instance.media_new(url, *self.options)
+        self.media[url] = media
+        while len(self.media) > self.max_entries:
+            # The player keeps its own reference to the media it is playing
+            _, old = self.media.popitem(last=False)
+            old.parse_stop()
+            old.release()
+        return media
+
+    def prepare(self, url):
+        # Starts an asynchronous parse, including network probing
+        media = self.get(url)
+        if media.get_parsed_status() == 0:
+            media.parse_with_options(vlc.MediaParseFlag.network, PARSE_TIMEOUT)
+        return media
+
+    def clear(self):
+        for media in self.media.values():
+            media.parse_stop()
+            media.release()
+        self.media.clear()
+
+
+class ChannelZapper:
+    # Switches the player straight to a channel: set_media and play, with no
+    # pause/resume toggling in between. Neighbouring channels are prepared
+    # once the switch is under way. A zap is timed from the switch request to
+    # the first MediaPlayerPlaying or MediaPlayerVout event.
+    NEIGHBOURS = 2
+
+    def __init__(self, instance, player, on_started=None, cache=None):
+        self.player = player
+        self.cache = cache or MediaCache(instance)
+        self.on_started = on_started    # Called on a VLC thread with (url, seconds, event name)
+        self.pending = None             # (url, start time) while a zap is under way
+        self.lock = threading.Lock()
+        events = player.event_manager()
+        for event_type in (vlc.EventType.MediaPlayerPlaying, vlc.EventType.MediaPlayerVout):
+            events.event_attach(event_type, self.on_event, event_type)
+
+    def switch(self, url, neighbours=(), requested_at=None):
+        media = self.cache.get(url)
+        with self.lock:
+            self.pending = (url, time.perf_counter() if requested_at is None else requested_at)
+        self.player.set_media(media)
+        if self.player.play() == -1:
+            with self.lock:
+                self.pending = None
+            return False
+        self.prepare(neighbours, url)
+        return True
+
+    def prepare(self, neighbours, playing=None):
+        # Also for neighbours whose URL to play is only known later
+        for neighbour in neighbours:
+            if neighbour != playing:
+                self.cache.prepare(neighbour)
+
+    def on_event(self, event, event_type):
+        # Whichever of Playing and Vout comes first ends the zap
+        with self.lock:
+            pending, self.pending = self.pending, None
+        if pending is None:
+            return
+        url, start = pending
+        if self.on_started is not None:
+            name = 'vout' if event_type == vlc.EventType.MediaPlayerVout else 'playing'
+            self.on_started(url, time.perf_counter() - start, name)